@@ -1,7 +1,9 @@
 from admin import AdminRouter
 from admin.chat import router as chat_router
 from admin.history import router as history_router
+from admin.llm_call import router as llm_call_router
 from admin.report import router as report_router
+from admin.review_profile import router as review_profile_router
 from admin.user import router as user_router
 
 admin_router = AdminRouter()
@@ -11,5 +13,7 @@ admin_router.include_routers(
         chat_router,
         history_router,
         report_router,
+        llm_call_router,
+        review_profile_router,
     ]
 )
@@ -0,0 +1,95 @@
+from admin import AdminRouter
+from database import LLMCall, async_session_factory
+from fastapi import Request
+from sqladmin import BaseView, ModelView, expose
+from sqlalchemy import Integer, case, func, select
+
+router = AdminRouter()
+
+TOP_FILES = 50
+
+
+@router.view
+class LLMCallAdmin(ModelView, model=LLMCall):
+    name = "LLM call"
+    icon = "fa-solid fa-robot"
+    can_create = False
+    can_edit = False
+    column_list = [
+        LLMCall.created_at,
+        LLMCall.report_id,
+        LLMCall.validator,
+        LLMCall.filepath,
+        LLMCall.input_tokens,
+        LLMCall.output_tokens,
+        LLMCall.latency,
+        LLMCall.retries,
+        LLMCall.status,
+        LLMCall.parse_success,
+    ]
+    column_searchable_list = [LLMCall.report_id, LLMCall.filepath]
+    column_sortable_list = [
+        LLMCall.created_at,
+        LLMCall.prompt_bytes,
+        LLMCall.input_tokens,
+        LLMCall.output_tokens,
+        LLMCall.latency,
+        LLMCall.retries,
+    ]
+    column_default_sort = ("created_at", True)
+
+
+def _usage_query(*group_by):
+    return (
+        select(
+            *group_by,
+            func.count(LLMCall.id).label("calls"),
+            func.sum(LLMCall.prompt_bytes).label("prompt_bytes"),
+            func.sum(LLMCall.input_tokens).label("input_tokens"),
+            func.sum(LLMCall.output_tokens).label("output_tokens"),
+            func.sum(LLMCall.latency).label("latency"),
+            func.avg(LLMCall.latency).label("avg_latency"),
+            func.sum(LLMCall.retries).label("retries"),
+            func.sum(case((LLMCall.status != "ok", 1), else_=0)).label("errors"),
+            func.sum(func.cast(LLMCall.parse_success.is_(False), Integer)).label(
+                "parse_failures"
+            ),
+            func.sum(func.cast(LLMCall.cache_hit, Integer)).label("cache_hits"),
+        )
+        .group_by(*group_by)
+        .order_by(func.sum(LLMCall.input_tokens + LLMCall.output_tokens).desc())
+    )
+
+
+@router.view
+class LLMUsageAdmin(BaseView):
+    name = "LLM usage"
+    icon = "fa-solid fa-chart-bar"
+
+    @expose("/llm-usage", methods=["GET"])
+    async def llm_usage(self, request: Request):
+        async with async_session_factory() as session:
+            by_model = (await session.execute(_usage_query(LLMCall.model))).all()
+            by_validator = (
+                await session.execute(_usage_query(LLMCall.validator))
+            ).all()
+            by_file = (
+                await session.execute(
+                    _usage_query(LLMCall.validator, LLMCall.filepath)
+                    .where(LLMCall.filepath.is_not(None))
+                    .limit(TOP_FILES)
+                )
+            ).all()
+
+        return await self.templates.TemplateResponse(
+            request,
+            "admin/llm_usage.html",
+            {
+                "title": "LLM usage",
+                "tables": [
+                    ("By model", ["model"], by_model),
+                    ("By validator", ["validator"], by_validator),
+                    (f"Top {TOP_FILES} files", ["validator", "filepath"], by_file),
+                ],
+            },
+        )
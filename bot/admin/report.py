@@ -9,5 +9,12 @@ router = AdminRouter()
 class ReportAdmin(ModelView, model=Report):
     icon = "fa-solid fa-h"
     column_list = [Report.pdf_file_path, Report.id]
-    column_searchable_list = [Report.pdf_file_path, Report.id]
-    form_excluded_columns = [Report.created_at, Report.updated_at]
+    column_searchable_list = [Report.pdf_file_path, Report.id, Report.source_sha256]
+    form_excluded_columns = [
+        Report.created_at,
+        Report.updated_at,
+        Report.comments,
+        Report.snippets,
+        Report.profile,
+    ]
+    column_details_exclude_list = [Report.comments, Report.snippets]
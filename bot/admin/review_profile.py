@@ -0,0 +1,47 @@
+from admin import AdminRouter
+from database import ReviewProfile
+from fastapi import Request, Response
+from markupsafe import Markup
+from services.storage import artifact_store
+from sqladmin import ModelView, action
+
+router = AdminRouter()
+
+
+@router.view
+class ReviewProfileAdmin(ModelView, model=ReviewProfile):
+    name = "Review profile"
+    icon = "fa-solid fa-fire"
+    can_create = False
+    can_edit = False
+    column_list = [
+        ReviewProfile.created_at,
+        ReviewProfile.report_id,
+        ReviewProfile.trigger,
+        ReviewProfile.duration,
+        ReviewProfile.samples,
+        ReviewProfile.flamegraph_path,
+    ]
+    column_labels = {ReviewProfile.flamegraph_path: "Flame graph"}
+    column_searchable_list = [ReviewProfile.report_id]
+    column_sortable_list = [ReviewProfile.created_at, ReviewProfile.duration]
+    column_default_sort = ("created_at", True)
+    column_formatters = {
+        ReviewProfile.flamegraph_path: lambda model, attribute: Markup(
+            '<a href="action/flamegraph?pks={}" target="_blank">svg</a>'
+        ).format(model.id)
+    }
+
+    @action(name="flamegraph", label="Flame graph", add_in_list=False)
+    async def flamegraph(self, request: Request) -> Response:
+        pk = request.query_params.get("pks", "").split(",")[0]
+        profile = await self.get_object_for_details(pk)
+        # flame graphs are artifacts too and may have been evicted
+        if profile is None or not await artifact_store.exists(
+            profile.flamegraph_path
+        ):
+            return Response(status_code=404)
+        return Response(
+            await artifact_store.read(profile.flamegraph_path),
+            media_type="image/svg+xml",
+        )
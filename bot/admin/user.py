@@ -1,5 +1,7 @@
 from admin import AdminRouter
 from database import User
+from fastapi import Request
+from services.profile import invalidate_user
 from sqladmin import ModelView
 
 router = AdminRouter()
@@ -8,7 +10,21 @@ router = AdminRouter()
 @router.view
 class UserAdmin(ModelView, model=User):
     icon = "fa-solid fa-user"
-    column_list = [User.telegram_id, User.full_name, User.is_banned]
+    column_list = [
+        User.telegram_id,
+        User.full_name,
+        User.is_banned,
+        User.profile_reviews,
+    ]
     column_searchable_list = [User.telegram_id, User.full_name]
     column_default_sort = "created_at"
     form_excluded_columns = [User.created_at, User.updated_at]
+
+    async def after_model_change(
+        self, data: dict, model: User, is_created: bool, request: Request
+    ) -> None:
+        # the bot reads ban status and flags from the profile cache
+        await invalidate_user(model.telegram_id)
+
+    async def after_model_delete(self, model: User, request: Request) -> None:
+        await invalidate_user(model.telegram_id)
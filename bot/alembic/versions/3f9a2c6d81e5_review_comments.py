@@ -0,0 +1,274 @@
+"""review comments
+
+Revision ID: 3f9a2c6d81e5
+Revises: 8c1d5e07a2b4
+Create Date: 2024-12-11 12:17:43.904215
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "3f9a2c6d81e5"
+down_revision = "8c1d5e07a2b4"
+branch_labels = None
+depends_on = None
+
+
+def _timestamps():
+    return [
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+    ]
+
+
+reports = sa.table(
+    "reports",
+    sa.column("id", sa.Uuid()),
+    sa.column("frontend_response", postgresql.JSONB()),
+    sa.column("ml_response", postgresql.JSONB()),
+    sa.column("titles", postgresql.JSONB()),
+    sa.column("project_comments", postgresql.JSONB()),
+)
+review_snippets = sa.table(
+    "review_snippets",
+    sa.column("id", sa.Integer()),
+    sa.column("report_id", sa.Uuid()),
+    sa.column("filepath", sa.String()),
+    sa.column("lines", postgresql.JSONB()),
+)
+review_comments = sa.table(
+    "review_comments",
+    sa.column("id", sa.Integer()),
+    sa.column("report_id", sa.Uuid()),
+    sa.column("title", sa.String()),
+    sa.column("filepath", sa.String()),
+    sa.column("start_string_number", sa.Integer()),
+    sa.column("end_string_number", sa.Integer()),
+    sa.column("first_line", sa.Integer()),
+    sa.column("last_line", sa.Integer()),
+    sa.column("comment", sa.Text()),
+    sa.column("suggestion", sa.Text()),
+    sa.column("snippet_id", sa.Integer()),
+)
+
+
+def _backfill_report(connection, report_id, frontend_response) -> None:
+    code_comments = (frontend_response or {}).get("code_comments") or []
+
+    snippet_lines = {}
+    for comment in code_comments:
+        lines = snippet_lines.setdefault(comment["filepath"], {})
+        for line in comment.get("lines") or []:
+            lines[str(line["order"])] = line["text"]
+
+    snippet_ids = {}
+    for filepath, lines in snippet_lines.items():
+        snippet_ids[filepath] = connection.execute(
+            review_snippets.insert()
+            .values(report_id=report_id, filepath=filepath, lines=lines)
+            .returning(review_snippets.c.id)
+        ).scalar_one()
+
+    rows = []
+    for comment in code_comments:
+        orders = [line["order"] for line in comment.get("lines") or []] or [1]
+        rows.append(
+            {
+                "report_id": report_id,
+                "title": comment["title"],
+                "filepath": comment["filepath"],
+                "start_string_number": comment["start_string_number"],
+                "end_string_number": comment["end_string_number"],
+                "first_line": orders[0],
+                "last_line": orders[-1],
+                "comment": comment["comment"],
+                "suggestion": comment.get("suggestion"),
+                "snippet_id": snippet_ids[comment["filepath"]],
+            }
+        )
+    if rows:
+        connection.execute(review_comments.insert(), rows)
+
+
+def upgrade() -> None:
+    op.add_column(
+        "reports",
+        sa.Column("titles", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    )
+    op.add_column(
+        "reports",
+        sa.Column(
+            "project_comments", postgresql.JSONB(astext_type=sa.Text()), nullable=True
+        ),
+    )
+    op.create_table(
+        "review_snippets",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("report_id", sa.Uuid(), nullable=False),
+        sa.Column("filepath", sa.String(), nullable=False),
+        sa.Column("lines", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        *_timestamps(),
+        sa.ForeignKeyConstraint(["report_id"], ["reports.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_review_snippets_id"), "review_snippets", ["id"], unique=False
+    )
+    op.create_index(
+        op.f("ix_review_snippets_report_id"),
+        "review_snippets",
+        ["report_id"],
+        unique=False,
+    )
+    op.create_table(
+        "review_comments",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("report_id", sa.Uuid(), nullable=False),
+        sa.Column("title", sa.String(length=255), nullable=False),
+        sa.Column("filepath", sa.String(), nullable=False),
+        sa.Column("start_string_number", sa.Integer(), nullable=False),
+        sa.Column("end_string_number", sa.Integer(), nullable=False),
+        sa.Column("first_line", sa.Integer(), nullable=False),
+        sa.Column("last_line", sa.Integer(), nullable=False),
+        sa.Column("comment", sa.Text(), nullable=False),
+        sa.Column("suggestion", sa.Text(), nullable=True),
+        sa.Column("snippet_id", sa.Integer(), nullable=True),
+        *_timestamps(),
+        sa.ForeignKeyConstraint(["report_id"], ["reports.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(
+            ["snippet_id"], ["review_snippets.id"], ondelete="SET NULL"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_review_comments_id"), "review_comments", ["id"], unique=False
+    )
+    op.create_index(
+        "ix_review_comments_report_id_title",
+        "review_comments",
+        ["report_id", "title"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_review_comments_report_id_filepath",
+        "review_comments",
+        ["report_id", "filepath"],
+        unique=False,
+    )
+
+    connection = op.get_bind()
+    report_ids = connection.execute(sa.select(reports.c.id)).scalars().all()
+    for report_id in report_ids:
+        frontend_response = connection.execute(
+            sa.select(reports.c.frontend_response).where(reports.c.id == report_id)
+        ).scalar_one()
+        _backfill_report(connection, report_id, frontend_response)
+
+    op.execute(
+        "UPDATE reports SET "
+        "titles = COALESCE(frontend_response -> 'titles', '[]'::jsonb), "
+        "project_comments = COALESCE("
+        "frontend_response -> 'project_comments', '[]'::jsonb)"
+    )
+    op.alter_column("reports", "titles", nullable=False)
+    op.alter_column("reports", "project_comments", nullable=False)
+    op.drop_column("reports", "frontend_response")
+    op.drop_column("reports", "ml_response")
+
+
+def downgrade() -> None:
+    op.add_column(
+        "reports",
+        sa.Column(
+            "ml_response", postgresql.JSONB(astext_type=sa.Text()), nullable=True
+        ),
+    )
+    op.add_column(
+        "reports",
+        sa.Column(
+            "frontend_response", postgresql.JSONB(astext_type=sa.Text()), nullable=True
+        ),
+    )
+
+    connection = op.get_bind()
+    report_rows = connection.execute(
+        sa.select(reports.c.id, reports.c.titles, reports.c.project_comments)
+    ).all()
+    for report_id, titles, project_comments in report_rows:
+        snippets = dict(
+            connection.execute(
+                sa.select(review_snippets.c.id, review_snippets.c.lines).where(
+                    review_snippets.c.report_id == report_id
+                )
+            ).all()
+        )
+        comments = connection.execute(
+            sa.select(review_comments)
+            .where(review_comments.c.report_id == report_id)
+            .order_by(review_comments.c.id)
+        ).mappings()
+
+        ml_comments, frontend_comments = [], []
+        for comment in comments:
+            ml_comment = {
+                "title": comment["title"],
+                "start_string_number": comment["start_string_number"],
+                "end_string_number": comment["end_string_number"],
+                "filepath": comment["filepath"],
+                "comment": comment["comment"],
+                "suggestion": comment["suggestion"],
+            }
+            lines = snippets.get(comment["snippet_id"]) or {}
+            ml_comments.append(ml_comment)
+            frontend_comments.append(
+                {
+                    **ml_comment,
+                    "lines": [
+                        {"order": order, "text": lines.get(str(order), "")}
+                        for order in range(
+                            comment["first_line"], comment["last_line"] + 1
+                        )
+                    ],
+                }
+            )
+
+        connection.execute(
+            reports.update()
+            .where(reports.c.id == report_id)
+            .values(
+                ml_response={
+                    "titles": titles,
+                    "code_comments": ml_comments,
+                    "project_comments": project_comments,
+                },
+                frontend_response={
+                    "titles": titles,
+                    "code_comments": frontend_comments,
+                    "project_comments": project_comments,
+                },
+            )
+        )
+
+    op.alter_column("reports", "ml_response", nullable=False)
+    op.alter_column("reports", "frontend_response", nullable=False)
+    op.drop_index("ix_review_comments_report_id_filepath", table_name="review_comments")
+    op.drop_index("ix_review_comments_report_id_title", table_name="review_comments")
+    op.drop_index(op.f("ix_review_comments_id"), table_name="review_comments")
+    op.drop_table("review_comments")
+    op.drop_index(op.f("ix_review_snippets_report_id"), table_name="review_snippets")
+    op.drop_index(op.f("ix_review_snippets_id"), table_name="review_snippets")
+    op.drop_table("review_snippets")
+    op.drop_column("reports", "project_comments")
+    op.drop_column("reports", "titles")
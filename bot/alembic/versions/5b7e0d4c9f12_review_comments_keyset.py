@@ -0,0 +1,27 @@
+"""review comments keyset
+
+Revision ID: 5b7e0d4c9f12
+Revises: 3f9a2c6d81e5
+Create Date: 2024-12-12 10:03:27.118402
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5b7e0d4c9f12"
+down_revision = "3f9a2c6d81e5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_review_comments_report_id_id",
+        "review_comments",
+        ["report_id", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_review_comments_report_id_id", table_name="review_comments")
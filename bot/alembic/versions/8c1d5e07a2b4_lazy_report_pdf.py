@@ -0,0 +1,30 @@
+"""lazy report pdf
+
+Revision ID: 8c1d5e07a2b4
+Revises: 46d3f1af36cd
+Create Date: 2024-12-09 18:42:10.512318
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8c1d5e07a2b4"
+down_revision = "46d3f1af36cd"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("reports", sa.Column("filename", sa.String(), nullable=True))
+    op.alter_column(
+        "reports", "pdf_file_path", existing_type=sa.String(), nullable=True
+    )
+
+
+def downgrade() -> None:
+    op.execute("UPDATE reports SET pdf_file_path = '' WHERE pdf_file_path IS NULL")
+    op.alter_column(
+        "reports", "pdf_file_path", existing_type=sa.String(), nullable=False
+    )
+    op.drop_column("reports", "filename")
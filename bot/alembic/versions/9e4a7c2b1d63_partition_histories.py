@@ -0,0 +1,112 @@
+"""partition histories
+
+Revision ID: 9e4a7c2b1d63
+Revises: 5b7e0d4c9f12
+Create Date: 2024-12-13 16:25:08.740195
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9e4a7c2b1d63"
+down_revision = "5b7e0d4c9f12"
+branch_labels = None
+depends_on = None
+
+COLUMNS = "id, user_id, chat_id, command, created_at, updated_at"
+
+
+def _create_histories(
+    name: str, primary_key: sa.PrimaryKeyConstraint, **kwargs
+) -> None:
+    op.create_table(
+        name,
+        sa.Column(
+            "id",
+            sa.Integer(),
+            server_default=sa.text("nextval('histories_id_seq')"),
+            nullable=False,
+        ),
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("chat_id", sa.String(), nullable=False),
+        sa.Column("command", sa.String(length=255), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["chat_id"], ["chats.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.telegram_id"]),
+        primary_key,
+        **kwargs,
+    )
+
+
+def upgrade() -> None:
+    op.rename_table("histories", "histories_old")
+    op.execute("ALTER INDEX histories_pkey RENAME TO histories_old_pkey")
+    op.drop_index("ix_histories_id", table_name="histories_old")
+
+    _create_histories(
+        "histories",
+        sa.PrimaryKeyConstraint("id", "created_at"),
+        postgresql_partition_by="RANGE (created_at)",
+    )
+    op.create_index(op.f("ix_histories_id"), "histories", ["id"], unique=False)
+    op.execute("ALTER SEQUENCE histories_id_seq OWNED BY histories.id")
+
+    op.execute("CREATE TABLE histories_default PARTITION OF histories DEFAULT")
+    # one partition per month from the oldest row up to two months ahead,
+    # later months are created by services.history
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            month timestamp := date_trunc(
+                'month',
+                COALESCE((SELECT min(created_at) FROM histories_old), now())
+                AT TIME ZONE 'UTC'
+            );
+        BEGIN
+            WHILE month <= date_trunc('month', now() AT TIME ZONE 'UTC')
+                + interval '2 months'
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE histories_p%s PARTITION OF histories '
+                    'FOR VALUES FROM (%L) TO (%L)',
+                    to_char(month, 'YYYYMM'),
+                    month || '+00',
+                    month + interval '1 month' || '+00'
+                );
+                month := month + interval '1 month';
+            END LOOP;
+        END $$
+        """
+    )
+
+    op.execute(f"INSERT INTO histories ({COLUMNS}) SELECT {COLUMNS} FROM histories_old")
+    op.drop_table("histories_old")
+
+
+def downgrade() -> None:
+    _create_histories("histories_old", sa.PrimaryKeyConstraint("id"))
+    op.execute(f"INSERT INTO histories_old ({COLUMNS}) SELECT {COLUMNS} FROM histories")
+    op.execute("ALTER SEQUENCE histories_id_seq OWNED BY histories_old.id")
+    op.drop_table("histories")
+
+    op.rename_table("histories_old", "histories")
+    op.execute("ALTER INDEX histories_old_pkey RENAME TO histories_pkey")
+    for column in ("user_id", "chat_id"):
+        op.execute(
+            f"ALTER TABLE histories RENAME CONSTRAINT histories_old_{column}_fkey "
+            f"TO histories_{column}_fkey"
+        )
+    op.create_index(op.f("ix_histories_id"), "histories", ["id"], unique=False)
@@ -0,0 +1,29 @@
+"""report source sha256
+
+Revision ID: a4c7e2f9b3d6
+Revises: e7b3a9f5c1d8
+Create Date: 2024-12-18 11:24:09.163205
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "a4c7e2f9b3d6"
+down_revision = "e7b3a9f5c1d8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "reports", sa.Column("source_sha256", sa.String(length=64), nullable=True)
+    )
+    op.create_index(
+        op.f("ix_reports_source_sha256"), "reports", ["source_sha256"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_reports_source_sha256"), table_name="reports")
+    op.drop_column("reports", "source_sha256")
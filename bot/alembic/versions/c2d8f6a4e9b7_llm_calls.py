@@ -0,0 +1,57 @@
+"""llm calls
+
+Revision ID: c2d8f6a4e9b7
+Revises: 9e4a7c2b1d63
+Create Date: 2024-12-16 11:48:52.306417
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c2d8f6a4e9b7"
+down_revision = "9e4a7c2b1d63"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "llm_calls",
+        sa.Column("report_id", sa.Uuid(), nullable=False),
+        sa.Column("model", sa.String(length=255), nullable=False),
+        sa.Column("validator", sa.String(length=255), nullable=False),
+        sa.Column("filepath", sa.String(), nullable=True),
+        sa.Column("prompt_bytes", sa.Integer(), nullable=False),
+        sa.Column("input_tokens", sa.Integer(), nullable=False),
+        sa.Column("output_tokens", sa.Integer(), nullable=False),
+        sa.Column("latency", sa.Float(), nullable=False),
+        sa.Column("retries", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(length=32), nullable=False),
+        sa.Column("parse_success", sa.Boolean(), nullable=True),
+        sa.Column("cache_hit", sa.Boolean(), nullable=False),
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_llm_calls_id"), "llm_calls", ["id"], unique=False)
+    op.create_index(
+        op.f("ix_llm_calls_report_id"), "llm_calls", ["report_id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_llm_calls_report_id"), table_name="llm_calls")
+    op.drop_index(op.f("ix_llm_calls_id"), table_name="llm_calls")
+    op.drop_table("llm_calls")
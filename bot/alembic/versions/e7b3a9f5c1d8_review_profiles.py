@@ -0,0 +1,64 @@
+"""review profiles
+
+Revision ID: e7b3a9f5c1d8
+Revises: c2d8f6a4e9b7
+Create Date: 2024-12-17 15:02:36.518734
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "e7b3a9f5c1d8"
+down_revision = "c2d8f6a4e9b7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "users",
+        sa.Column(
+            "profile_reviews",
+            sa.Boolean(),
+            server_default=sa.false(),
+            nullable=False,
+        ),
+    )
+    op.create_table(
+        "review_profiles",
+        sa.Column("report_id", sa.Uuid(), nullable=False),
+        sa.Column("trigger", sa.String(length=32), nullable=False),
+        sa.Column("duration", sa.Float(), nullable=False),
+        sa.Column("samples", sa.Integer(), nullable=False),
+        sa.Column("flamegraph_path", sa.String(), nullable=False),
+        sa.Column(
+            "allocations", postgresql.JSONB(astext_type=sa.Text()), nullable=True
+        ),
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["report_id"], ["reports.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("report_id"),
+    )
+    op.create_index(
+        op.f("ix_review_profiles_id"), "review_profiles", ["id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_review_profiles_id"), table_name="review_profiles")
+    op.drop_table("review_profiles")
+    op.drop_column("users", "profile_reviews")
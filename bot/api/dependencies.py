@@ -0,0 +1,16 @@
+from typing import Annotated, AsyncGenerator
+
+from database import async_session_factory
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    async_session: AsyncSession = async_session_factory()  # type: ignore
+    try:
+        yield async_session
+    finally:
+        await async_session.close()
+
+
+Session = Annotated[AsyncSession, Depends(get_async_session)]
@@ -1,62 +1,438 @@
+import asyncio
+import logging
+import secrets
 import tempfile
-from io import BytesIO
+from contextlib import ExitStack, nullcontext
+from typing import Annotated, Any, AsyncGenerator, Callable, Coroutine
 from uuid import UUID
 
-from database import Report, Session
-from fastapi import APIRouter, HTTPException, Response, UploadFile, status
-from fastapi.responses import FileResponse
-from schemas.review import ReviewSchema, UploadFileReponseSchema
-from services.review import determine_language, handle_file
-from settings.settings import bot_settings
-from sqlalchemy import select
+import orjson
+from api.dependencies import Session
+from database import Report, async_session_factory
+from fastapi import (
+    APIRouter,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+    status,
+)
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
+from fastapi.routing import APIRoute
+from ml.diff import PatchError
+from schemas.review import (
+    ReviewCommentsPageSchema,
+    ReviewSchema,
+    ReviewSummarySchema,
+    UploadFileReponseSchema,
+)
+from services.progress import ReviewProgress, has_review_events, review_events
+from services.review import (
+    determine_language,
+    ensure_report_pdf,
+    find_report,
+    handle_file,
+    load_review_comments,
+    load_review_data,
+    load_review_summary,
+    report_exists,
+    save_report,
+)
+from services.review_cache import (
+    IMMUTABLE_CACHE_CONTROL,
+    cache_review,
+    choose_encoding,
+    encode_review,
+    get_cached_review,
+    is_not_modified,
+    is_review_cached,
+    report_etag,
+    review_etag,
+)
+from services.storage import artifact_store
+from services.upload import (
+    CHUNK_SIZE,
+    DIFF_EXTENSIONS,
+    SpooledUpload,
+    UploadTooLarge,
+    max_upload_bytes,
+)
+from settings.settings import bot_settings, profiler_settings
 
-router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Room for the multipart boundaries and part headers around the files
+MULTIPART_OVERHEAD = 64 * 1024
+# The archive and the base archive or diff of a diff review
+MAX_UPLOAD_FILES = 2
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+_background_reviews: set[asyncio.Task] = set()
+
+
+class UploadSizeLimitedRequest(Request):
+    """Stops reading a request body as soon as it exceeds ``MAX_UPLOAD_MB``."""
+
+    async def stream(self) -> AsyncGenerator[bytes, None]:
+        max_size = MAX_UPLOAD_FILES * max_upload_bytes() + MULTIPART_OVERHEAD
+        content_length = self.headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > max_size:
+            raise upload_too_large()
+
+        received = 0
+        async for chunk in super().stream():
+            received += len(chunk)
+            if received > max_size:
+                raise upload_too_large()
+            yield chunk
+
+
+class UploadSizeLimitedRoute(APIRoute):
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        route_handler = super().get_route_handler()
+
+        async def handler(request: Request) -> Response:
+            return await route_handler(
+                UploadSizeLimitedRequest(request.scope, request.receive)
+            )
+
+        return handler
+
+
+def upload_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File is larger than {bot_settings.MAX_UPLOAD_MB} MB",
+    )
+
+
+async def read_chunks(file: UploadFile) -> AsyncGenerator[bytes, None]:
+    while chunk := await file.read(CHUNK_SIZE):
+        yield chunk
+
+
+async def spool_upload(file: UploadFile) -> SpooledUpload:
+    upload = SpooledUpload()
+    try:
+        await upload.write_from(read_chunks(file))
+    except UploadTooLarge:
+        upload.close()
+        raise upload_too_large()
+    except BaseException:
+        upload.close()
+        raise
+
+    return upload
+
+
+router = APIRouter(route_class=UploadSizeLimitedRoute)
+
+
+def is_profile_requested(x_profile: str | None) -> bool:
+    token = profiler_settings.PROFILE_HEADER_TOKEN
+    if x_profile is None or token is None:
+        return False
+    return secrets.compare_digest(x_profile, token.get_secret_value())
+
+
+async def review_upload(
+    upload: SpooledUpload,
+    is_file: bool,
+    filename: str,
+    progress: ReviewProgress,
+    profile_trigger: str | None,
+    base: SpooledUpload | None = None,
+    diff: SpooledUpload | None = None,
+) -> Report | None:
+    """Review an upload and save its report, then close the uploads and progress."""
+    try:
+        with (
+            upload,
+            base or nullcontext(),
+            diff or nullcontext(),
+            tempfile.TemporaryDirectory() as tmpdirname,
+            progress.track(),
+        ):
+            try:
+                language, response, report = await handle_file(
+                    upload.file,
+                    is_file,
+                    filename,
+                    tmpdirname,
+                    profile_trigger=profile_trigger,
+                    report_id=progress.report_id,
+                    base=base.file if base else None,
+                    diff=diff.file if diff else None,
+                )
+            except PatchError as error:
+                logger.info("Diff of %s does not apply: %s", progress.report_id, error)
+                progress.fail("invalid_diff")
+                return None
+        if report is None:
+            progress.fail("unsupported_language")
+            return None
+
+        report.source_sha256 = upload.sha256
+        async with async_session_factory() as session:
+            await save_report(session, report)
+        progress.finish()
+        return report
+    finally:
+        await progress.close()
 
 
 @router.post("/upload/")
 async def upload_file(
     file: UploadFile,
-    session: Session,
+    response: Response,
+    x_profile: Annotated[str | None, Header()] = None,
+    wait: bool = True,
+    base: UploadFile | None = None,
+    diff: UploadFile | None = None,
 ) -> UploadFileReponseSchema:
+    """Review an uploaded file or archive.
+
+    To review only the changes of a project, send its archive with either
+    ``base``, the archive of the previous version, or ``diff``, a unified
+    diff to apply to the archive. A diff that does not apply fails the review.
+
+    With ``wait=false`` the review runs in the background and the report id is
+    returned at once with 202, to follow ``/review/{report_id}/events``.
+    """
     is_file = determine_language(file.filename) in bot_settings.ALLOWED_LANGUAGES
     if not file.filename.endswith("zip") and not is_file:
         return Response(status_code=status.HTTP_400_BAD_REQUEST)
+    if base is not None or diff is not None:
+        if is_file or (base is not None and diff is not None):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Send a zip archive with either a base archive or a diff",
+            )
+        if base is not None and not base.filename.endswith("zip"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="The base version must be a zip archive",
+            )
+        if diff is not None and not diff.filename.endswith(DIFF_EXTENSIONS):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="The diff must be a .diff or .patch file",
+            )
 
-    with tempfile.TemporaryDirectory() as tmpdirname:
-        pdf, language, response, report = await handle_file(
-            BytesIO(await file.read()), is_file, file.filename, tmpdirname
-        )
+    with ExitStack() as uploads:
+        upload, base_upload, diff_upload = [
+            uploads.enter_context(await spool_upload(part)) if part else None
+            for part in (file, base, diff)
+        ]
+        # from here on the review closes them
+        uploads.pop_all()
+
+    progress = ReviewProgress()
+    await progress.open()
+    review = review_upload(
+        upload,
+        is_file,
+        file.filename,
+        progress,
+        profile_trigger="header" if is_profile_requested(x_profile) else None,
+        base=base_upload,
+        diff=diff_upload,
+    )
+    if not wait:
+        task = asyncio.create_task(review, name=str(progress.report_id))
+        _background_reviews.add(task)
+        task.add_done_callback(_forget_background_review)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return UploadFileReponseSchema(report_id=progress.report_id)
+
+    if await review is None:
+        return Response(status_code=status.HTTP_400_BAD_REQUEST)
+
+    return UploadFileReponseSchema(report_id=progress.report_id)
 
-    session.add(report)
-    await session.commit()
 
-    return UploadFileReponseSchema(report_id=report.id)
+def _forget_background_review(task: asyncio.Task) -> None:
+    _background_reviews.discard(task)
+    if not task.cancelled() and (error := task.exception()) is not None:
+        logger.error("Background review %s failed", task.get_name(), exc_info=error)
+
+
+async def wait_for_reviews() -> None:
+    """Wait until the reviews started with ``wait=false`` are saved."""
+    if _background_reviews:
+        await asyncio.gather(*_background_reviews, return_exceptions=True)
 
 
 @router.get("/report/{report_id}")
-async def get_report(session: Session, report_id: UUID) -> FileResponse:
-    get_report_query = select(Report).filter(Report.id == report_id)
-    report = (await session.execute(get_report_query)).scalars().first()
+async def get_report(
+    session: Session,
+    report_id: UUID,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> FileResponse:
+    headers = {"ETag": report_etag(report_id), "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    if is_not_modified(if_none_match, headers["ETag"]):
+        if not await report_exists(session, report_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Report not found"
+            )
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    report = await find_report(session, report_id)
     if not report:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Report not found"
         )
 
-    return FileResponse(report.pdf_file_path, media_type="application/pdf")
+    pdf_key = await ensure_report_pdf(session, report)
+    if pdf_file_path := artifact_store.local_path(pdf_key):
+        return FileResponse(
+            pdf_file_path, media_type="application/pdf", headers=headers
+        )
+    return Response(
+        await artifact_store.read(pdf_key),
+        media_type="application/pdf",
+        headers=headers,
+    )
+
+
+@router.get("/review/{report_id}", response_model=ReviewSchema)
+async def get_review(
+    session: Session,
+    report_id: UUID,
+    if_none_match: Annotated[str | None, Header()] = None,
+    accept_encoding: Annotated[str | None, Header()] = None,
+) -> Response:
+    encoding = choose_encoding(accept_encoding)
+    headers = {
+        "ETag": review_etag(report_id, encoding),
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+    if is_not_modified(if_none_match, headers["ETag"]):
+        # a cached body proves the report exists without a database query
+        if not (
+            await is_review_cached(report_id, encoding)
+            or await report_exists(session, report_id)
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Report not found"
+            )
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+
+    if (body := await get_cached_review(report_id, encoding)) is None:
+        report = await find_report(session, report_id)
+        if not report:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Report not found"
+            )
+
+        bodies = encode_review(await load_review_data(session, report))
+        await cache_review(report_id, bodies)
+        body = bodies[encoding]
+
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def sse_message(event: dict[str, Any] | None) -> bytes:
+    if event is None:
+        return b": keepalive\n\n"
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (
+        event["id"],
+        event["event"].encode(),
+        orjson.dumps(event["data"]),
+    )
+
+
+async def stream_review_events(
+    report_id: UUID, last_event_id: int
+) -> AsyncGenerator[bytes, None]:
+    async for event in review_events(report_id, last_event_id):
+        yield sse_message(event)
+
+
+@router.get("/review/{report_id}/events", response_class=StreamingResponse)
+async def get_review_events(
+    session: Session,
+    report_id: UUID,
+    last_event_id: Annotated[int, Header(ge=0)] = 0,
+) -> StreamingResponse:
+    """Stream the progress of a review as server-sent events.
+
+    Events: ``started``, ``stage``, ``files`` (done and total), ``comment``
+    (each code comment as soon as its file is reviewed) and finally ``done``
+    or ``failed``. Reconnecting with ``Last-Event-ID`` resumes the stream.
+    """
+    if not await has_review_events(report_id):
+        report = await find_report(session, report_id)
+        if not report:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Report not found"
+            )
+        # reviewed before the events expired, only the outcome is left
+        done = {"id": 1, "event": "done", "data": {"report_id": str(report.id)}}
+        return StreamingResponse(
+            iter([sse_message(done)]),
+            media_type="text/event-stream",
+            headers=SSE_HEADERS,
+        )
+
+    return StreamingResponse(
+        stream_review_events(report_id, last_event_id),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
 
 
-@router.get("/review/{report_id}")
-async def get_review(session: Session, report_id: UUID) -> ReviewSchema:
-    get_report_query = select(Report).filter(Report.id == report_id)
-    report = (await session.execute(get_report_query)).scalars().first()
+@router.get("/review/{report_id}/summary")
+async def get_review_summary(
+    session: Session,
+    report_id: UUID,
+    response: Response,
+) -> ReviewSummarySchema:
+    report = await find_report(session, report_id)
     if not report:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Report not found"
         )
 
-    return ReviewSchema(
-        id=report.id,
-        titles=report.frontend_response.get("titles") or [],
-        code_comments=report.frontend_response.get("code_comments") or [],
-        project_comments=report.frontend_response.get("project_comments") or [],
+    response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return await load_review_summary(session, report)
+
+
+@router.get("/review/{report_id}/comments", response_model=ReviewCommentsPageSchema)
+async def get_review_comments(
+    session: Session,
+    report_id: UUID,
+    cursor: int | None = None,
+    limit: Annotated[int, Query(ge=1, le=500)] = 50,
+    title: Annotated[list[str] | None, Query()] = None,
+    filepath_prefix: str | None = None,
+    line_from: Annotated[int | None, Query(ge=1)] = None,
+    line_to: Annotated[int | None, Query(ge=1)] = None,
+) -> ORJSONResponse:
+    if not await find_report(session, report_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Report not found"
+        )
+
+    items, next_cursor = await load_review_comments(
+        session,
+        report_id,
+        limit,
+        cursor=cursor,
+        titles=title,
+        filepath_prefix=filepath_prefix,
+        line_from=line_from,
+        line_to=line_to,
+    )
+    # Comments come from the database as plain data, see comment_data
+    return ORJSONResponse(
+        {"items": items, "next_cursor": next_cursor},
+        headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL},
     )
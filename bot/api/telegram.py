@@ -0,0 +1,65 @@
+import asyncio
+import logging
+import secrets
+from typing import Annotated
+
+import orjson
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.types import Update
+from fastapi import APIRouter, Header, HTTPException, Request, Response, status
+from settings.settings import bot_settings
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+_feed_update_tasks: set[asyncio.Task] = set()
+
+
+def is_webhook_secret_valid(secret_token: str | None) -> bool:
+    secret = bot_settings.WEBHOOK_SECRET
+    if not secret_token or secret is None:
+        return False
+    return secrets.compare_digest(secret_token, secret.get_secret_value())
+
+
+async def _feed_update(bot: Bot, dispatcher: Dispatcher, update: Update) -> None:
+    try:
+        result = await dispatcher.feed_update(bot, update)
+        if isinstance(result, TelegramMethod):
+            await dispatcher.silent_call_request(bot, result)
+    except Exception:
+        logger.exception("Failed to process update %s", update.update_id)
+
+
+@router.post(bot_settings.WEBHOOK_PATH, include_in_schema=False)
+async def telegram_webhook(
+    request: Request,
+    x_telegram_bot_api_secret_token: Annotated[str | None, Header()] = None,
+) -> Response:
+    """Acknowledge an update at once and process it in the background.
+
+    Telegram waits for the response before sending the next update of a chat
+    and retries on timeouts, so reviews must not run inside the request.
+    """
+    if not is_webhook_secret_valid(x_telegram_bot_api_secret_token):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid secret token"
+        )
+
+    bot: Bot = request.app.state.bot
+    update = Update.model_validate(
+        orjson.loads(await request.body()), context={"bot": bot}
+    )
+    task = asyncio.create_task(_feed_update(bot, request.app.state.dispatcher, update))
+    _feed_update_tasks.add(task)
+    task.add_done_callback(_feed_update_tasks.discard)
+
+    return Response()
+
+
+async def wait_for_updates() -> None:
+    """Wait until the updates received so far are processed."""
+    if _feed_update_tasks:
+        await asyncio.gather(*_feed_update_tasks, return_exceptions=True)
@@ -0,0 +1,239 @@
+"""Local stand-in for the Mistral and OpenAI chat completion APIs.
+
+Usage (from the bot directory):
+    python -m benchmarks.fake_llm --port 8089 --latency lognormal:1.5,0.4
+
+Any POST is answered as a chat completion, so the server works both as
+``EVRAZ_BASE_URL`` and as an OpenAI ``base_url``. Answers are shaped after
+the prompt of the reviewer step that sent it and always parse, unless
+``--malformed-rate`` asks otherwise. ``GET /stats`` returns request counters.
+
+Latency specs: ``fixed:SECONDS``, ``uniform:LOW,HIGH`` and
+``lognormal:MEDIAN,SIGMA``.
+"""
+
+import argparse
+import ast
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import PurePosixPath
+from typing import Callable
+
+Latency = Callable[[random.Random], float]
+
+LAYERS = {"adapters": "adapters", "composites": "composite", "tests": "tests"}
+
+
+def parse_latency(spec: str) -> Latency:
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(",") if value]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(*values)
+    if kind == "lognormal" and len(values) == 2:
+        median, sigma = values
+        return lambda rng: median * math.exp(rng.gauss(0, sigma))
+    raise ValueError(f"Bad latency spec: {spec}")
+
+
+def _classify_layers(prompt: str) -> str:
+    project = prompt.rsplit("PROJECT:", 1)[1].rsplit("Твой ответ:", 1)[0]
+    classes = {}
+    for directory in ast.literal_eval(project.strip()):
+        parts = PurePosixPath(directory).parts
+        classes[directory] = next(
+            (layer for part, layer in LAYERS.items() if part in parts), "core"
+        )
+    return f"```json\n{json.dumps(classes, ensure_ascii=False)}\n```"
+
+
+def _numbered_lines(prompt: str, marker: str) -> list[tuple[int, str]]:
+    script = prompt.rsplit(marker, 1)[1]
+    return [
+        (int(number), text)
+        for number, text in re.findall(r"^(\d+): (.*)$", script, re.MULTILINE)
+    ]
+
+
+def _check_logging(prompt: str) -> str:
+    comments = [
+        {
+            "type": "logging",
+            "start_line_number": number,
+            "end_line_number": number,
+            "comment": "Использование print",
+            "suggestion": "```python\nlogger.info('%s', value)\n```",
+        }
+        for number, text in _numbered_lines(prompt, "SCRIPT:")
+        if "print(" in text
+    ]
+    return json.dumps({"comments": comments}, ensure_ascii=False)
+
+
+def _analyze_code(prompt: str) -> str:
+    comments = [
+        {
+            "type": "data" if "execute(" in text else "architecture",
+            "start_line_number": number,
+            "end_line_number": number + 2,
+            "comment": "Этот участок кода нужно перенести в другой слой.",
+        }
+        for number, text in _numbered_lines(prompt, "### Содержимое FILE")
+        if text.startswith("class ") or "execute(" in text
+    ]
+    return json.dumps({"comments": comments}, ensure_ascii=False)
+
+
+def _analyze_structure(prompt: str) -> str:
+    comments = [
+        {"type": "project_structure", "comment": f"В корне нет файла {name}"}
+        for name in (".editorconfig", ".gitattributes")
+        if name not in prompt
+    ]
+    return json.dumps({"comments": comments}, ensure_ascii=False)
+
+
+def answer(prompt: str) -> tuple[str, str]:
+    """Return the reviewer step the prompt belongs to and a valid answer."""
+    if "PROJECT:" in prompt:
+        return "layer_classifier", _classify_layers(prompt)
+    if "TREE структура" in prompt:
+        return "project_structure", _analyze_structure(prompt)
+    if "SCRIPT:" in prompt:
+        return "logging_checker", _check_logging(prompt)
+    if "Содержимое FILE" in prompt:
+        return "code_analyzer", _analyze_code(prompt)
+    return "unknown", "{}"
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        latency: Latency,
+        error_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        super().__init__(address, FakeLLMHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.rng = random.Random(seed)
+        self.stats: Counter[str] = Counter()
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def draw(self) -> tuple[float, float, float]:
+        with self.lock:
+            return self.latency(self.rng), self.rng.random(), self.rng.random()
+
+    def count(self, **increments: int) -> None:
+        with self.lock:
+            self.stats.update(increments)
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    server: FakeLLMServer
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def _send_json(self, status: int, body: dict) -> None:
+        payload = json.dumps(body, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self) -> None:
+        with self.server.lock:
+            stats = dict(self.server.stats)
+        self._send_json(200, stats)
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = "\n".join(str(message["content"]) for message in body["messages"])
+        step, content = answer(prompt)
+        latency, error_draw, malformed_draw = self.server.draw()
+        time.sleep(max(latency, 0.0))
+
+        self.server.count(requests=1, prompt_bytes=len(prompt.encode()))
+        self.server.count(**{f"requests_{step}": 1})
+        if error_draw < self.server.error_rate:
+            self.server.count(errors=1)
+            status = 429 if error_draw < self.server.error_rate / 2 else 500
+            self._send_json(status, {"error": "injected failure"})
+            return
+        if malformed_draw < self.server.malformed_rate:
+            self.server.count(malformed=1)
+            content = "Извините, я не могу ответить в формате JSON."
+
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(content) // 4
+        self._send_json(
+            200,
+            {
+                "id": f"chatcmpl-{self.server.stats['requests']}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "provider": "fake",
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            },
+        )
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", default="lognormal:1,0.5")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = FakeLLMServer(
+        (args.host, args.port),
+        parse_latency(args.latency),
+        args.error_rate,
+        args.malformed_rate,
+        args.seed,
+    )
+    # benchmarks.review reads the address of a server started on port 0
+    print(f"FAKE_LLM_URL={server.url}", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""In-process stand-in for the Telegram Bot API used by load tests.
+
+Serves ``getUpdates`` long polling, ``getFile`` and file downloads, and
+records what the bot sends so that simulated users can wait for replies.
+Any other method succeeds with ``true``.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any
+from uuid import uuid4
+
+from aiohttp import web
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Load", "username": "load_bot"}
+
+
+@dataclass
+class BotEvent:
+    method: str
+    chat_id: int
+    text: str | None
+    at: float = field(default_factory=time.perf_counter)
+
+
+class FakeTelegramAPI:
+    def __init__(self):
+        self.updates: list[dict[str, Any]] = []
+        self.new_update = asyncio.Event()
+        self.files: dict[str, bytes] = {}
+        self.chat_events: dict[int, asyncio.Queue[BotEvent]] = {}
+        self.last_update_id = 0
+        self.last_message_id = 0
+        self.runner: web.AppRunner | None = None
+
+        self.app = web.Application(client_max_size=1024**3)
+        self.app.router.add_get("/file/bot{token}/{path:.+}", self.download)
+        self.app.router.add_route("*", "/bot{token}/{method}", self.call)
+
+    @property
+    def url(self) -> str:
+        host, port = self.runner.addresses[0][:2]
+        return f"http://{host}:{port}"
+
+    async def start(self) -> None:
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, "127.0.0.1", 0).start()
+
+    async def close(self) -> None:
+        await self.runner.cleanup()
+
+    def events(self, chat_id: int) -> asyncio.Queue[BotEvent]:
+        return self.chat_events.setdefault(chat_id, asyncio.Queue())
+
+    def push_event(self, event: BotEvent) -> None:
+        self.events(event.chat_id).put_nowait(event)
+
+    def send_document(self, user_id: int, filename: str, content: bytes) -> None:
+        """Queue an update with a document sent to the bot by ``user_id``."""
+        file_id = uuid4().hex
+        self.files[file_id] = content
+        self.last_update_id += 1
+        self.updates.append(
+            {
+                "update_id": self.last_update_id,
+                "message": {
+                    "message_id": self.last_update_id,
+                    "date": int(time.time()),
+                    "chat": {"id": user_id, "type": "private"},
+                    "from": {
+                        "id": user_id,
+                        "is_bot": False,
+                        "first_name": f"User {user_id}",
+                    },
+                    "document": {
+                        "file_id": file_id,
+                        "file_unique_id": file_id,
+                        "file_name": filename,
+                        "file_size": len(content),
+                    },
+                },
+            }
+        )
+        self.new_update.set()
+
+    def _message(self, chat_id: int, **fields) -> dict[str, Any]:
+        self.last_message_id += 1
+        return {
+            "message_id": self.last_message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+            **fields,
+        }
+
+    async def _get_updates(self, params) -> list[dict[str, Any]]:
+        offset = int(params.get("offset") or 0)
+        self.updates = [
+            update for update in self.updates if update["update_id"] >= offset
+        ]
+        if not self.updates:
+            self.new_update.clear()
+            try:
+                await asyncio.wait_for(
+                    self.new_update.wait(), float(params.get("timeout") or 0)
+                )
+            except asyncio.TimeoutError:
+                pass
+        return self.updates[: int(params.get("limit") or 100)]
+
+    async def call(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = await request.post()
+
+        if method == "getUpdates":
+            result = await self._get_updates(params)
+        elif method == "getMe":
+            result = BOT_USER
+        elif method == "getFile":
+            file_id = params["file_id"]
+            result = {
+                "file_id": file_id,
+                "file_unique_id": file_id,
+                "file_size": len(self.files[file_id]),
+                "file_path": f"documents/{file_id}",
+            }
+        elif method in ("sendMessage", "sendDocument"):
+            chat_id = int(params["chat_id"])
+            text = params.get("text")
+            self.push_event(BotEvent(method, chat_id, text))
+            if method == "sendMessage":
+                result = self._message(chat_id, text=text)
+            else:
+                file_id = uuid4().hex
+                result = self._message(
+                    chat_id, document={"file_id": file_id, "file_unique_id": file_id}
+                )
+        elif method == "editMessageText":
+            chat_id = int(params["chat_id"])
+            text = params.get("text")
+            self.push_event(BotEvent(method, chat_id, text))
+            result = self._message(chat_id, text=text)
+            result["message_id"] = int(params["message_id"])
+        else:
+            result = True
+
+        return web.json_response({"ok": True, "result": result})
+
+    async def download(self, request: web.Request) -> web.Response:
+        file_id = request.match_info["path"].rsplit("/", 1)[-1]
+        return web.Response(body=self.files.pop(file_id))
@@ -0,0 +1,153 @@
+"""Import time of every entry point, checked against a budget.
+
+Usage (from the bot directory):
+    python -m benchmarks.importtime --repeat 3 --top 5
+
+Every entry point is imported in a fresh interpreter with ``-X importtime``;
+the best cumulative time of ``--repeat`` runs is compared with its budget,
+scaled by ``--scale`` for slower or faster machines. Besides time, an entry
+point must not load the packages listed as forbidden for it, e.g. the admin
+panel must not load the ML stack. Exits with status 1 on any violation.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from collections import Counter
+from dataclasses import dataclass, field
+
+ML_STACK = ("langchain_core", "langchain_openai", "langchain_groq", "ollama")
+
+
+@dataclass
+class EntryPoint:
+    module: str
+    budget_ms: float
+    forbidden: tuple[str, ...]
+    env: dict[str, str] = field(default_factory=dict)
+    name: str = ""
+
+    def __post_init__(self):
+        self.name = self.name or self.module
+
+
+ENTRY_POINTS = [
+    EntryPoint(
+        "entrypoints.bot",
+        300,
+        ("aiogram", "fastapi", "sqladmin", "sqlalchemy", *ML_STACK),
+    ),
+    EntryPoint(
+        "entrypoints.worker",
+        900,
+        ("aiogram", "fastapi", "sqladmin", *ML_STACK),
+    ),
+    EntryPoint(
+        "entrypoints.admin",
+        1200,
+        ("aiogram", "reportlab", *ML_STACK),
+    ),
+    EntryPoint(
+        "entrypoints.api",
+        1400,
+        ("aiogram", "sqladmin", *ML_STACK),
+        env={"IS_WEBHOOK": "false"},
+    ),
+    EntryPoint(
+        "entrypoints.api",
+        5000,
+        ("sqladmin", *ML_STACK),
+        env={"IS_WEBHOOK": "true"},
+        name="entrypoints.api (webhook)",
+    ),
+    EntryPoint(
+        "main",
+        1800,
+        ("aiogram", *ML_STACK),
+        env={"IS_WEBHOOK": "false"},
+    ),
+]
+
+
+@dataclass
+class ImportProfile:
+    cumulative_us: int
+    self_us: Counter[str]
+
+
+def profile_import(entry_point: EntryPoint) -> ImportProfile:
+    """Import ``entry_point`` in a fresh interpreter and parse ``-X importtime``."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {entry_point.module}"],
+        capture_output=True,
+        text=True,
+        env={**os.environ, **entry_point.env},
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+
+    cumulative_us = 0
+    self_us = Counter()
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or line.endswith("imported package"):
+            continue
+        own, cumulative, name = line.removeprefix("import time:").split("|")
+        name = name.strip()
+        self_us[name] += int(own)
+        if name == entry_point.module:
+            cumulative_us = int(cumulative)
+    return ImportProfile(cumulative_us, self_us)
+
+
+def top_packages(profile: ImportProfile, count: int) -> list[tuple[str, int]]:
+    packages = Counter()
+    for name, own in profile.self_us.items():
+        packages[name.split(".", 1)[0]] += own
+    return packages.most_common(count)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scale", type=float, default=1.0, help="budget multiplier")
+    parser.add_argument(
+        "--top", type=int, default=0, help="show the slowest top-level packages"
+    )
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'entry point':<28} {'best, ms':>9} {'budget, ms':>11}  status")
+    for entry_point in ENTRY_POINTS:
+        profiles = [profile_import(entry_point) for _ in range(args.repeat)]
+        best = min(profiles, key=lambda profile: profile.cumulative_us)
+        budget_ms = entry_point.budget_ms * args.scale
+        loaded = sorted(
+            package
+            for package in entry_point.forbidden
+            if any(
+                name == package or name.startswith(f"{package}.")
+                for name in best.self_us
+            )
+        )
+        problems = []
+        if best.cumulative_us / 1000 > budget_ms:
+            problems.append("over budget")
+        if loaded:
+            problems.append(f"loads {', '.join(loaded)}")
+        failed = failed or bool(problems)
+
+        print(
+            f"{entry_point.name:<28} {best.cumulative_us / 1000:>9.0f} "
+            f"{budget_ms:>11.0f}  {'; '.join(problems) or 'ok'}"
+        )
+        for package, own in top_packages(best, args.top):
+            print(f"    {package:<24} {own / 1000:>9.0f}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
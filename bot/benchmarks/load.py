@@ -0,0 +1,436 @@
+"""Load test of concurrent uploads through Telegram and the HTTP API.
+
+Usage (from the bot directory):
+    python -m benchmarks.load --users 1 5 10 25 --uploads 3 \\
+        --channel both --latency lognormal:0.5,0.4 --chart load.svg
+
+Every simulated user uploads ``--uploads`` archives one after another,
+either as a document sent to the bot or as ``POST /api/upload/``. The bot
+runs in this process with the dispatcher of ``entrypoints.telegram`` and
+polls a fake Bot API (``benchmarks.fake_telegram``); ``entrypoints.api`` is
+served by uvicorn on a free port. LLM calls go to ``benchmarks.fake_llm``.
+Redis and the database come from ``../.env`` as usual.
+
+Queueing delay is the time from sending an upload until the bot
+acknowledges it or the app starts the request; latency lasts until the
+report link or the response. CPU, RSS, thread count and event loop lag are
+sampled for the whole process, fake LLM excluded.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from uuid import uuid4
+
+from aiohttp import ClientSession, ClientTimeout, FormData
+from benchmarks import fake_llm
+from benchmarks.fake_telegram import BotEvent, FakeTelegramAPI
+from benchmarks.review import start_fake_llm
+from benchmarks.synthetic_project import generate_project, zip_project
+from markupsafe import escape
+
+CHANNELS = ("telegram", "http", "both")
+TOKEN = "123456:load-test"
+ARCHIVE_NAME = "project.zip"
+
+
+@dataclass
+class Upload:
+    channel: str
+    ok: bool
+    queue_delay: float | None
+    latency: float
+
+
+@dataclass
+class ResourceSampler:
+    interval: float = 0.25
+    cpu: list[float] = field(default_factory=list)
+    rss: list[float] = field(default_factory=list)
+    threads: int = 0
+    lag: float = 0.0
+
+    @staticmethod
+    def _rss() -> float:
+        try:
+            with open("/proc/self/statm") as f:
+                pages = int(f.read().split()[1])
+            return pages * os.sysconf("SC_PAGE_SIZE")
+        except OSError:
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    async def run(self) -> None:
+        times, wall = os.times(), time.perf_counter()
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self.lag = max(self.lag, now - wall - self.interval)
+            cpu = os.times()
+            busy = cpu.user + cpu.system - times.user - times.system
+            self.cpu.append(100 * busy / (now - wall))
+            self.rss.append(self._rss())
+            self.threads = max(self.threads, threading.active_count())
+            times, wall = cpu, now
+
+
+class TimedApp:
+    """ASGI wrapper remembering when each ``X-Load-Id`` request started."""
+
+    def __init__(self, app):
+        self.app = app
+        self.started: dict[str, float] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            for name, value in scope["headers"]:
+                if name == b"x-load-id":
+                    self.started[value.decode()] = time.perf_counter()
+        await self.app(scope, receive, send)
+
+
+async def telegram_upload(
+    api: FakeTelegramAPI, user_id: int, archive: bytes, timeout: float
+) -> Upload:
+    events = api.events(user_id)
+    sent = time.perf_counter()
+    api.send_document(user_id, ARCHIVE_NAME, archive)
+
+    queue_delay, got_report = None, False
+    while True:
+        try:
+            event = await asyncio.wait_for(
+                events.get(), sent + timeout - time.perf_counter()
+            )
+        except asyncio.TimeoutError:
+            return Upload("telegram", False, queue_delay, time.perf_counter() - sent)
+        if queue_delay is None:
+            queue_delay = event.at - sent
+        if event.method == "error" or (event.text or "").startswith("Извините"):
+            return Upload("telegram", False, queue_delay, event.at - sent)
+        if event.method == "sendDocument":
+            got_report = True
+        elif got_report:
+            return Upload("telegram", True, queue_delay, event.at - sent)
+
+
+async def http_upload(
+    client: ClientSession, app: TimedApp, url: str, archive: bytes
+) -> Upload:
+    load_id = uuid4().hex
+    form = FormData()
+    form.add_field(
+        "file", archive, filename=ARCHIVE_NAME, content_type="application/zip"
+    )
+    sent = time.perf_counter()
+    try:
+        async with client.post(
+            f"{url}/api/upload/", data=form, headers={"X-Load-Id": load_id}
+        ) as response:
+            await response.read()
+            ok = response.status == 200
+    except (OSError, asyncio.TimeoutError):
+        ok = False
+    latency = time.perf_counter() - sent
+    started = app.started.pop(load_id, None)
+    queue_delay = None if started is None else started - sent
+    return Upload("http", ok, queue_delay, latency)
+
+
+async def run_user(
+    index: int, args: argparse.Namespace, env: dict, archive: bytes
+) -> list[Upload]:
+    channel = args.channel
+    if channel == "both":
+        channel = CHANNELS[index % 2]
+    uploads = []
+    for _ in range(args.uploads):
+        if channel == "telegram":
+            upload = await telegram_upload(
+                env["api"], env["first_user_id"] + index, archive, args.timeout
+            )
+        else:
+            upload = await http_upload(env["client"], env["app"], env["url"], archive)
+        uploads.append(upload)
+    return uploads
+
+
+def percentile(values: list[float], cut: int) -> float | None:
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[cut - 1]
+
+
+def summarize(
+    users: int,
+    channel: str,
+    uploads: list[Upload],
+    wall: float,
+    sampler: ResourceSampler,
+) -> dict:
+    queue = [upload.queue_delay for upload in uploads if upload.queue_delay is not None]
+    latency = [upload.latency for upload in uploads if upload.ok]
+    return {
+        "users": users,
+        "channel": channel,
+        "uploads": len(uploads),
+        "error_rate": sum(not upload.ok for upload in uploads) / len(uploads),
+        "queue_p50": percentile(queue, 50),
+        "queue_p95": percentile(queue, 95),
+        "latency_p50": percentile(latency, 50),
+        "latency_p95": percentile(latency, 95),
+        "uploads_per_second": len(latency) / wall,
+        "cpu_percent": statistics.fmean(sampler.cpu) if sampler.cpu else 0.0,
+        "peak_rss_mb": max(sampler.rss, default=0) / 1024**2,
+        "threads": sampler.threads,
+        "max_loop_lag": sampler.lag,
+    }
+
+
+async def run_step(
+    users: int, args: argparse.Namespace, env: dict, archive: bytes
+) -> list[dict]:
+    sampler = ResourceSampler()
+    sampling = asyncio.create_task(sampler.run())
+    started = time.perf_counter()
+    try:
+        results = await asyncio.gather(
+            *(run_user(index, args, env, archive) for index in range(users))
+        )
+    finally:
+        sampling.cancel()
+    wall = time.perf_counter() - started
+    # chat ids of the next step must not see late replies of this one
+    env["first_user_id"] += users
+
+    uploads = [upload for user_uploads in results for upload in user_uploads]
+    channels = sorted({upload.channel for upload in uploads})
+    return [
+        summarize(
+            users,
+            channel,
+            [upload for upload in uploads if upload.channel == channel],
+            wall,
+            sampler,
+        )
+        for channel in channels
+    ]
+
+
+def render_chart(summaries: list[dict]) -> str:
+    """Draw queueing delay, errors, CPU and RSS against the number of users."""
+    panels = (
+        ("Queueing delay p95, s", "queue_p95"),
+        ("Latency p95, s", "latency_p95"),
+        ("Error rate, %", "error_rate"),
+        ("CPU, %", "cpu_percent"),
+        ("RSS, MB", "peak_rss_mb"),
+    )
+    colors = {"telegram": "#2a9fd6", "http": "#e07b39"}
+    width, height, margin = 640, 170, 50
+    users = sorted({summary["users"] for summary in summaries})
+    x_max = max(users)
+    total_height = len(panels) * (height + margin) + margin
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width + 2 * margin}" '
+        f'height="{total_height}" font-family="Verdana" font-size="11">',
+        '<rect width="100%" height="100%" fill="white"/>',
+    ]
+    for number, (title, key) in enumerate(panels):
+        top = margin + number * (height + margin)
+        scale = 100 if key == "error_rate" else 1
+        values = [(summary[key] or 0) * scale for summary in summaries]
+        y_max = max(values, default=0) or 1
+        parts.append(f'<text x="{margin}" y="{top - 8}">{escape(title)}</text>')
+        parts.append(
+            f'<rect x="{margin}" y="{top}" width="{width}" height="{height}" '
+            'fill="none" stroke="#ccc"/>'
+        )
+        parts.append(
+            f'<text x="{margin - 4}" y="{top + 10}" text-anchor="end">'
+            f"{y_max:.3g}</text>"
+        )
+        for user_count in users:
+            x = margin + width * user_count / x_max
+            parts.append(
+                f'<text x="{x:.1f}" y="{top + height + 14}" '
+                f'text-anchor="middle">{user_count}</text>'
+            )
+        for channel, color in colors.items():
+            points = [
+                (summary["users"], (summary[key] or 0) * scale)
+                for summary in summaries
+                if summary["channel"] == channel
+            ]
+            if not points:
+                continue
+            coordinates = " ".join(
+                f"{margin + width * x / x_max:.1f},"
+                f"{top + height - height * y / y_max:.1f}"
+                for x, y in points
+            )
+            parts.append(
+                f'<polyline points="{coordinates}" fill="none" '
+                f'stroke="{color}" stroke-width="2"/>'
+            )
+    legend_y = total_height - 12
+    for number, (channel, color) in enumerate(colors.items()):
+        x = margin + number * 100
+        parts.append(
+            f'<rect x="{x}" y="{legend_y - 9}" width="10" height="10" '
+            f'fill="{color}"/><text x="{x + 14}" y="{legend_y}">{channel}</text>'
+        )
+    parts.append("</svg>")
+    return "\n".join(parts)
+
+
+def print_summary(summary: dict) -> None:
+    def seconds(value: float | None) -> str:
+        return f"{value:>8.2f}" if value is not None else f"{'-':>8}"
+
+    print(
+        f"{summary['users']:>5} {summary['channel']:>8} {summary['uploads']:>7} "
+        f"{100 * summary['error_rate']:>7.1f} "
+        f"{seconds(summary['queue_p50'])} {seconds(summary['queue_p95'])} "
+        f"{seconds(summary['latency_p50'])} {seconds(summary['latency_p95'])} "
+        f"{summary['uploads_per_second']:>6.2f} {summary['cpu_percent']:>6.0f} "
+        f"{summary['peak_rss_mb']:>7.0f} {summary['threads']:>7} "
+        f"{1000 * summary['max_loop_lag']:>8.0f}"
+    )
+
+
+async def run(args: argparse.Namespace, archive: bytes) -> list[dict]:
+    import uvicorn
+    from aiogram import Bot
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+    from aiogram.types import ErrorEvent
+
+    from entrypoints.api import app as web_app
+    from entrypoints.telegram import create_dispatcher
+    from services.history import history_writer
+
+    api = FakeTelegramAPI()
+    await api.start()
+    bot = Bot(
+        token=TOKEN,
+        session=AiohttpSession(api=TelegramAPIServer.from_base(api.url)),
+    )
+    dp = create_dispatcher()
+
+    @dp.errors()
+    async def report_error(event: ErrorEvent) -> None:
+        message = event.update.message
+        if message is not None:
+            api.push_event(BotEvent("error", message.chat.id, repr(event.exception)))
+
+    app = TimedApp(web_app)
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning")
+    )
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    host, port = server.servers[0].sockets[0].getsockname()[:2]
+
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False))
+    client = ClientSession(timeout=ClientTimeout(total=args.timeout))
+    env = {
+        "api": api,
+        "app": app,
+        "client": client,
+        "url": f"http://{host}:{port}",
+        "first_user_id": 1000,
+    }
+    summaries = []
+    try:
+        for users in args.users:
+            for summary in await run_step(users, args, env, archive):
+                summaries.append(summary)
+                if args.json:
+                    print(json.dumps(summary))
+                else:
+                    print_summary(summary)
+    finally:
+        await client.close()
+        await dp.stop_polling()
+        await polling
+        await bot.session.close()
+        await history_writer.close()
+        server.should_exit = True
+        await serving
+        await api.close()
+    return summaries
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--uploads", type=int, default=3, help="uploads per user")
+    parser.add_argument("--files", type=int, default=20, help="files per project")
+    parser.add_argument("--channel", choices=CHANNELS, default="both")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--llm-url", help="use a running benchmarks.fake_llm")
+    parser.add_argument("--chart", help="write an SVG chart to this path")
+    parser.add_argument("--json", action="store_true", help="print JSON lines")
+    fake_llm.add_arguments(parser)
+    args = parser.parse_args()
+    try:
+        fake_llm.parse_latency(args.latency)
+    except ValueError as e:
+        parser.error(str(e))
+
+    server = None
+    if args.llm_url is None:
+        server, args.llm_url = start_fake_llm(args)
+    # ml.factory reads the Mistral endpoint from the environment
+    os.environ["EVRAZ_BASE_URL"] = args.llm_url
+    os.environ["EVRAZ_GPT_KEY"] = "benchmark"
+    try:
+        with tempfile.TemporaryDirectory() as project:
+            generate_project(project, args.files, args.seed)
+            archive = zip_project(project).getvalue()
+
+        if not args.json:
+            header = (
+                "users",
+                "channel",
+                "uploads",
+                "errors%",
+                "queue50",
+                "queue95",
+                "lat50",
+                "lat95",
+                "up/s",
+                "CPU%",
+                "RSS MB",
+                "threads",
+                "lag, ms",
+            )
+            print(
+                "{:>5} {:>8} {:>7} {:>7} {:>8} {:>8} {:>8} {:>8} {:>6} {:>6} "
+                "{:>7} {:>7} {:>8}".format(*header)
+            )
+        summaries = asyncio.run(run(args, archive))
+        if args.chart:
+            with open(args.chart, "w") as f:
+                f.write(render_chart(summaries))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Compare report PDF backends on a large synthetic review.
+
+Usage (from the bot directory):
+    python -m benchmarks.pdf_backends --comments 1000 --repeat 3
+
+Every render runs in a fresh subprocess so peak RSS is not shared between
+backends; wkhtmltopdf memory is counted through RUSAGE_CHILDREN.
+"""
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from uuid import uuid4
+
+from schemas.review import ReviewSchema
+
+BACKENDS = ("wkhtmltopdf", "reportlab")
+TITLES = [
+    "Недопустимые зависимости",
+    "Архитектурные ошибки",
+    "Логирование",
+    "Работа с данными",
+]
+
+
+def make_review(comments: int, window: int = 9) -> ReviewSchema:
+    code_comments = []
+    for index in range(comments):
+        start = 10 + index % 300
+        code_comments.append(
+            {
+                "title": TITLES[1 + index % 3],
+                "lines": [
+                    {
+                        "order": start + offset,
+                        "text": f"    value_{offset} = compute(item, limit={index})\n",
+                    }
+                    for offset in range(window)
+                ],
+                "start_string_number": start,
+                "end_string_number": start + 2,
+                "filepath": f"app/module_{index % 50}/service_{index % 7}.py",
+                "comment": f"Замечание {index}: используйте логгер вместо print.",
+                "suggestion": (
+                    "```python\nlogger = logging.getLogger(__name__)\n"
+                    f"logger.info('Item %s processed', {index})\n```"
+                    if index % 2
+                    else None
+                ),
+            }
+        )
+    return ReviewSchema(
+        id=uuid4(),
+        titles=TITLES,
+        code_comments=code_comments,
+        project_comments=[{"title": TITLES[0], "comment": "  - freenit\n"}],
+    )
+
+
+def render_once(backend: str, comments: int) -> dict:
+    from services.pdf_writer import write_review_pdf
+    from services.renderer import _html_to_pdf, pdf_renderer
+
+    review = make_review(comments)
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        pdf_path = os.path.join(tmpdirname, "report.pdf")
+        started = time.perf_counter()
+        if backend == "reportlab":
+            write_review_pdf("benchmark.zip", "01.01.2025, 00:00:00", review, pdf_path)
+        else:
+            html_path = os.path.join(tmpdirname, "output.html")
+            with open(html_path, "w", encoding="utf-8") as f:
+                f.write(pdf_renderer.render_html("benchmark.zip", review))
+            _html_to_pdf(html_path, pdf_path)
+        elapsed = time.perf_counter() - started
+        size = os.path.getsize(pdf_path)
+
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return {
+        "seconds": elapsed,
+        "bytes": size,
+        "peak_rss_mb": max(own, children) / 1024,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--comments", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--backends", nargs="+", default=BACKENDS, choices=BACKENDS)
+    parser.add_argument("--single", choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(render_once(args.single, args.comments)))
+        return
+
+    header = ("backend", "median, s", "min, s", "size, KB", "RSS, MB")
+    print("{:<12} {:>10} {:>8} {:>9} {:>8}".format(*header))
+    for backend in args.backends:
+        runs = []
+        for _ in range(args.repeat):
+            completed = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.pdf_backends",
+                    "--single",
+                    backend,
+                    "--comments",
+                    str(args.comments),
+                ],
+                capture_output=True,
+                text=True,
+            )
+            if completed.returncode != 0:
+                error = completed.stderr.strip().splitlines()[-1]
+                print(f"{backend:<12} failed: {error}")
+                break
+            runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+        if not runs:
+            continue
+        seconds = [run["seconds"] for run in runs]
+        print(
+            f"{backend:<12} {statistics.median(seconds):>10.2f} {min(seconds):>8.2f} "
+            f"{runs[-1]['bytes'] / 1024:>9.0f} "
+            f"{max(run['peak_rss_mb'] for run in runs):>8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""End-to-end review benchmark against a local fake LLM server.
+
+Usage (from the bot directory):
+    python -m benchmarks.review --files 10 100 1000 --repeat 3 \\
+        --latency lognormal:0.5,0.4 --error-rate 0.01
+
+Targets:
+    reviewer     ``CodeReviewer.invoke`` on an unpacked project
+    handle_file  ``services.review.handle_file`` on a zip archive, which also
+                 needs the bot settings and the database of ``../.env``
+
+Every project size runs in a fresh subprocess so peak RSS is not shared
+between sizes. The fake server (``benchmarks.fake_llm``) runs in its own
+process and counts the LLM calls.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from benchmarks import fake_llm
+from benchmarks.synthetic_project import generate_project, zip_project
+
+TARGETS = ("reviewer", "handle_file")
+PROVIDERS = ("mistral", "openai")
+
+
+def fetch_stats(llm_url: str) -> dict[str, int]:
+    with urllib.request.urlopen(f"{llm_url}/stats") as response:
+        return json.load(response)
+
+
+def create_llm(provider: str, llm_url: str):
+    if provider == "openai":
+        from langchain_openai import ChatOpenAI
+
+        return ChatOpenAI(
+            model="gpt-4o",
+            api_key="benchmark",
+            base_url=f"{llm_url}/v1",
+            temperature=0,
+            max_retries=0,
+        )
+
+    from ml.evraz_model_wrapper import ChatMistralNemo
+
+    return ChatMistralNemo(
+        base_url=llm_url,
+        api_key="benchmark",
+        model_name="mistral-nemo-instruct-2407",
+        temperature=0,
+    )
+
+
+def run_reviewer(
+    project: str, repeat: int, concurrency: int, provider: str, llm_url: str
+) -> list[float]:
+    from ml.factory import create_code_reviewer
+
+    def review() -> float:
+        reviewer = create_code_reviewer(create_llm(provider, llm_url))
+        started = time.perf_counter()
+        reviewer.invoke(project, ".py")
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        return list(executor.map(lambda _: review(), range(repeat)))
+
+
+def run_handle_file(
+    project: str, repeat: int, concurrency: int, llm_url: str
+) -> list[float]:
+    # ml.factory reads the Mistral endpoint from the environment
+    os.environ["EVRAZ_BASE_URL"] = llm_url
+    os.environ["EVRAZ_GPT_KEY"] = "benchmark"
+    from services.llm_ledger import llm_call_writer
+    from services.review import handle_file
+
+    archive = zip_project(project).getvalue()
+
+    async def review(semaphore: asyncio.Semaphore) -> float:
+        async with semaphore:
+            with tempfile.TemporaryDirectory() as tmpdirname:
+                started = time.perf_counter()
+                await handle_file(BytesIO(archive), False, "benchmark.zip", tmpdirname)
+                return time.perf_counter() - started
+
+    async def main() -> list[float]:
+        semaphore = asyncio.Semaphore(concurrency)
+        try:
+            return await asyncio.gather(*(review(semaphore) for _ in range(repeat)))
+        finally:
+            await llm_call_writer.close()
+
+    return asyncio.run(main())
+
+
+def run_once(args: argparse.Namespace, files: int) -> dict:
+    with tempfile.TemporaryDirectory() as project:
+        generate_project(project, files, args.seed)
+        stats_before = fetch_stats(args.llm_url)
+        started = time.perf_counter()
+        if args.target == "reviewer":
+            seconds = run_reviewer(
+                project, args.repeat, args.concurrency, args.provider, args.llm_url
+            )
+        else:
+            seconds = run_handle_file(
+                project, args.repeat, args.concurrency, args.llm_url
+            )
+        wall = time.perf_counter() - started
+        stats_after = fetch_stats(args.llm_url)
+
+    calls = {
+        key: stats_after.get(key, 0) - stats_before.get(key, 0) for key in stats_after
+    }
+    return {
+        "files": files,
+        "seconds": seconds,
+        "wall": wall,
+        "llm_calls": calls,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def percentiles(seconds: list[float]) -> tuple[float, float, float]:
+    if len(seconds) == 1:
+        return seconds[0], seconds[0], seconds[0]
+    cuts = statistics.quantiles(seconds, n=100, method="inclusive")
+    return cuts[49], cuts[94], cuts[98]
+
+
+def summarize(run: dict, repeat: int) -> dict:
+    p50, p95, p99 = percentiles(run["seconds"])
+    reviewed_files = run["files"] * repeat
+    calls = run["llm_calls"]
+    return {
+        "files": run["files"],
+        "p50": p50,
+        "p95": p95,
+        "p99": p99,
+        "files_per_second": reviewed_files / run["wall"],
+        "llm_calls_per_file": calls.get("requests", 0) / reviewed_files,
+        "llm_errors": calls.get("errors", 0),
+        "llm_malformed": calls.get("malformed", 0),
+        "peak_rss_mb": run["peak_rss_mb"],
+    }
+
+
+def start_fake_llm(args: argparse.Namespace) -> tuple[subprocess.Popen, str]:
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.fake_llm",
+            "--latency",
+            args.latency,
+            "--error-rate",
+            str(args.error_rate),
+            "--malformed-rate",
+            str(args.malformed_rate),
+            "--seed",
+            str(args.seed),
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    line = server.stdout.readline().strip()
+    if not line.startswith("FAKE_LLM_URL="):
+        server.kill()
+        raise RuntimeError("Fake LLM server did not start")
+    return server, line.split("=", 1)[1]
+
+
+def child_command(args: argparse.Namespace, files: int) -> list[str]:
+    return [
+        sys.executable,
+        "-m",
+        "benchmarks.review",
+        "--single",
+        str(files),
+        "--llm-url",
+        args.llm_url,
+        "--target",
+        args.target,
+        "--provider",
+        args.provider,
+        "--repeat",
+        str(args.repeat),
+        "--concurrency",
+        str(args.concurrency),
+        "--seed",
+        str(args.seed),
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--files", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--target", choices=TARGETS, default="reviewer")
+    parser.add_argument("--provider", choices=PROVIDERS, default="mistral")
+    parser.add_argument("--llm-url", help="use a running benchmarks.fake_llm")
+    parser.add_argument("--json", action="store_true", help="print JSON lines")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    fake_llm.add_arguments(parser)
+    args = parser.parse_args()
+    try:
+        fake_llm.parse_latency(args.latency)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.single:
+        print(json.dumps(run_once(args, args.single)))
+        return
+
+    server = None
+    if args.llm_url is None:
+        server, args.llm_url = start_fake_llm(args)
+    try:
+        if not args.json:
+            header = (
+                "files",
+                "p50, s",
+                "p95, s",
+                "p99, s",
+                "files/s",
+                "calls/file",
+                "errors",
+                "malformed",
+                "RSS, MB",
+            )
+            print(
+                "{:>6} {:>8} {:>8} {:>8} {:>8} {:>10} {:>7} {:>9} {:>8}".format(*header)
+            )
+        for files in args.files:
+            completed = subprocess.run(
+                child_command(args, files), capture_output=True, text=True
+            )
+            if completed.returncode != 0:
+                error = completed.stderr.strip().splitlines()[-1]
+                print(f"{files:>6} failed: {error}")
+                continue
+            run = json.loads(completed.stdout.strip().splitlines()[-1])
+            summary = summarize(run, args.repeat)
+            if args.json:
+                print(json.dumps(summary))
+                continue
+            print(
+                f"{summary['files']:>6} {summary['p50']:>8.2f} "
+                f"{summary['p95']:>8.2f} {summary['p99']:>8.2f} "
+                f"{summary['files_per_second']:>8.2f} "
+                f"{summary['llm_calls_per_file']:>10.2f} "
+                f"{summary['llm_errors']:>7} {summary['llm_malformed']:>9} "
+                f"{summary['peak_rss_mb']:>8.0f}"
+            )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""Serialization cost of a large review, from JSONB to the API response.
+
+Usage (from the bot directory):
+    python -m benchmarks.serialization --comments 5000 --repeat 5
+
+Compares the standard json module with the orjson serializer of the
+engine for the JSONB columns of a report, and three ways to turn stored
+comments into a response: validated schemas, ``model_construct`` and the
+plain data of ``services.review.comment_data`` encoded with orjson.
+Reports the best time and the peak memory allocated by each variant.
+"""
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from typing import Any, Callable
+from uuid import UUID
+
+import orjson
+from database import ReviewComment
+from database.connection import json_serializer
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from schemas.review import (
+    CodeCommentSchema,
+    LineSchema,
+    ProjectCommentSchema,
+    ReviewSchema,
+)
+from services.review import comment_data
+
+TITLES = ["Архитектура", "Логирование", "Работа с данными", "Структура проекта"]
+WINDOW = 9
+REVIEW_ID = UUID("6f1c0a52-7d1e-4b8e-9a43-3d2f0e5b9c11")
+
+
+def generate_review(comments: int, files: int, seed: int = 0) -> dict[str, Any]:
+    """Return stored report data: JSONB columns plus comment rows."""
+    rng = random.Random(seed)
+    snippets = {f"src/module_{number}.py": {} for number in range(files)}
+    rows = []
+    for _ in range(comments):
+        filepath = rng.choice(list(snippets))
+        first_line = rng.randrange(1, 2000)
+        for order in range(first_line, first_line + WINDOW):
+            snippets[filepath][
+                str(order)
+            ] = f"        result['step_{order}'] = item_id * {order} % limit\n"
+        rows.append(
+            {
+                "title": rng.choice(TITLES),
+                "filepath": filepath,
+                "first_line": first_line,
+                "last_line": first_line + WINDOW - 1,
+                "start_string_number": first_line + 3,
+                "end_string_number": first_line + 5,
+                "comment": "Этот участок кода нужно перенести в другой слой. " * 3,
+                "suggestion": "```python\nlogger.info('%s', value)\n```",
+            }
+        )
+    return {
+        "titles": TITLES,
+        "project_comments": [
+            {"title": "Структура проекта", "comment": f"В корне нет файла {name}"}
+            for name in (".editorconfig", ".gitattributes", "README.md")
+        ],
+        "snippets": snippets,
+        "rows": rows,
+    }
+
+
+def _comments(data: dict[str, Any]) -> list[ReviewComment]:
+    return [ReviewComment(**row) for row in data["rows"]]
+
+
+def _lines(comment: ReviewComment, snippet_lines: dict[str, str]) -> list[tuple]:
+    return [
+        (order, snippet_lines.get(str(order), ""))
+        for order in range(comment.first_line, comment.last_line + 1)
+    ]
+
+
+def build_validated(data: dict[str, Any], comments: list[ReviewComment]):
+    return ReviewSchema(
+        id=REVIEW_ID,
+        titles=data["titles"],
+        code_comments=[
+            CodeCommentSchema(
+                title=comment.title,
+                lines=[
+                    LineSchema(order=order, text=text)
+                    for order, text in _lines(
+                        comment, data["snippets"][comment.filepath]
+                    )
+                ],
+                start_string_number=comment.start_string_number,
+                end_string_number=comment.end_string_number,
+                filepath=comment.filepath,
+                comment=comment.comment,
+                suggestion=comment.suggestion,
+            )
+            for comment in comments
+        ],
+        project_comments=data["project_comments"],
+    )
+
+
+def build_constructed(data: dict[str, Any], comments: list[ReviewComment]):
+    return ReviewSchema.model_construct(
+        id=REVIEW_ID,
+        titles=data["titles"],
+        code_comments=[
+            CodeCommentSchema.model_construct(
+                title=comment.title,
+                lines=[
+                    LineSchema.model_construct(order=order, text=text)
+                    for order, text in _lines(
+                        comment, data["snippets"][comment.filepath]
+                    )
+                ],
+                start_string_number=comment.start_string_number,
+                end_string_number=comment.end_string_number,
+                filepath=comment.filepath,
+                comment=comment.comment,
+                suggestion=comment.suggestion,
+            )
+            for comment in comments
+        ],
+        project_comments=[
+            ProjectCommentSchema.model_construct(**item)
+            for item in data["project_comments"]
+        ],
+    )
+
+
+def build_data(data: dict[str, Any], comments: list[ReviewComment]):
+    return {
+        "id": REVIEW_ID,
+        "titles": data["titles"],
+        "code_comments": [
+            comment_data(comment, data["snippets"][comment.filepath])
+            for comment in comments
+        ],
+        "project_comments": data["project_comments"],
+    }
+
+
+def measure(function: Callable[[], Any], repeat: int) -> tuple[float, float]:
+    """Return the best time in seconds and the peak allocation in MB."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 1024**2
+
+
+def variants(data: dict[str, Any]) -> dict[str, Callable[[], Any]]:
+    jsonb = {"snippets": data["snippets"], "project": data["project_comments"]}
+    encoded = json.dumps(jsonb)
+    comments = _comments(data)
+    review = build_validated(data, comments)
+    review_data = build_data(data, comments)
+    return {
+        "jsonb encode: json": lambda: json.dumps(jsonb),
+        "jsonb encode: orjson": lambda: json_serializer(jsonb),
+        "jsonb decode: json": lambda: json.loads(encoded),
+        "jsonb decode: orjson": lambda: orjson.loads(encoded),
+        "build: validated": lambda: build_validated(data, comments),
+        "build: model_construct": lambda: build_constructed(data, comments),
+        "build: plain data": lambda: build_data(data, comments),
+        "encode: JSONResponse": lambda: JSONResponse(jsonable_encoder(review)),
+        "encode: model_dump_json": lambda: review.model_dump_json(),
+        "encode: orjson data": lambda: orjson.dumps(review_data),
+        "total: validated": lambda: build_validated(data, comments).model_dump_json(),
+        "total: plain data": lambda: orjson.dumps(build_data(data, comments)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--comments", type=int, default=5000)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    data = generate_review(args.comments, args.files, args.seed)
+    print(f"{'variant':<28} {'best, ms':>9} {'peak, MB':>9}")
+    for name, function in variants(data).items():
+        seconds, peak = measure(function, args.repeat)
+        print(f"{name:<28} {1000 * seconds:>9.1f} {peak:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Generate a synthetic hexagonal Python project to review.
+
+Usage (from the bot directory):
+    python -m benchmarks.synthetic_project /tmp/project --files 500
+
+The layout follows what the reviewer expects: ``application``, ``adapters``
+and ``composites`` packages of a backend component, plus tests. Files mix
+clean code with prints, f-string logging and raw SQL so every validator has
+something to report.
+"""
+
+import argparse
+import os
+import random
+import zipfile
+from io import BytesIO
+from pathlib import Path
+
+FILES_PER_PACKAGE = 20
+PACKAGE = "shop"
+BACKEND = Path("components") / "backend" / PACKAGE
+# layer, subpackage, class suffix, weight
+LAYOUT = (
+    ("application", "entities", "Entity", 3),
+    ("application", "services", "Service", 4),
+    ("application", "dto", "DTO", 2),
+    ("application", "interfaces", "Repository", 2),
+    ("adapters", "database/repositories", "SQLRepository", 3),
+    ("adapters", "http/controllers", "Controller", 3),
+    ("adapters", "clients", "Client", 1),
+    ("composites", "", "App", 1),
+    ("tests", "", "Test", 1),
+)
+IMPORTS = (
+    "import json",
+    "from datetime import datetime",
+    "from typing import Any",
+    "import attrs",
+    "import sqlalchemy as sa",
+    "import falcon",
+    "import requests",
+    "import redis",
+    "import httpx",
+)
+ROOT_FILES = {
+    ".gitignore": "__pycache__/\n*.pyc\n.env\n",
+    "README.md": "# Shop\n\nSynthetic project for review benchmarks.\n",
+    "components/backend/setup.py": (
+        "from setuptools import find_packages, setup\n\n"
+        "setup(name='shop', packages=find_packages())\n"
+    ),
+    "components/backend/pyproject.toml": "[tool.isort]\nprofile = 'black'\n",
+}
+
+
+def _method(rng: random.Random, name: str, index: int) -> list[str]:
+    body = [f"    def {name}(self, item_id: int, limit: int = {index % 50 + 10}):"]
+    style = rng.randrange(6)
+    if style == 0:
+        body.append("        print('processing', item_id)")
+    elif style == 1:
+        body.append("        logging.info(f'Item {item_id} processed')")
+    elif style == 2:
+        body.append(
+            "        rows = self.session.execute("
+            f"f'SELECT TOP {{limit}} * FROM items_{index}')"
+        )
+        body.append("        return [dict(row) for row in rows]")
+    else:
+        body.append("        logger.info('Item %s processed', item_id)")
+    body.append("        result = {'id': item_id, 'limit': limit}")
+    for step in range(rng.randrange(2, 8)):
+        body.append(f"        result['step_{step}'] = item_id * {step} % limit")
+    body.append("        return result")
+    return body
+
+
+def render_module(rng: random.Random, class_name: str, index: int) -> str:
+    lines = ["import logging", *rng.sample(IMPORTS, rng.randrange(1, 5))]
+    lines += ["", "logger = logging.getLogger(__name__)", "", ""]
+    for number in range(rng.randrange(1, 3)):
+        lines.append(f"class {class_name}{index}x{number}:")
+        lines.append(f'    """{class_name} number {index}."""')
+        lines.append("")
+        lines.append("    def __init__(self, session=None):")
+        lines.append("        self.session = session")
+        for method in range(rng.randrange(2, 7)):
+            lines.append("")
+            lines += _method(rng, f"handle_{method}", index + method)
+        lines += ["", ""]
+    return "\n".join(lines).rstrip() + "\n"
+
+
+def generate_project(root: str | Path, files: int, seed: int = 0) -> list[Path]:
+    """Write ``files`` Python modules under ``root``, return their paths."""
+    root = Path(root)
+    rng = random.Random(seed)
+    weights = [weight for *_, weight in LAYOUT]
+    counters = [0] * len(LAYOUT)
+
+    for name, content in ROOT_FILES.items():
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_text(content)
+
+    paths = []
+    for index in range(files):
+        slot = rng.choices(range(len(LAYOUT)), weights)[0]
+        layer, subpackage, class_name, _ = LAYOUT[slot]
+        package = counters[slot] // FILES_PER_PACKAGE
+        counters[slot] += 1
+        if layer == "tests":
+            directory = Path("tests") / f"suite_{package}"
+        else:
+            directory = BACKEND / layer / subpackage / f"module_{package}"
+        path = root / directory / f"{class_name.lower()}_{index}.py"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(render_module(rng, class_name, index))
+        paths.append(path)
+    return paths
+
+
+def zip_project(root: str | Path) -> BytesIO:
+    archive = BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        for directory, _, names in os.walk(root):
+            for name in names:
+                path = Path(directory) / name
+                zip_file.write(path, path.relative_to(root))
+    archive.seek(0)
+    return archive
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("root")
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    paths = generate_project(args.root, args.files, args.seed)
+    print(f"{len(paths)} files written to {args.root}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,31 @@
 from database.connection import (
     Base,
-    Session,
+    async_session_factory,
     engine,
-    postgres_connection,
     redis_connection,
 )
-from database.models import Chat, History, Report, User
+from database.models import (
+    Chat,
+    History,
+    LLMCall,
+    Report,
+    ReviewComment,
+    ReviewProfile,
+    ReviewSnippet,
+    User,
+)
 
 __all__ = (
     "Base",
     "User",
     "Chat",
     "History",
+    "LLMCall",
     "Report",
-    "postgres_connection",
+    "ReviewComment",
+    "ReviewProfile",
+    "ReviewSnippet",
     "engine",
+    "async_session_factory",
     "redis_connection",
-    "Session",
 )
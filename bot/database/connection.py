@@ -1,78 +1,101 @@
 from datetime import datetime
-from typing import Annotated, AsyncGenerator
+from typing import Any
 
-from fastapi import Depends
-from redis.client import Redis
+import orjson
+from database.pool import InstrumentedAsyncPool
+from redis.asyncio import BlockingConnectionPool, Redis
+from redis.asyncio.client import PubSub
 from settings import SQLALCHEMY_ORM_CONFIG, redis_settings
 from sqlalchemy import DateTime, func
 from sqlalchemy.ext.asyncio import (
     AsyncAttrs,
-    AsyncConnection,
-    AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
-engine = create_async_engine(**SQLALCHEMY_ORM_CONFIG)
 
+def json_serializer(value: Any) -> str:
+    # orjson rejects non-string keys by default, the json module converts them
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
 
-class PostgresConnection:
-    def __init__(self):
-        self.connection: AsyncConnection = engine
-        self.engine = None
-
-    async def connect(self):
-        self.engine = create_async_engine(**SQLALCHEMY_ORM_CONFIG)
-        async_session_maker = async_sessionmaker(bind=self.engine)
-        self.connection = async_session_maker()
-        return self.engine
-
-    async def select(self, stmt):
-        return await self.connection.execute(stmt)
-
-    async def execute(self, *stmts):
-        result = []
-        try:
-            for stmt in stmts:
-                result.append(await self.connection.execute(stmt))
-            await self.connection.commit()
-        except Exception as e:
-            await self.connection.rollback()
-            raise e
-        return result if len(stmts) > 1 else result[0]
-
-    async def create_all(self):
-        async with self.engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
+
+engine = create_async_engine(
+    **SQLALCHEMY_ORM_CONFIG,
+    poolclass=InstrumentedAsyncPool,
+    json_serializer=json_serializer,
+    json_deserializer=orjson.loads,
+)
 
 
 class RedisConnection:
+    """One asyncio connection pool for caches and the aiogram FSM storage.
+
+    Values are returned as bytes; callers decode what they store. When every
+    connection is busy, callers wait up to ``REDIS_POOL_TIMEOUT`` seconds for
+    one instead of failing at once.
+    """
+
     def __init__(self):
-        self.connection = None
+        self.connection: Redis | None = None
 
     def connect(self):
-        redis = Redis(
-            host=redis_settings.REDIS_HOST,
-            port=redis_settings.REDIS_PORT,
-            db=2,
-            decode_responses=True,
+        if self.connection is not None:
+            return
+        self.connection = Redis(
+            connection_pool=BlockingConnectionPool(
+                host=redis_settings.REDIS_HOST,
+                port=redis_settings.REDIS_PORT,
+                db=redis_settings.REDIS_DB,
+                max_connections=redis_settings.REDIS_MAX_CONNECTIONS,
+                timeout=redis_settings.REDIS_POOL_TIMEOUT,
+            )
         )
-        self.connection = redis
 
-    def set_expire(self, key, value, ttl=60):
-        resp = self.connection.set(key, value)
-        self.connection.expire(key, ttl)
-        return resp
+    async def close(self):
+        if self.connection is not None:
+            await self.connection.aclose(close_connection_pool=True)
+            self.connection = None
+
+    async def get(self, key) -> bytes | None:
+        return await self.connection.get(key)
+
+    async def get_many(self, keys) -> list[bytes | None]:
+        if not keys:
+            return []
+        return await self.connection.mget(keys)
+
+    async def set_expire(self, key, value, ttl=60):
+        return await self.connection.set(key, value, ex=ttl)
 
-    def __setitem__(self, key, value):
-        return self.connection.set(key, value)
+    async def set_many_expire(self, items: dict, ttl=60):
+        async with self.connection.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                pipe.set(key, value, ex=ttl)
+            return await pipe.execute()
 
-    def __getitem__(self, item):
-        return self.connection.get(item)
+    async def delete(self, *keys):
+        return await self.connection.delete(*keys)
+
+    async def exists(self, key) -> bool:
+        return bool(await self.connection.exists(key))
+
+    async def get_list(self, key, start=0) -> list[bytes]:
+        return await self.connection.lrange(key, start, -1)
+
+    async def append_publish_expire(self, key, channel, values: list, ttl=60):
+        """Append ``values`` to the list ``key`` and publish each on ``channel``."""
+        async with self.connection.pipeline(transaction=False) as pipe:
+            pipe.rpush(key, *values)
+            pipe.expire(key, ttl)
+            for value in values:
+                pipe.publish(channel, value)
+            return await pipe.execute()
+
+    def pubsub(self) -> PubSub:
+        return self.connection.pubsub()
 
 
-postgres_connection = PostgresConnection()
 redis_connection = RedisConnection()
 
 
@@ -99,14 +122,3 @@ class Base(AsyncAttrs, DeclarativeBase):
 
 
 async_session_factory = async_sessionmaker(engine, expire_on_commit=False)
-
-
-async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
-    async_session: AsyncSession = async_session_factory()  # type: ignore
-    try:
-        yield async_session
-    finally:
-        await async_session.close()
-
-
-Session = Annotated[AsyncSession, Depends(get_async_session)]
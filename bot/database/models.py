@@ -1,8 +1,9 @@
+from datetime import datetime
 from typing import Any
 from uuid import UUID
 
 from database.connection import Base
-from sqlalchemy import ForeignKey, String
+from sqlalchemy import DateTime, ForeignKey, Index, String, Text, func
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -15,6 +16,7 @@ class User(Base):
     is_superuser: Mapped[bool] = mapped_column(default=False)
     is_active_conversation: Mapped[bool] = mapped_column(default=True)
     is_banned: Mapped[bool] = mapped_column(default=False)
+    profile_reviews: Mapped[bool] = mapped_column(default=False)
 
     histories: Mapped[list["History"]] = relationship(back_populates="user")
 
@@ -35,8 +37,17 @@ class Chat(Base):
 
 
 class History(Base):
+    """Partitioned by ``created_at`` month, see ``services.history``."""
+
     __tablename__ = "histories"
-    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
+    # partitioned tables need the partition key in the primary key, but ids
+    # still come from a sequence and stay unique on their own
+    __mapper_args__ = {"primary_key": ["id"]}
+    id: Mapped[int] = mapped_column(primary_key=True, index=True, autoincrement=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), primary_key=True
+    )
     user_id: Mapped[str] = mapped_column(ForeignKey("users.telegram_id"))
     user: Mapped["User"] = relationship(back_populates="histories")
     chat_id: Mapped[str] = mapped_column(ForeignKey("chats.id"))
@@ -51,6 +62,88 @@ class History(Base):
 class Report(Base):
     __tablename__ = "reports"
     id: Mapped[UUID] = mapped_column(primary_key=True, index=True)
-    pdf_file_path: Mapped[str] = mapped_column(String)
-    ml_response: Mapped[dict[str, Any]] = mapped_column(JSONB)
-    frontend_response: Mapped[dict[str, Any]] = mapped_column(JSONB)
+    filename: Mapped[str] = mapped_column(String, nullable=True)
+    pdf_file_path: Mapped[str] = mapped_column(String, nullable=True)
+    titles: Mapped[list[str]] = mapped_column(JSONB)
+    project_comments: Mapped[list[dict[str, Any]]] = mapped_column(JSONB)
+    source_sha256: Mapped[str] = mapped_column(String(64), nullable=True, index=True)
+
+    comments: Mapped[list["ReviewComment"]] = relationship(
+        back_populates="report", cascade="all, delete-orphan"
+    )
+    snippets: Mapped[list["ReviewSnippet"]] = relationship(
+        back_populates="report", cascade="all, delete-orphan"
+    )
+    profile: Mapped["ReviewProfile"] = relationship(
+        back_populates="report", cascade="all, delete-orphan"
+    )
+
+
+class ReviewSnippet(Base):
+    """Source lines of one file shared by all comments on that file."""
+
+    __tablename__ = "review_snippets"
+    report_id: Mapped[UUID] = mapped_column(
+        ForeignKey("reports.id", ondelete="CASCADE"), index=True
+    )
+    report: Mapped["Report"] = relationship(back_populates="snippets")
+    filepath: Mapped[str] = mapped_column(String)
+    lines: Mapped[dict[str, str]] = mapped_column(JSONB)
+
+
+class ReviewComment(Base):
+    __tablename__ = "review_comments"
+    __table_args__ = (
+        Index("ix_review_comments_report_id_id", "report_id", "id"),
+        Index("ix_review_comments_report_id_title", "report_id", "title"),
+        Index("ix_review_comments_report_id_filepath", "report_id", "filepath"),
+    )
+    report_id: Mapped[UUID] = mapped_column(
+        ForeignKey("reports.id", ondelete="CASCADE")
+    )
+    report: Mapped["Report"] = relationship(back_populates="comments")
+    title: Mapped[str] = mapped_column(String(255))
+    filepath: Mapped[str] = mapped_column(String)
+    start_string_number: Mapped[int]
+    end_string_number: Mapped[int]
+    first_line: Mapped[int]
+    last_line: Mapped[int]
+    comment: Mapped[str] = mapped_column(Text)
+    suggestion: Mapped[str] = mapped_column(Text, nullable=True)
+    snippet_id: Mapped[int] = mapped_column(
+        ForeignKey("review_snippets.id", ondelete="SET NULL"), nullable=True
+    )
+    snippet: Mapped["ReviewSnippet"] = relationship()
+
+
+class LLMCall(Base):
+    """Append-only ledger entry for one LLM request made during a review."""
+
+    __tablename__ = "llm_calls"
+    report_id: Mapped[UUID] = mapped_column(index=True)
+    model: Mapped[str] = mapped_column(String(255))
+    validator: Mapped[str] = mapped_column(String(255))
+    filepath: Mapped[str] = mapped_column(String, nullable=True)
+    prompt_bytes: Mapped[int]
+    input_tokens: Mapped[int]
+    output_tokens: Mapped[int]
+    latency: Mapped[float]
+    retries: Mapped[int]
+    status: Mapped[str] = mapped_column(String(32))
+    parse_success: Mapped[bool] = mapped_column(nullable=True)
+    cache_hit: Mapped[bool]
+
+
+class ReviewProfile(Base):
+    """Sampled CPU profile and top allocations of one review."""
+
+    __tablename__ = "review_profiles"
+    report_id: Mapped[UUID] = mapped_column(
+        ForeignKey("reports.id", ondelete="CASCADE"), unique=True
+    )
+    report: Mapped["Report"] = relationship(back_populates="profile")
+    trigger: Mapped[str] = mapped_column(String(32))
+    duration: Mapped[float]
+    samples: Mapped[int]
+    flamegraph_path: Mapped[str] = mapped_column(String)
+    allocations: Mapped[list[dict[str, Any]]] = mapped_column(JSONB, nullable=True)
@@ -0,0 +1,28 @@
+import time
+
+from prometheus_client import Gauge, Histogram
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+pool_checkout_seconds = Histogram(
+    "db_pool_checkout_seconds", "Time spent waiting for a pooled DB connection"
+)
+pool_size = Gauge("db_pool_size", "Connections the pool keeps open")
+pool_checked_out = Gauge("db_pool_checked_out", "Connections currently in use")
+pool_overflow = Gauge("db_pool_overflow", "Connections opened above pool_size")
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """Queue pool that reports checkout wait time and its occupancy."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        pool_size.set_function(self.size)
+        pool_checked_out.set_function(self.checkedout)
+        pool_overflow.set_function(lambda: max(self.overflow(), 0))
+
+    def _do_get(self):
+        started_at = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_checkout_seconds.observe(time.perf_counter() - started_at)
@@ -0,0 +1,8 @@
+"""Admin panel.
+
+Usage: uvicorn entrypoints.admin:app
+"""
+
+from entrypoints.web import create_app
+
+app = create_app(api=False)
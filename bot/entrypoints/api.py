@@ -0,0 +1,8 @@
+"""Review API, and the Telegram webhook when ``IS_WEBHOOK`` is set.
+
+Usage: uvicorn entrypoints.api:app
+"""
+
+from entrypoints.web import create_app
+
+app = create_app(admin=False)
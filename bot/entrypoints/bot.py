@@ -0,0 +1,46 @@
+"""Telegram bot.
+
+Usage: python -m entrypoints.bot
+
+Polls Telegram when ``IS_POLLING`` is set. With ``IS_WEBHOOK`` it registers
+the webhook and serves ``entrypoints.api`` with ``WEBAPP_WORKERS`` workers.
+
+The imports live in ``main``: uvicorn workers and PDF workers are spawned
+processes, which import the main module again before doing anything else.
+"""
+
+import asyncio
+import logging
+
+from settings import bot_settings
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    if bot_settings.IS_WEBHOOK:
+        import uvicorn
+        from entrypoints.telegram import set_webhook
+
+        asyncio.run(set_webhook())
+        uvicorn.run(
+            "entrypoints.api:app",
+            host=bot_settings.WEBAPP_HOST,
+            port=bot_settings.WEBAPP_PORT,
+            workers=bot_settings.WEBAPP_WORKERS,
+            proxy_headers=True,
+            forwarded_allow_ips="*",
+        )
+    elif bot_settings.IS_POLLING:
+        from entrypoints.telegram import run_polling
+        from prometheus_client import start_http_server
+
+        start_http_server(9091)
+        asyncio.run(run_polling())
+    else:
+        logger.error("Neither IS_POLLING nor IS_WEBHOOK is set")
+
+
+if __name__ == "__main__":
+    main()
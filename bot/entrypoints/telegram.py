@@ -0,0 +1,85 @@
+from aiogram import Bot, Dispatcher
+from aiogram.fsm.storage.redis import RedisStorage
+from api.telegram import wait_for_updates
+from database import engine, redis_connection
+from entrypoints.worker import start_background_jobs
+from fastapi import FastAPI
+from handlers import router as all_routers
+from middleware import UpdateTaskMiddleware
+from services.history import history_writer
+from services.llm_ledger import llm_call_writer
+from services.loop_monitor import loop_monitor
+from services.renderer import pdf_renderer
+from settings import bot_settings
+
+
+class SharedRedisStorage(RedisStorage):
+    """FSM storage on the app-wide Redis pool.
+
+    aiogram closes the storage first on shutdown, while the other shutdown
+    handlers still use the pool; ``redis_connection.close`` closes it last.
+    """
+
+    async def close(self) -> None:
+        pass
+
+
+def create_bot() -> Bot:
+    return Bot(token=bot_settings.TOKEN.get_secret_value())
+
+
+def create_dispatcher() -> Dispatcher:
+    redis_connection.connect()
+    dp = Dispatcher(storage=SharedRedisStorage(redis_connection.connection))
+    dp.update.outer_middleware(UpdateTaskMiddleware())
+    dp.include_router(all_routers)
+    return dp
+
+
+async def start_webhook(app: FastAPI):
+    app.state.bot = create_bot()
+    app.state.dispatcher = create_dispatcher()
+    await app.state.dispatcher.emit_startup(bot=app.state.bot)
+
+
+async def stop_webhook(app: FastAPI):
+    await wait_for_updates()
+    await app.state.dispatcher.emit_shutdown(bot=app.state.bot)
+    await app.state.bot.session.close()
+    await history_writer.close()
+
+
+async def set_webhook():
+    """Point Telegram at ``WEBHOOK_URL``, once for all workers."""
+    secret = bot_settings.WEBHOOK_SECRET
+    if secret is None or not secret.get_secret_value():
+        raise RuntimeError("WEBHOOK_SECRET is required in webhook mode")
+
+    bot = create_bot()
+    try:
+        await bot.set_webhook(
+            bot_settings.WEBHOOK_URL,
+            secret_token=secret.get_secret_value(),
+            allowed_updates=all_routers.resolve_used_update_types(),
+        )
+    finally:
+        await bot.session.close()
+
+
+async def run_polling():
+    bot = create_bot()
+    dp = create_dispatcher()
+    await bot.delete_webhook()
+    loop_monitor.start()
+    background_jobs = start_background_jobs()
+    try:
+        await dp.start_polling(bot)
+    finally:
+        for job in background_jobs:
+            job.cancel()
+        loop_monitor.stop()
+        await history_writer.close()
+        await llm_call_writer.close()
+        pdf_renderer.close()
+        await engine.dispose()
+        await redis_connection.close()
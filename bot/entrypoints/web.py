@@ -0,0 +1,74 @@
+from functools import partial
+
+from database import engine, redis_connection
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from services.loop_monitor import loop_monitor
+from settings import bot_settings
+
+
+def create_app(api: bool = True, admin: bool = True) -> FastAPI:
+    """Build the web app serving the review API, the admin panel or both.
+
+    A part is imported only when it is served: an admin process never loads
+    the review pipeline, an API process never loads sqladmin, and aiogram is
+    only loaded for the Telegram webhook.
+    """
+    app = FastAPI(
+        title="Admin",
+        openapi_url="/api/openapi.json",
+        docs_url="/api/docs",
+        redoc_url="/api/redoc",
+        default_response_class=ORJSONResponse,
+    )
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    if admin:
+        from admin import MyAdmin
+        from admin.admin import admin_router
+        from admin.auth import admin_auth_backend
+
+        admin_app = MyAdmin(
+            app,
+            engine,
+            base_url="/admin-auth",
+            authentication_backend=admin_auth_backend,
+        )
+        admin_app.include_router(admin_router)
+
+    if api:
+        from api import review_router
+
+        app.include_router(review_router, prefix="/api")
+        if bot_settings.IS_WEBHOOK:
+            from api.telegram import router as telegram_router
+            from entrypoints.telegram import start_webhook, stop_webhook
+
+            app.include_router(telegram_router)
+            app.add_event_handler("startup", partial(start_webhook, app))
+            app.add_event_handler("shutdown", partial(stop_webhook, app))
+
+    app.add_event_handler("startup", redis_connection.connect)
+    app.add_event_handler("startup", loop_monitor.start)
+    if api:
+        from api.review import wait_for_reviews
+        from services.llm_ledger import llm_call_writer
+        from services.progress import review_events_hub
+        from services.renderer import pdf_renderer
+
+        app.add_event_handler("shutdown", wait_for_reviews)
+        app.add_event_handler("shutdown", review_events_hub.close)
+        app.add_event_handler("shutdown", llm_call_writer.close)
+        app.add_event_handler("shutdown", pdf_renderer.close)
+    app.add_event_handler("shutdown", loop_monitor.stop)
+    app.add_event_handler("shutdown", engine.dispose)
+    app.add_event_handler("shutdown", redis_connection.close)
+
+    return app
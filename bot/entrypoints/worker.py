@@ -0,0 +1,50 @@
+"""Background jobs: report artifact eviction and history partition maintenance.
+
+Usage: python -m entrypoints.worker
+
+The polling bot runs these jobs itself. When the bot is served by webhook
+API workers, one worker process runs them instead of every API process.
+"""
+
+import asyncio
+import logging
+
+from database import engine
+from prometheus_client import start_http_server
+from services.history import run_history_maintenance
+from services.loop_monitor import loop_monitor
+from services.storage import artifact_store
+from settings import history_settings, report_settings
+
+
+def start_background_jobs() -> list[asyncio.Task]:
+    return [
+        asyncio.create_task(
+            artifact_store.run_eviction(report_settings.ARTIFACT_EVICTION_INTERVAL)
+        ),
+        asyncio.create_task(
+            run_history_maintenance(history_settings.HISTORY_MAINTENANCE_INTERVAL)
+        ),
+    ]
+
+
+async def run_worker():
+    loop_monitor.start()
+    background_jobs = start_background_jobs()
+    try:
+        await asyncio.gather(*background_jobs)
+    finally:
+        for job in background_jobs:
+            job.cancel()
+        loop_monitor.stop()
+        await engine.dispose()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    start_http_server(9091)
+    asyncio.run(run_worker())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from aiogram import Router
+from handlers.diff_review import router as diff_review_router
 from handlers.process_file import router as process_file_router
 from handlers.start import router as start_router
 from middleware import (
@@ -13,6 +14,8 @@ session_middleware = SessionMiddleware()
 
 router = Router()
 router.include_routers(start_router)
+# documents sent during a diff review are not reviewed on their own
+router.include_routers(diff_review_router)
 router.include_routers(process_file_router)
 
 
@@ -0,0 +1,107 @@
+from aiogram import Bot, F, Router, types
+from aiogram.filters import Command, StateFilter
+from aiogram.fsm.context import FSMContext
+from aiogram.types import ContentType
+from database import User
+from handlers.process_file import (
+    answer_too_large,
+    download_document,
+    is_too_large,
+    review_document,
+)
+from handlers.states import DiffReview
+from services.upload import DIFF_EXTENSIONS, UploadTooLarge
+from sqlalchemy.ext.asyncio import AsyncSession
+
+router = Router()
+
+
+@router.message(Command("diff"))
+async def cmd_diff(message: types.Message, state: FSMContext):
+    await state.set_state(DiffReview.base)
+    await message.answer(
+        "Отправьте архив .zip с исходной версией проекта. "
+        "Отменить проверку изменений: /cancel"
+    )
+
+
+@router.message(Command("cancel"), StateFilter(DiffReview))
+async def cmd_cancel(message: types.Message, state: FSMContext):
+    await state.clear()
+    await message.answer("Проверка изменений отменена")
+
+
+@router.message(DiffReview.base, F.content_type == ContentType.DOCUMENT)
+async def handle_base(message: types.Message, state: FSMContext):
+    document = message.document
+    if not document.file_name.endswith("zip"):
+        await message.reply("Пожалуйста, отправьте архив .zip с исходной версией")
+        return
+    if is_too_large(document):
+        await answer_too_large(message)
+        return
+
+    # only the file id is kept, the archive is downloaded with the changes
+    await state.update_data(
+        base_file_id=document.file_id, base_file_name=document.file_name
+    )
+    await state.set_state(DiffReview.changes)
+    await message.answer(
+        "Теперь отправьте архив .zip с новой версией проекта "
+        "или изменения в формате unified diff (.diff, .patch)"
+    )
+
+
+@router.message(DiffReview.changes, F.content_type == ContentType.DOCUMENT)
+async def handle_changes(
+    message: types.Message,
+    bot: Bot,
+    session: AsyncSession,
+    user: User,
+    state: FSMContext,
+):
+    document = message.document
+    is_diff = document.file_name.endswith(DIFF_EXTENSIONS)
+    if not is_diff and not document.file_name.endswith("zip"):
+        await message.reply(
+            "Пожалуйста, отправьте архив .zip с новой версией или файл .diff, .patch"
+        )
+        return
+    if is_too_large(document):
+        await answer_too_large(message)
+        return
+
+    data = await state.get_data()
+    await state.clear()
+    try:
+        base = await download_document(bot, data["base_file_id"])
+    except UploadTooLarge:
+        await answer_too_large(message)
+        return
+    with base:
+        try:
+            changes = await download_document(bot, document.file_id)
+        except UploadTooLarge:
+            await answer_too_large(message)
+            return
+        with changes:
+            if is_diff:
+                await review_document(
+                    message,
+                    session,
+                    user,
+                    base,
+                    False,
+                    data["base_file_name"],
+                    diff=changes,
+                )
+            else:
+                await review_document(
+                    message,
+                    session,
+                    user,
+                    changes,
+                    False,
+                    document.file_name,
+                    base=base,
+                )
@@ -1,70 +1,193 @@
+import asyncio
+import shutil
 import tempfile
-from io import BytesIO
 
-import pdfkit
 from aiogram import Bot, F, Router, types
-from aiogram.types import ContentType, FSInputFile
-from database.connection import PostgresConnection
-from services.review import determine_language, handle_file
+from aiogram.exceptions import TelegramAPIError, TelegramRetryAfter
+from aiogram.types import BufferedInputFile, ContentType, FSInputFile, InputFile
+from database import User
+from ml.diff import PatchError
+from services.progress import ReviewProgress
+from services.renderer import pdf_renderer
+from services.review import (
+    determine_language,
+    ensure_report_pdf,
+    handle_file,
+    save_report,
+)
+from services.storage import artifact_store
+from services.upload import SpooledUpload, UploadTooLarge, max_upload_bytes
 from settings.settings import bot_settings
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = Router()
 
+STAGE_TEXT = {
+    "unpack": "Распаковываю архив",
+    "diff": "Ищу изменения",
+    "files_parser": "Изучаю структуру проекта",
+    "reqs_matcher": "Проверяю зависимости",
+    "layer_classifier": "Определяю слои проекта",
+    "project_structure_analyzer": "Анализирую структуру проекта",
+    "files": "Проверяю файлы",
+    "create_report": "Собираю отчёт",
+}
 
-async def download_document(bot: Bot, file_id: str) -> BytesIO:
+
+async def download_document(bot: Bot, file_id: str) -> SpooledUpload:
+    """Stream a document into a spooled file, see ``SpooledUpload``."""
     file_info = await bot.get_file(file_id)
-    file_path = file_info.file_path
-    zip_file_bytes = BytesIO()
+    upload = SpooledUpload()
+    try:
+        await bot.download_file(file_info.file_path, upload)
+    except BaseException:
+        upload.close()
+        raise
+
+    return upload
+
+
+def progress_text(progress: ReviewProgress) -> str:
+    text = STAGE_TEXT.get(progress.stage, "Готовлюсь к проверке")
+    if progress.stage == "files" and progress.files_total:
+        text += f": {progress.files_done} из {progress.files_total}"
+    if progress.comments:
+        text += f"\nНайдено замечаний: {progress.comments}"
+    return text
+
+
+async def show_progress(message: types.Message, progress: ReviewProgress) -> None:
+    """Edit ``message`` to show the review progress until cancelled.
+
+    Edits happen at most once per ``PROGRESS_EDIT_INTERVAL`` and only when the
+    text changed, to stay within the Telegram rate limits.
+    """
+    text = message.text
+    while True:
+        await asyncio.sleep(bot_settings.PROGRESS_EDIT_INTERVAL)
+        if (new_text := progress_text(progress)) == text:
+            continue
+        try:
+            await message.edit_text(new_text)
+        except TelegramRetryAfter as error:
+            await asyncio.sleep(error.retry_after)
+            continue
+        except TelegramAPIError:
+            pass
+        text = new_text
 
-    await bot.download_file(file_path, zip_file_bytes)
-    zip_file_bytes.seek(0)
 
-    return zip_file_bytes
+async def report_pdf_input_file(pdf_key: str) -> InputFile:
+    if pdf_file_path := artifact_store.local_path(pdf_key):
+        return FSInputFile(pdf_file_path, filename="report.pdf")
+    return BufferedInputFile(await artifact_store.read(pdf_key), filename="report.pdf")
+
+
+async def answer_too_large(message: types.Message) -> None:
+    await message.reply(
+        f"Файл слишком большой, максимальный размер {bot_settings.MAX_UPLOAD_MB} МБ"
+    )
+
+
+def is_too_large(document: types.Document) -> bool:
+    return bool(document.file_size and document.file_size > max_upload_bytes())
+
+
+async def review_document(
+    message: types.Message,
+    session: AsyncSession,
+    user: User,
+    upload: SpooledUpload,
+    is_file: bool,
+    filename: str,
+    base: SpooledUpload | None = None,
+    diff: SpooledUpload | None = None,
+):
+    """Review an upload, showing the progress, and answer with the report."""
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        progress_message = await message.answer(
+            "Вы успешно загрузили файл! Пожалуйста, подождите несколько минут, пока я его не обработаю"
+        )
+        async with ReviewProgress() as progress:
+            progress_task = asyncio.create_task(
+                show_progress(progress_message, progress)
+            )
+            try:
+                with progress.track():
+                    language, response, report = await handle_file(
+                        upload.file,
+                        is_file,
+                        filename,
+                        tmpdirname,
+                        profile_trigger="user" if user.profile_reviews else None,
+                        report_id=progress.report_id,
+                        base=base.file if base else None,
+                        diff=diff.file if diff else None,
+                    )
+            except PatchError as error:
+                progress.fail("invalid_diff")
+                await message.answer(
+                    f"Не удалось применить изменения к архиву: {error}"
+                )
+                return
+            finally:
+                progress_task.cancel()
+            if report is None:
+                progress.fail("unsupported_language")
+                await message.answer("Извините, мы поддерживаем только python")
+                return
+
+            report.source_sha256 = upload.sha256
+            repord_link = f"{bot_settings.BASE_API_URL}/{report.id}"
+
+            await save_report(session, report)
+            progress.finish()
+        await session.refresh(report)
+        pdf_key = await ensure_report_pdf(session, report)
+
+        await message.answer_document(await report_pdf_input_file(pdf_key))
+        # await message.answer(str(response.model_dump()))
+        await message.answer(repord_link)
 
 
 @router.message(F.content_type == ContentType.DOCUMENT)
 async def handle_document(
-    message: types.Message, bot: Bot, session: PostgresConnection
+    message: types.Message, bot: Bot, session: AsyncSession, user: User
 ):
     document = message.document
 
+    if is_too_large(document):
+        await answer_too_large(message)
+        return
+
     is_file = determine_language(document.file_name) in bot_settings.ALLOWED_LANGUAGES
     if document.file_name.endswith("zip") or is_file:
         # try:
-        file_bytes = await download_document(bot, document.file_id)
-        with tempfile.TemporaryDirectory() as tmpdirname:
-            await message.answer(
-                "Вы успешно загрузили файл! Пожалуйста, подождите несколько минут, пока я его не обработаю"
+        try:
+            upload = await download_document(bot, document.file_id)
+        except UploadTooLarge:
+            await answer_too_large(message)
+            return
+        with upload:
+            await review_document(
+                message, session, user, upload, is_file, document.file_name
             )
-            pdf, language, response, report = await handle_file(
-                file_bytes, is_file, document.file_name, tmpdirname
-            )
-            if pdf is None:
-                await message.answer("Извините, мы поддерживаем только python")
-
-            repord_link = f"{bot_settings.BASE_API_URL}/{report.id}"
-
-            async with AsyncSession(session.engine) as async_session:
-                async_session.add(report)
-                await async_session.commit()
-
-            await message.answer_document(pdf)
-            # await message.answer(str(response.model_dump()))
-            await message.answer(repord_link)
 
         # except Exception as e:
         #     await message.reply(f"Ошибка при конвертации")
     elif document.file_name.endswith("html"):
-        file_bytes = await download_document(bot, document.file_id)
-        with tempfile.TemporaryDirectory() as tmpdirname:
+        try:
+            upload = await download_document(bot, document.file_id)
+        except UploadTooLarge:
+            await answer_too_large(message)
+            return
+        with upload, tempfile.TemporaryDirectory() as tmpdirname:
             with open(f"{tmpdirname}/1.html", "wb") as f:
-                f.write(file_bytes.read())
+                shutil.copyfileobj(upload.file, f)
 
             pdf_path = f"{tmpdirname}/report.pdf"
-            pdfkit.from_file(f"{tmpdirname}/1.html", pdf_path)
-            pdf = FSInputFile(pdf_path)
+            await pdf_renderer.html_to_pdf(f"{tmpdirname}/1.html", pdf_path)
 
-            await message.answer_document(pdf)
+            await message.answer_document(FSInputFile(pdf_path))
     else:
         await message.reply("Пожалуйста, отправьте файл с расширением .zip")
@@ -6,5 +6,9 @@ router = Router()
 
 @router.message(Command("start"))
 async def cmd_start(message: types.Message):
-    text = "Добро пожаловать, меня зовут Норберт! Загрузите, пожалуйста, архив с кодом или файл, я подскажу, как написать лучше"
+    text = (
+        "Добро пожаловать, меня зовут Норберт! Загрузите, пожалуйста, архив "
+        "с кодом или файл, я подскажу, как написать лучше. Чтобы проверить "
+        "только изменения в проекте, отправьте /diff"
+    )
     await message.answer(text=text)
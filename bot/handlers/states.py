@@ -0,0 +1,6 @@
+from aiogram.fsm.state import State, StatesGroup
+
+
+class DiffReview(StatesGroup):
+    base = State()
+    changes = State()
@@ -1,11 +1,13 @@
 from middleware.errors import ErrorsMiddleware
 from middleware.metrics import MetricsMiddleware
 from middleware.session import SessionMiddleware
+from middleware.update_task import UpdateTaskMiddleware
 from middleware.user import UserMiddleware
 
 __all__ = (
     "MetricsMiddleware",
     "SessionMiddleware",
+    "UpdateTaskMiddleware",
     "UserMiddleware",
     "ErrorsMiddleware",
 )
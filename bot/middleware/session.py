@@ -2,7 +2,7 @@ from typing import Any, Awaitable, Callable, Dict
 
 from aiogram import BaseMiddleware
 from aiogram.types import Message
-from database import postgres_connection
+from database import async_session_factory
 
 
 class SessionMiddleware(BaseMiddleware):
@@ -12,6 +12,6 @@ class SessionMiddleware(BaseMiddleware):
         event: Message,
         data: Dict[str, Any],
     ) -> Any:
-        session = postgres_connection
-        data["session"] = session
-        return await handler(event, data)
+        async with async_session_factory() as session:
+            data["session"] = session
+            return await handler(event, data)
@@ -0,0 +1,23 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+from services.loop_monitor import update_tasks
+
+
+class UpdateTaskMiddleware(BaseMiddleware):
+    """Remembers which update the current task is handling."""
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        task = asyncio.current_task()
+        update_tasks[task] = event.update_id
+        try:
+            return await handler(event, data)
+        finally:
+            update_tasks.pop(task, None)
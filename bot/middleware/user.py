@@ -2,34 +2,25 @@ from typing import Any, Awaitable, Callable, Dict, Optional
 
 from aiogram import BaseMiddleware, types
 from aiogram.types import CallbackQuery, Message
-from database import Chat, History, User
-from database.connection import PostgresConnection
-from sqlalchemy import insert, select
+from database import Chat, User
+from services.history import record_history
+from services.profile import get_or_create_profiles
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
 class UserMiddleware(BaseMiddleware):
-    async def setup_chat(self, user: types.User, chat: Optional[types.Chat] = None):
+    async def setup_chat(
+        self,
+        session: AsyncSession,
+        user: types.User,
+        chat: Optional[types.Chat] = None,
+    ) -> tuple[User, Chat]:
         user_id = str(user.id)
-        full_name = user.full_name
         chat_id = str(chat.id if chat else user.id)
         chat_type = chat.type if chat else "private"
-        ans = await self.session.select(select(User).where(User.telegram_id == user_id))
-        if not (user := ans.scalars().first()):
-            async with AsyncSession(self.session.engine) as session:
-                user = User(telegram_id=user_id, full_name=full_name)
-                session.add(user)
-                await session.commit()
-                await session.refresh(user)
-        ans = await self.session.select(select(Chat).where(Chat.id == chat_id))
-        if not (chat := ans.scalars().first()):
-            async with AsyncSession(self.session.engine) as session:
-                chat = Chat(id=chat_id, type=chat_type)
-                session.add(chat)
-                await session.commit()
-                await session.refresh(chat)
-
-        return user, chat
+        return await get_or_create_profiles(
+            session, user_id, user.full_name, chat_id, chat_type
+        )
 
     async def __call__(
         self,
@@ -37,18 +28,19 @@ class UserMiddleware(BaseMiddleware):
         event: Message | CallbackQuery,
         data: Dict[str, Any],
     ) -> Any:
-        self.session: PostgresConnection = data["session"]
+        # the middleware instance is shared by concurrent updates, so the
+        # per-update session is passed down rather than stored on self
+        session: AsyncSession = data["session"]
         chat = event.chat if (event and hasattr(event, "chat")) else None
-        user, chat = await self.setup_chat(event.from_user, chat)
-        data["user"] = User(**user.to_dict())
+        user, chat = await self.setup_chat(session, event.from_user, chat)
+        data["user"] = user
         if user.is_banned:
             bot = data.get("bot")
             return await bot.send_message(chat.id, "Вы забанены")
-        data["chat"] = Chat(**chat.to_dict())
-        insert_history = insert(History).values(
-            chat_id=chat.id,
-            user_id=user.telegram_id,
-            command=event.text if hasattr(event, "text") else event.data,
+        data["chat"] = chat
+        await record_history(
+            user.telegram_id,
+            chat.id,
+            event.text if hasattr(event, "text") else event.data,
         )
-        await self.session.execute(insert_history)
         return await handler(event, data)
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Literal, Optional
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+CassetteMode = Literal["record", "replay"]
+
+
+class CassetteMiss(LookupError):
+    """The replayed cassette has no answer for a prompt."""
+
+
+class CassetteError(ValueError):
+    """A request that failed when it was recorded."""
+
+
+def prompt_key(model: str, messages: List[BaseMessage], stop=None) -> str:
+    payload = json.dumps(
+        {
+            "model": model,
+            "messages": [[message.type, message.content] for message in messages],
+            "stop": stop,
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class CassetteChatModel(BaseChatModel):
+    """Records the traffic of a chat model to JSON Lines, or plays it back.
+
+    Entries are keyed by the hash of the model name, messages and stop words.
+    A prompt recorded several times, e.g. by retries, is answered in recorded
+    order and then with its last answer. Recorded failures are replayed as
+    ``CassetteError``. Replayed answers carry ``cache_hit`` in their
+    ``response_metadata`` and, with ``replay_timing``, take as long as the
+    original request did.
+    """
+
+    inner: BaseChatModel
+    path: Path
+    mode: CassetteMode = "record"
+    replay_timing: bool = False
+
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _entries: Dict[str, deque] = PrivateAttr(default_factory=dict)
+
+    def model_post_init(self, __context: Any) -> None:
+        super().model_post_init(__context)
+        if self.mode == "replay":
+            self._entries = self._load()
+
+    def _load(self) -> Dict[str, deque]:
+        entries = defaultdict(deque)
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    entries[entry["key"]].append(entry)
+        return dict(entries)
+
+    @property
+    def _model_name(self) -> str:
+        return self.inner._get_ls_params().get("ls_model_name") or self.inner._llm_type
+
+    def _write(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def _record(
+        self,
+        key: str,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]],
+        run_manager: Optional[CallbackManagerForLLMRun],
+        **kwargs: Any,
+    ) -> ChatResult:
+        entry = {
+            "key": key,
+            "model": self._model_name,
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "messages": [
+                {"type": message.type, "content": message.content}
+                for message in messages
+            ],
+        }
+        started_at = time.perf_counter()
+        try:
+            result = self.inner._generate(messages, stop, run_manager, **kwargs)
+        except Exception as e:
+            entry.update(latency=time.perf_counter() - started_at, error=repr(e))
+            self._write(entry)
+            raise
+
+        message = result.generations[0].message
+        entry.update(
+            latency=time.perf_counter() - started_at,
+            content=message.content,
+            response_metadata=message.response_metadata,
+            usage_metadata=getattr(message, "usage_metadata", None),
+        )
+        self._write(entry)
+        return result
+
+    def _replay(self, key: str) -> ChatResult:
+        with self._lock:
+            recorded = self._entries.get(key)
+            if not recorded:
+                raise CassetteMiss(f"No recorded answer for prompt {key}")
+            entry = recorded.popleft() if len(recorded) > 1 else recorded[0]
+
+        if self.replay_timing:
+            time.sleep(entry["latency"])
+        if "error" in entry:
+            raise CassetteError(entry["error"])
+
+        message = AIMessage(
+            content=entry["content"],
+            response_metadata={**(entry["response_metadata"] or {}), "cache_hit": True},
+            usage_metadata=entry["usage_metadata"],
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = prompt_key(self._model_name, messages, stop)
+        if self.mode == "replay":
+            return self._replay(key)
+        return self._record(key, messages, stop, run_manager, **kwargs)
+
+    def _get_ls_params(self, stop: Optional[List[str]] = None, **kwargs: Any):
+        return self.inner._get_ls_params(stop=stop, **kwargs)
+
+    @property
+    def _llm_type(self) -> str:
+        return f"cassette-{self.inner._llm_type}"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {
+            **self.inner._identifying_params,
+            "cassette": str(self.path),
+            "mode": self.mode,
+        }
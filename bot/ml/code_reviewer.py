@@ -1,14 +1,26 @@
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextvars import copy_context
 import os
+import time
 from pathlib import Path
 
 from ml.code_analyzer import CodeAnalyzer
+from ml.diff import ChangeSet, Excerpt, LineRange, project_root, review_excerpt
 from ml.files_parser import FilesParser
 from ml.layer_classifier import LayerClassifier
+from ml.ledger import ledger_scope
 from ml.logging_checker import LoggingChecker
+from ml.metrics import (
+    file_queue_wait_seconds,
+    files_reviewed,
+    files_skipped,
+    reviewer_stage_seconds,
+    validator_seconds,
+)
+from ml.progress import emit_progress
 from ml.project_structure_analyzer import ProjectStructureAnalyzer
 from ml.reqs_match import ReqsMatcher
-from ml.schemas import CodeComment, OutputJson, ProjectComment
+from ml.schemas import CodeComment, OutputJson, ProjectComment, ProjectReview
 
 DATA_PATH = r"D:\ITMO\hacks\llm_review\python\backend-master"
 # DATA_PATH = r'/home/artem/work/programming/codereview_hack/example_projects/python/backend-master/backend-master'
@@ -59,79 +71,230 @@ class CodeReviewer:
             ]
         return output_results
 
+    def _map_to_source(self, comments: list[CodeComment], excerpt: Excerpt):
+        """Renumber comments on an excerpt by the lines of the file.
+
+        Comments that only concern the unchanged code around the changes are
+        dropped, they were made when that code was reviewed.
+        """
+        mapped = []
+        for comment in comments:
+            source_range = excerpt.source_range(
+                comment.start_string_number, comment.end_string_number
+            )
+            if source_range and excerpt.touches_changes(*source_range):
+                start, end = source_range
+                mapped.append(
+                    comment.model_copy(
+                        update={"start_string_number": start, "end_string_number": end}
+                    )
+                )
+        return mapped
+
     def _process_py_file(
-        self, source_dir: Path, relative_path: Path, layer_name: str = None
+        self,
+        source_dir: Path,
+        relative_path: Path,
+        layer_name: str = None,
+        changed_lines: list[LineRange] | None = None,
     ):
         with open(source_dir / relative_path, "r") as f:
             contents = f.read()
 
+        excerpt = None
+        if changed_lines is not None:
+            excerpt = review_excerpt(contents, changed_lines)
+            if not excerpt.changed:
+                files_skipped.labels("unchanged").inc()
+                return []
+            contents = excerpt.text
+
         results = []
         for validator in self.scripts_validators:
-            if isinstance(validator, CodeAnalyzer):
-                result = validator.invoke(contents, layer_name, str(relative_path))
-            else:
-                result = validator.invoke(contents)
+            validator_name = type(validator).__name__
+            with validator_seconds.labels(validator_name).time(), ledger_scope(
+                validator_name, str(relative_path)
+            ):
+                if isinstance(validator, CodeAnalyzer):
+                    result = validator.invoke(
+                        contents, layer_name, str(relative_path)
+                    )
+                else:
+                    result = validator.invoke(contents)
             results.append(result)
 
-        return self._postprocess_result(results, relative_path)
+        files_reviewed.inc()
+        comments = self._postprocess_result(results, relative_path)
+        if excerpt is not None:
+            comments = self._map_to_source(comments, excerpt)
+        return comments
 
-    def invoke(self, source_dir: Path, extension: str = ".py"):
-        if isinstance(source_dir, str):
-            source_dir = Path(source_dir)
+    def _process_queued_py_file(
+        self,
+        submitted_at: float,
+        source_dir: Path,
+        relative_path: Path,
+        layer_name: str,
+        changed_lines: list[LineRange] | None,
+    ):
+        file_queue_wait_seconds.observe(time.perf_counter() - submitted_at)
+        return self._process_py_file(
+            source_dir, relative_path, layer_name, changed_lines
+        )
 
+    def _single_file(self, source_dir: Path) -> Path | None:
+        if source_dir.is_file():
+            return source_dir
         if len(os.listdir(source_dir)) == 1 and os.listdir(source_dir)[0].endswith(".py"):
-            source_dir = Path(os.path.join(source_dir, os.listdir(source_dir)[0]))
+            return Path(os.path.join(source_dir, os.listdir(source_dir)[0]))
+        return None
 
-        if source_dir.is_file():
+    def review_project(self, source_dir: Path, extension: str = ".py"):
+        """Classify the layers of a project and check its structure.
+
+        Both only see the file tree, so their results can be reused for any
+        version of the project with the same tree, see
+        ``ml.diff.project_fingerprint``. The layers are keyed by directories
+        relative to ``ml.diff.project_root``, which ignores the name of the
+        top-level directory of an archive. Returns ``None`` for a single file.
+        """
+        source_dir = Path(source_dir)
+        if self._single_file(source_dir) is not None:
+            return None
+
+        project_structure = self.files_parser.invoke(source_dir, extension=extension)
+        emit_progress("stage", stage="layer_classifier")
+        with reviewer_stage_seconds.labels("layer_classifier").time(), ledger_scope(
+            "LayerClassifier"
+        ):
+            classes = self.layer_classifier.invoke(project_structure)
+
+        emit_progress("stage", stage="project_structure_analyzer")
+        with reviewer_stage_seconds.labels(
+            "project_structure_analyzer"
+        ).time(), ledger_scope("ProjectStructureAnalyzer"):
+            project_structure_analyzer_results = (
+                self.project_structure_analyzer.invoke(source_dir)
+            )
+        root = project_root(source_dir).relative_to(source_dir)
+        return ProjectReview(
+            layers={
+                path.relative_to(root).as_posix(): layer
+                for path, layer in classes.items()
+                if path in project_structure
+            },
+            comments=[
+                ProjectComment(title=type_to_title[x.type], comment=x.comment)
+                for x in project_structure_analyzer_results.comments
+            ],
+        )
+
+    def invoke(
+        self,
+        source_dir: Path,
+        extension: str = ".py",
+        changes: ChangeSet | None = None,
+        project_review: ProjectReview | None = None,
+    ):
+        """Review a project or a single file.
+
+        With ``changes`` only the changed lines of the changed files are
+        reviewed, see ``ml.diff.review_excerpt``. The project checks are run
+        unless their ``project_review`` is given.
+        """
+        if isinstance(source_dir, str):
+            source_dir = Path(source_dir)
+
+        if (single_file := self._single_file(source_dir)) is not None:
+            changed_lines = (
+                None if changes is None else changes.get(single_file.name, [])
+            )
+            emit_progress("stage", stage="files")
+            emit_progress("files", done=0, total=1)
             try:
-                result = self._process_py_file(Path(""), source_dir)
+                with reviewer_stage_seconds.labels("files").time():
+                    result = self._process_py_file(
+                        Path(""), single_file, changed_lines=changed_lines
+                    )
                 result = [x for x in result if x.title != "Архитектурные ошибки"]
             except:
+                files_skipped.labels("error").inc()
                 result = []
+            for comment in result:
+                emit_progress("comment", **comment.model_dump())
+            emit_progress("files", done=1, total=1)
             return OutputJson(
                 titles=list(type_to_title.values()),
                 code_comments=result,
                 project_comments=[],
             )
 
-        project_structure = self.files_parser.invoke(source_dir, extension=extension)
-        reqs = self.reqs_matcher.invoke(source_dir)
-        classes = self.layer_classifier.invoke(project_structure)
-
-        project_structure_analyzer_results = self.project_structure_analyzer.invoke(
-            source_dir
-        )
-        project_comments = [
-            ProjectComment(title=type_to_title[x.type], comment=x.comment)
-            for x in project_structure_analyzer_results.comments
-        ]
+        emit_progress("stage", stage="files_parser")
+        with reviewer_stage_seconds.labels("files_parser").time():
+            project_structure = self.files_parser.invoke(
+                source_dir, extension=extension
+            )
+        emit_progress("stage", stage="reqs_matcher")
+        with reviewer_stage_seconds.labels("reqs_matcher").time():
+            reqs = self.reqs_matcher.invoke(source_dir)
+        if project_review is None:
+            project_review = self.review_project(source_dir, extension)
+        # layers reused from another version may name directories it lacks
+        root = project_root(source_dir).relative_to(source_dir)
+        classes = {
+            root / path: layer
+            for path, layer in project_review.layers.items()
+            if root / path in project_structure
+        }
+        project_comments = list(project_review.comments)
 
         if reqs:
             project_comments.append(
                 ProjectComment(title=type_to_title[reqs.type], comment=reqs.comment)
             )
 
+        total_files = sum(len(files) for files in project_structure.values())
         project_structure = {k: project_structure[k] for k in classes}
         scripts = [
             (path / x, classes[path])
             for path in project_structure
             for x in project_structure[path]
         ]
+        files_skipped.labels("unclassified").inc(total_files - len(scripts))
+        if changes is not None:
+            changed_scripts = [x for x in scripts if x[0].as_posix() in changes]
+            files_skipped.labels("unchanged").inc(len(scripts) - len(changed_scripts))
+            scripts = changed_scripts
         code_comments = []
-        with ThreadPoolExecutor(max_workers=5) as executor:
+        emit_progress("stage", stage="files")
+        emit_progress("files", done=0, total=len(scripts))
+        with reviewer_stage_seconds.labels("files").time(), ThreadPoolExecutor(
+            max_workers=5
+        ) as executor:
             future_to_sc = {
                 executor.submit(
-                    self._process_py_file, source_dir, script[0], script[1]
+                    copy_context().run,
+                    self._process_queued_py_file,
+                    time.perf_counter(),
+                    source_dir,
+                    script[0],
+                    script[1],
+                    None if changes is None else changes[script[0].as_posix()],
                 ): script[0]
                 for script in scripts
             }
-            for future in as_completed(future_to_sc):
+            for files_done, future in enumerate(as_completed(future_to_sc), 1):
                 script_name = future_to_sc[future]
                 try:
                     data = future.result()
                     code_comments += data
                 except Exception as exc:
+                    files_skipped.labels("error").inc()
                     print(f"{script_name} сгенерировано исключение: {exc}")
+                else:
+                    for comment in data:
+                        emit_progress("comment", **comment.model_dump())
+                emit_progress("files", done=files_done, total=len(scripts))
 
         return OutputJson(
             titles=list(type_to_title.values()),
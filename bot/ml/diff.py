@@ -0,0 +1,385 @@
+"""Changed lines of a project and the excerpts of its files a diff review sends.
+
+Changes come either from a unified diff applied to the base version or from
+comparing two versions. A changed file is not sent to the validators whole:
+its excerpt holds the changed lines, the functions and top-level statements
+they are in, the headers of enclosing classes and the imports of the module.
+"""
+
+import ast
+import difflib
+import hashlib
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+LineRange = tuple[int, int]
+# path relative to the project directory -> changed lines of the new version
+ChangeSet = dict[str, list[LineRange]]
+
+GAP_MARKER = "..."
+# lines around a change kept when the file cannot be parsed
+FALLBACK_CONTEXT_LINES = 3
+# diffs are read and files rewritten byte for byte, whatever their encoding
+ENCODING_ERRORS = "surrogateescape"
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class PatchError(ValueError):
+    """A unified diff is malformed or does not apply to the project."""
+
+
+@dataclass
+class Hunk:
+    old_start: int
+    old_count: int
+    # with their " ", "-" or "+" prefix
+    lines: list[str]
+
+
+@dataclass
+class FilePatch:
+    old_path: str | None
+    new_path: str | None
+    hunks: list[Hunk] = field(default_factory=list)
+
+
+def _only_directory(directory: Path) -> Path | None:
+    entries = list(directory.iterdir())
+    return entries[0] if len(entries) == 1 and entries[0].is_dir() else None
+
+
+def project_root(directory: Path) -> Path:
+    """Return the directory an archive unpacked into ``directory`` is rooted at.
+
+    Archives of a repository usually hold one top-level directory, e.g.
+    ``project-main/``, whose name differs between versions.
+    """
+    return _only_directory(directory) or directory
+
+
+def project_fingerprint(source_dir: Path) -> str:
+    """Hash the file tree of a project, which is all the project checks see."""
+    root = project_root(source_dir)
+    paths = sorted(
+        (Path(dirpath) / name).relative_to(root).as_posix()
+        for dirpath, _, files in os.walk(root)
+        for name in files
+    )
+    return hashlib.sha256("\n".join(paths).encode(errors=ENCODING_ERRORS)).hexdigest()
+
+
+def _read_lines(path: Path) -> list[str]:
+    with open(path, encoding="utf-8", errors=ENCODING_ERRORS) as f:
+        return f.read().splitlines()
+
+
+def _to_ranges(numbers: set[int]) -> list[LineRange]:
+    ranges = []
+    for number in sorted(numbers):
+        if ranges and ranges[-1][1] == number - 1:
+            ranges[-1] = (ranges[-1][0], number)
+        else:
+            ranges.append((number, number))
+    return ranges
+
+
+def _diff_path(header: str) -> str | None:
+    path, _, timestamp = header.partition("\t")
+    path = path.strip()
+    # ``diff -N`` dates files missing on one side at the epoch
+    if path == "/dev/null" or timestamp.startswith("1970-01-01"):
+        return None
+    # like ``patch -p1``: ``a/`` and ``b/`` of git, or the compared directories
+    return path.split("/", 1)[1] if "/" in path else path
+
+
+def _read_hunk(lines: list[str], index: int, header: re.Match) -> tuple[Hunk, int]:
+    old_left = old_count = int(header[2] or 1)
+    new_left = int(header[4] or 1)
+    hunk_lines = []
+    while old_left > 0 or new_left > 0:
+        if index == len(lines):
+            raise PatchError(f"Truncated hunk {header[0]}")
+        line = lines[index]
+        index += 1
+        if line.startswith("\\"):
+            continue
+        # editors strip the space of empty context lines
+        tag = line[:1] or " "
+        if tag == " ":
+            old_left -= 1
+            new_left -= 1
+        elif tag == "-":
+            old_left -= 1
+        elif tag == "+":
+            new_left -= 1
+        else:
+            raise PatchError(f"Unexpected line in hunk {header[0]}: {line!r}")
+        hunk_lines.append(tag + line[1:])
+    return Hunk(int(header[1]), old_count, hunk_lines), index
+
+
+def parse_unified_diff(text: str) -> list[FilePatch]:
+    """Parse the output of ``git diff`` or ``diff -ruN``.
+
+    Binary changes and changes of file modes are ignored, they do not matter
+    for a review.
+    """
+    patches: list[FilePatch] = []
+    patch: FilePatch | None = None
+    renamed: FilePatch | None = None
+    lines = text.splitlines()
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        index += 1
+        if line.startswith("diff --git "):
+            renamed = None
+        elif line.startswith("rename from "):
+            renamed = FilePatch(line.removeprefix("rename from "), None)
+        elif line.startswith("rename to ") and renamed is not None:
+            renamed.new_path = line.removeprefix("rename to ")
+            patch = renamed
+            patches.append(patch)
+        elif (
+            line.startswith("--- ")
+            and index < len(lines)
+            and lines[index].startswith("+++ ")
+        ):
+            if renamed is None:
+                patch = FilePatch(_diff_path(line[4:]), _diff_path(lines[index][4:]))
+                patches.append(patch)
+            index += 1
+        elif header := _HUNK_HEADER.match(line):
+            if patch is None:
+                raise PatchError(f"Hunk {header[0]} has no file header")
+            hunk, index = _read_hunk(lines, index, header)
+            patch.hunks.append(hunk)
+
+    if not patches and text.strip():
+        raise PatchError("No file changes found in the diff")
+    return patches
+
+
+def _find_block(lines: list[str], block: list[str], expected: int, lower: int) -> int:
+    """Find ``block`` in ``lines`` nearest to ``expected``, like ``patch`` does."""
+    starts = range(lower, len(lines) - len(block) + 1)
+    for start in sorted(starts, key=lambda start: abs(start - expected)):
+        end = start + len(block)
+        if lines[start:end] == block:
+            return start
+    return -1
+
+
+def _apply_hunks(
+    lines: list[str], hunks: list[Hunk], path: str
+) -> tuple[list[str], set[int]]:
+    result: list[str] = []
+    changed: set[int] = set()
+    position = 0
+    for hunk in hunks:
+        old = [line[1:] for line in hunk.lines if line[0] != "+"]
+        # a hunk that only adds lines starts after line ``old_start``
+        expected = hunk.old_start - 1 if hunk.old_count else hunk.old_start
+        start = _find_block(lines, old, expected, position)
+        if start < 0:
+            raise PatchError(f"Hunk at line {hunk.old_start} does not apply to {path}")
+
+        result += lines[position:start]
+        for line in hunk.lines:
+            if line[0] == "-":
+                # removed lines are reviewed through the line now in their place
+                changed.add(len(result) + 1)
+            else:
+                if line[0] == "+":
+                    changed.add(len(result) + 1)
+                result.append(line[1:])
+        position = start + len(old)
+
+    result += lines[position:]
+    # lines removed at the end of the file are reviewed through the last line
+    return result, {min(number, len(result)) for number in changed} - {0}
+
+
+def _resolve(root: Path, path: str) -> Path:
+    resolved = (root / path).resolve()
+    if not resolved.is_relative_to(root.resolve()):
+        raise PatchError(f"{path} is outside of the project")
+    return resolved
+
+
+def _patch_root(source_dir: Path, patches: list[FilePatch]) -> Path:
+    """Find the directory the paths of ``patches`` are relative to.
+
+    It is the project root, unless the project itself is a single directory
+    and the diff was made around it.
+    """
+    roots = [source_dir]
+    while directory := _only_directory(roots[-1]):
+        roots.append(directory)
+    old_paths = [patch.old_path for patch in patches if patch.old_path]
+    for root in roots:
+        if any((root / path).is_file() for path in old_paths):
+            return root
+    return project_root(source_dir)
+
+
+def apply_patches(source_dir: Path, patches: list[FilePatch]) -> ChangeSet:
+    """Apply ``patches`` to the project in ``source_dir`` and return the changes.
+
+    Paths of the change set are relative to ``source_dir``, like the paths of
+    ``FilesParser``.
+    """
+    root = _patch_root(source_dir, patches)
+    changes: ChangeSet = {}
+    for patch in patches:
+        old_file = _resolve(root, patch.old_path) if patch.old_path else None
+        if old_file is not None and not old_file.is_file():
+            raise PatchError(f"{patch.old_path} is not in the project")
+        lines = _read_lines(old_file) if old_file is not None else []
+        lines, changed = _apply_hunks(lines, patch.hunks, patch.old_path or "")
+
+        if old_file is not None and patch.new_path != patch.old_path:
+            old_file.unlink()
+        if patch.new_path is None:
+            continue
+
+        new_file = _resolve(root, patch.new_path)
+        new_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(new_file, "w", encoding="utf-8", errors=ENCODING_ERRORS) as f:
+            f.write("".join(f"{line}\n" for line in lines))
+        if changed:
+            changes[new_file.relative_to(source_dir.resolve()).as_posix()] = _to_ranges(
+                changed
+            )
+    return changes
+
+
+def diff_trees(base_dir: Path, head_dir: Path, extension: str = ".py") -> ChangeSet:
+    """Return the changes of the ``extension`` files from ``base_dir`` to ``head_dir``.
+
+    Paths of the change set are relative to ``head_dir``.
+    """
+    base_root, head_root = base_dir, head_dir
+    # the top-level directories of the versions may be named differently
+    while (base_only := _only_directory(base_root)) and (
+        head_only := _only_directory(head_root)
+    ):
+        base_root, head_root = base_only, head_only
+    changes: ChangeSet = {}
+    for dirpath, _, files in os.walk(head_root):
+        for name in files:
+            if not name.endswith(extension):
+                continue
+            head_file = Path(dirpath) / name
+            base_file = base_root / head_file.relative_to(head_root)
+            head_lines = _read_lines(head_file)
+            if not base_file.is_file():
+                changed = set(range(1, len(head_lines) + 1))
+            else:
+                matcher = difflib.SequenceMatcher(
+                    None, _read_lines(base_file), head_lines, autojunk=False
+                )
+                changed = set()
+                for tag, _, _, first, last in matcher.get_opcodes():
+                    if tag == "delete" and head_lines:
+                        changed.add(min(first + 1, len(head_lines)))
+                    elif tag != "equal":
+                        changed.update(range(first + 1, last + 1))
+            if changed:
+                changes[head_file.relative_to(head_dir).as_posix()] = _to_ranges(
+                    changed
+                )
+    return changes
+
+
+@dataclass
+class Excerpt:
+    """The part of a file sent to the validators instead of the whole file."""
+
+    text: str
+    # source line of every excerpt line, ``None`` for the gap markers
+    line_numbers: list[int | None]
+    changed: list[LineRange]
+
+    def source_range(self, start: int, end: int) -> LineRange | None:
+        """Map excerpt lines ``start`` to ``end`` back to source lines."""
+        first, last = max(start, 1) - 1, max(start, end)
+        numbers = [
+            number for number in self.line_numbers[first:last] if number is not None
+        ]
+        return (min(numbers), max(numbers)) if numbers else None
+
+    def touches_changes(self, start: int, end: int) -> bool:
+        return any(start <= last and first <= end for first, last in self.changed)
+
+
+def _node_range(node: ast.stmt) -> LineRange:
+    decorators = getattr(node, "decorator_list", [])
+    return min([node.lineno] + [d.lineno for d in decorators]), node.end_lineno
+
+
+def _enclosing_ranges(
+    body: list[ast.stmt], first: int, last: int, ranges: list[LineRange]
+) -> None:
+    for node in body:
+        start, end = _node_range(node)
+        if end < first or start > last:
+            continue
+        if isinstance(node, ast.ClassDef):
+            body_start = _node_range(node.body[0])[0]
+            ranges.append((start, max(node.lineno, body_start - 1)))
+            _enclosing_ranges(node.body, first, last, ranges)
+        else:
+            # a whole function, however deep the change, or a whole statement
+            ranges.append((start, end))
+
+
+def review_excerpt(source: str, changed: list[LineRange]) -> Excerpt:
+    """Cut the changed lines of ``source`` with the code needed to review them."""
+    lines = source.splitlines()
+    changed = [
+        (max(first, 1), min(last, len(lines)))
+        for first, last in changed
+        if first <= len(lines)
+    ]
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        ranges = [
+            (first - FALLBACK_CONTEXT_LINES, last + FALLBACK_CONTEXT_LINES)
+            for first, last in changed
+        ]
+    else:
+        ranges = [
+            _node_range(node)
+            for node in tree.body
+            if isinstance(node, (ast.Import, ast.ImportFrom))
+        ]
+        for first, last in changed:
+            # changed comments and blank lines are in no statement
+            ranges.append((first, last))
+            _enclosing_ranges(tree.body, first, last, ranges)
+
+    text_lines: list[str] = []
+    line_numbers: list[int | None] = []
+    next_number = 1
+    for first, last in sorted(ranges):
+        first, last = max(first, next_number), min(last, len(lines))
+        if first > last:
+            continue
+        if first > next_number:
+            text_lines.append(GAP_MARKER)
+            line_numbers.append(None)
+        offset = first - 1
+        text_lines += lines[offset:last]
+        line_numbers += range(first, last + 1)
+        next_number = last + 1
+    if next_number <= len(lines):
+        text_lines.append(GAP_MARKER)
+        line_numbers.append(None)
+
+    return Excerpt("\n".join(text_lines), line_numbers, changed)
@@ -1,12 +1,17 @@
+import asyncio
 from pathlib import Path
 
+from langchain_core.language_models import BaseChatModel
 from ml.code_analyzer import CodeAnalyzer
 from ml.code_reviewer import CodeReviewer
+from ml.diff import ChangeSet
 from ml.files_parser import FilesParser
 from ml.layer_classifier import LayerClassifier
 from ml.logging_checker import LoggingChecker
+from ml.metrics import LLMMetricsCallback
 from ml.project_structure_analyzer import ProjectStructureAnalyzer
 from ml.reqs_match import ReqsMatcher
+from ml.schemas import ProjectReview
 from schemas.ml import CodeComment, OutputJson, ProjectComment
 
 
@@ -94,22 +99,45 @@ json = {
 }
 
 
-async def get_ml_response(path: str, language: str) -> OutputJson | None:
-    if language != "py":
-        return None
-
-    from ml.llms import LLMFactory
-
-    llm = LLMFactory.get_llm("mistral-nemo-instruct-2407")
-
-    reviewer = CodeReviewer(
+def create_code_reviewer(llm: BaseChatModel) -> CodeReviewer:
+    llm.callbacks = [LLMMetricsCallback()]
+    return CodeReviewer(
         FilesParser(),
         LayerClassifier(llm),
         ProjectStructureAnalyzer(llm),
         ReqsMatcher(),
         scripts_validators=[CodeAnalyzer(llm), LoggingChecker(llm)],
     )
+
+
+def get_code_reviewer() -> CodeReviewer:
+    from ml.llms import LLMFactory
+
+    return create_code_reviewer(LLMFactory.get_llm("mistral-nemo-instruct-2407"))
+
+
+async def get_project_review(path: str, language: str) -> ProjectReview | None:
+    if language != "py":
+        return None
+
     EXTENSION = ".py"
-    result = reviewer.invoke(path, EXTENSION)
+    return await asyncio.to_thread(get_code_reviewer().review_project, path, EXTENSION)
+
+
+async def get_ml_response(
+    path: str,
+    language: str,
+    changes: ChangeSet | None = None,
+    project_review: ProjectReview | None = None,
+) -> OutputJson | None:
+    if language != "py":
+        return None
+
+    reviewer = get_code_reviewer()
+    EXTENSION = ".py"
+    # the reviewer makes blocking HTTP calls, keep them off the event loop
+    result = await asyncio.to_thread(
+        reviewer.invoke, path, EXTENSION, changes, project_review
+    )
 
     return result
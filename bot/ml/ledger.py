@@ -0,0 +1,156 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.tracers.context import register_configure_hook
+
+
+@dataclass
+class LedgerScope:
+    validator: str
+    filepath: str | None
+    attempts: int = 0
+
+
+class LLMLedgerCallback(BaseCallbackHandler):
+    """Turns every chat model run of a review into one ledger entry.
+
+    An entry is emitted once the output parser that follows the model in its
+    chain has finished, so it records whether the answer could be parsed.
+    Runs of one validator on one file share a ``LedgerScope``; every run after
+    the first in a scope is a retry.
+    """
+
+    def __init__(self, report_id: UUID, sink: Callable[[dict[str, Any]], None]):
+        self.report_id = report_id
+        self.sink = sink
+        self._running: dict[UUID, dict[str, Any]] = {}
+        self._parsing: dict[UUID, dict[str, Any]] = {}
+
+    def on_chat_model_start(
+        self,
+        serialized: dict[str, Any],
+        messages: list,
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        scope = _scope.get() or LedgerScope(validator="unknown", filepath=None)
+        scope.attempts += 1
+        self._running[run_id] = {
+            "report_id": self.report_id,
+            "model": (metadata or {}).get("ls_model_name")
+            or serialized.get("name", ""),
+            "validator": scope.validator,
+            "filepath": scope.filepath,
+            "prompt_bytes": sum(
+                len(str(message.content).encode())
+                for batch in messages
+                for message in batch
+            ),
+            "retries": scope.attempts - 1,
+            "started_at": time.perf_counter(),
+            "parent_run_id": parent_run_id,
+        }
+
+    def _emit(self, entry: dict[str, Any], parse_success: bool | None) -> None:
+        entry.pop("parent_run_id")
+        self.sink({**entry, "parse_success": parse_success})
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        if (entry := self._running.pop(run_id, None)) is None:
+            return
+        message = getattr(response.generations[0][0], "message", None)
+        usage = getattr(message, "usage_metadata", None) or {}
+        response_metadata = getattr(message, "response_metadata", None) or {}
+        entry.update(
+            latency=time.perf_counter() - entry.pop("started_at"),
+            input_tokens=usage.get("input_tokens", 0),
+            output_tokens=usage.get("output_tokens", 0),
+            cache_hit=bool(response_metadata.get("cache_hit", False)),
+            status="ok",
+        )
+        if entry["parent_run_id"] is None:
+            self._emit(entry, None)
+        else:
+            self._parsing[entry["parent_run_id"]] = entry
+
+    def on_llm_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        if (entry := self._running.pop(run_id, None)) is None:
+            return
+        entry.update(
+            latency=time.perf_counter() - entry.pop("started_at"),
+            input_tokens=0,
+            output_tokens=0,
+            cache_hit=False,
+            status="error",
+        )
+        self._emit(entry, False)
+
+    def _finish_parsing(
+        self, run_id: UUID, parent_run_id: UUID | None, parse_success: bool
+    ) -> None:
+        # the parser is the next step of the chain that ran the model; if the
+        # model was the last step, the chain itself finishing settles it
+        for chain_id in (parent_run_id, run_id):
+            if chain_id is not None and chain_id in self._parsing:
+                self._emit(self._parsing.pop(chain_id), parse_success)
+                return
+
+    def on_chain_end(
+        self,
+        outputs: dict[str, Any],
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        **kwargs: Any,
+    ) -> None:
+        self._finish_parsing(run_id, parent_run_id, True)
+
+    def on_chain_error(
+        self,
+        error: BaseException,
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        **kwargs: Any,
+    ) -> None:
+        self._finish_parsing(run_id, parent_run_id, False)
+
+
+_scope: ContextVar[LedgerScope | None] = ContextVar("llm_ledger_scope", default=None)
+_callback: ContextVar[LLMLedgerCallback | None] = ContextVar(
+    "llm_ledger_callback", default=None
+)
+register_configure_hook(_callback, inheritable=True)
+
+
+@contextmanager
+def record_llm_calls(report_id: UUID, sink: Callable[[dict[str, Any]], None]):
+    """Send every LLM call made in this context to ``sink``.
+
+    Threads started inside must run with ``contextvars.copy_context()``.
+    """
+    token = _callback.set(LLMLedgerCallback(report_id, sink))
+    try:
+        yield
+    finally:
+        _callback.reset(token)
+
+
+@contextmanager
+def ledger_scope(validator: str, filepath: str | None = None):
+    token = _scope.set(LedgerScope(validator, filepath))
+    try:
+        yield
+    finally:
+        _scope.reset(token)
@@ -3,10 +3,7 @@ from pathlib import Path
 
 from dotenv import load_dotenv
 from langchain_core.language_models import BaseChatModel
-from langchain_groq import ChatGroq
-from langchain_ollama import ChatOllama
-from langchain_openai import ChatOpenAI
-from ml.evraz_model_wrapper import ChatMistralNemo
+from ml.cassette import CassetteChatModel
 
 load_dotenv(Path(__file__).parent / ".env")
 
@@ -14,7 +11,29 @@ load_dotenv(Path(__file__).parent / ".env")
 class LLMFactory:
     @staticmethod
     def get_llm(llm_name: str) -> BaseChatModel:
+        """Create the model, recording or replaying its traffic if configured.
+
+        ``LLM_CASSETTE_MODE`` is ``record`` or ``replay``, the cassette is
+        ``LLM_CASSETTE_PATH`` and ``LLM_CASSETTE_REPLAY_TIMING`` replays answers
+        with their recorded latency.
+        """
+        llm = LLMFactory._create_llm(llm_name)
+        if mode := os.environ.get("LLM_CASSETTE_MODE"):
+            return CassetteChatModel(
+                inner=llm,
+                path=os.environ.get("LLM_CASSETTE_PATH", "llm_cassette.jsonl"),
+                mode=mode,
+                replay_timing=os.environ.get("LLM_CASSETTE_REPLAY_TIMING", "").lower()
+                in ("1", "true", "yes"),
+            )
+        return llm
+
+    @staticmethod
+    def _create_llm(llm_name: str) -> BaseChatModel:
+        # provider SDKs are slow to import, only the one in use is loaded
         if llm_name == "mistral-nemo-instruct-2407":
+            from ml.evraz_model_wrapper import ChatMistralNemo
+
             return ChatMistralNemo(
                 base_url=os.environ["EVRAZ_BASE_URL"],
                 api_key=os.environ["EVRAZ_GPT_KEY"],
@@ -22,6 +41,8 @@ class LLMFactory:
                 temperature=0,
             )
         elif llm_name == "Qwen/Qwen2.5-Coder-32B-Instruct":
+            from langchain_openai import ChatOpenAI
+
             return ChatOpenAI(
                 model="Qwen/Qwen2.5-Coder-32B-Instruct",
                 api_key=os.environ["QWEN_CODER_KEY"],
@@ -29,6 +50,8 @@ class LLMFactory:
                 # temperature=0,
             )
         elif llm_name == "llama-3.1-70b-versatile":
+            from langchain_groq import ChatGroq
+
             return ChatGroq(
                 model="llama-3.1-70b-versatile",
                 temperature=0,
@@ -38,16 +61,22 @@ class LLMFactory:
                 api_key=os.environ["GROQ_API_KEY"],
             )
         elif llm_name == "qwen2.5-coder:7b":
+            from langchain_ollama import ChatOllama
+
             return ChatOllama(
                 model="qwen2.5-coder:7b",
                 temperature=0,
             )
         elif llm_name == "qwen2.5-coder:32b":
+            from langchain_ollama import ChatOllama
+
             return ChatOllama(
                 model="qwen2.5-coder:32b",
                 temperature=0,
             )
         elif llm_name == "chatgpt":
+            from langchain_openai import ChatOpenAI
+
             return ChatOpenAI(
                 model="gpt-4o",
                 api_key=os.environ["OPENAI_API_KEY"],
@@ -57,6 +86,8 @@ class LLMFactory:
                 max_retries=2,
             )
         elif llm_name == "Phind/Phind-CodeLlama-34B-v2":
+            from langchain_openai import ChatOpenAI
+
             return ChatOpenAI(
                 model="Phind/Phind-CodeLlama-34B-v2",
                 api_key=os.environ["QWEN_CODER_KEY"],
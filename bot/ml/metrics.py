@@ -0,0 +1,84 @@
+import time
+from typing import Any
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from prometheus_client import Counter, Histogram
+
+LLM_BUCKETS = (0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+reviewer_stage_seconds = Histogram(
+    "reviewer_stage_seconds",
+    "Duration of CodeReviewer stages",
+    ["stage"],
+    buckets=LLM_BUCKETS,
+)
+validator_seconds = Histogram(
+    "reviewer_validator_seconds",
+    "Duration of one validator run on one file",
+    ["validator"],
+    buckets=LLM_BUCKETS,
+)
+file_queue_wait_seconds = Histogram(
+    "reviewer_file_queue_wait_seconds",
+    "Time a file waits for a free reviewer worker",
+    buckets=LLM_BUCKETS,
+)
+llm_request_seconds = Histogram(
+    "llm_request_seconds",
+    "LLM service time per request",
+    ["model"],
+    buckets=LLM_BUCKETS,
+)
+llm_requests = Counter("llm_requests_total", "LLM requests", ["model", "status"])
+llm_tokens = Counter("llm_tokens_total", "LLM tokens", ["model", "direction"])
+files_reviewed = Counter("reviewer_files_reviewed_total", "Files reviewed")
+files_skipped = Counter("reviewer_files_skipped_total", "Files skipped", ["reason"])
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """Records LLM service time, outcome and token usage per model.
+
+    Validators run in worker threads, so runs are tracked by ``run_id``.
+    """
+
+    def __init__(self):
+        self._runs: dict[UUID, tuple[str, float]] = {}
+
+    def on_chat_model_start(
+        self,
+        serialized: dict[str, Any],
+        messages: list,
+        *,
+        run_id: UUID,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        model = (metadata or {}).get("ls_model_name") or serialized.get("name", "")
+        self._runs[run_id] = (model, time.perf_counter())
+
+    def _finish(self, run_id: UUID, status: str) -> str | None:
+        if (run := self._runs.pop(run_id, None)) is None:
+            return None
+        model, started_at = run
+        llm_request_seconds.labels(model).observe(time.perf_counter() - started_at)
+        llm_requests.labels(model, status).inc()
+        return model
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        if (model := self._finish(run_id, "ok")) is None:
+            return
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(generation, "message", None)
+                usage = getattr(usage, "usage_metadata", None)
+                if not usage:
+                    continue
+                llm_tokens.labels(model, "input").inc(usage.get("input_tokens", 0))
+                llm_tokens.labels(model, "output").inc(usage.get("output_tokens", 0))
+
+    def on_llm_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._finish(run_id, "error")
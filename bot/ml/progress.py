@@ -0,0 +1,28 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable
+
+ProgressListener = Callable[[str, dict[str, Any]], None]
+
+_listener: ContextVar[ProgressListener | None] = ContextVar(
+    "review_progress_listener", default=None
+)
+
+
+@contextmanager
+def report_progress(listener: ProgressListener):
+    """Send the progress events of reviews run in this context to ``listener``.
+
+    Events are emitted from worker threads, which must run with
+    ``contextvars.copy_context()``.
+    """
+    token = _listener.set(listener)
+    try:
+        yield
+    finally:
+        _listener.reset(token)
+
+
+def emit_progress(event: str, **data: Any) -> None:
+    if (listener := _listener.get()) is not None:
+        listener(event, data)
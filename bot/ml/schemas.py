@@ -23,3 +23,8 @@ class OutputJson(BaseModel):
     )
     code_comments: list[CodeComment]
     project_comments: list[ProjectComment]
+
+
+class ProjectReview(BaseModel):
+    layers: dict[str, str] = Field(description="Слой каждой директории с кодом")
+    comments: list[ProjectComment] = Field(description="Недочеты в структуре проекта")
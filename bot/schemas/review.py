@@ -37,3 +37,35 @@ class ReviewSchema(BaseModel):
     )
     code_comments: list[CodeCommentSchema]
     project_comments: list[ProjectCommentSchema]
+
+
+class ReviewCommentSchema(CodeCommentSchema):
+    id: int
+
+
+class ReviewCommentsPageSchema(BaseModel):
+    items: list[ReviewCommentSchema]
+    next_cursor: int | None = Field(
+        description="Курсор следующей страницы, если она есть", default=None
+    )
+
+
+class TitleCountSchema(BaseModel):
+    title: str = Field(description="Название раздела")
+    count: int = Field(description="Количество комментариев")
+
+
+class FileCountSchema(BaseModel):
+    filepath: str = Field(description="Путь до файла")
+    count: int = Field(description="Количество комментариев")
+
+
+class ReviewSummarySchema(BaseModel):
+    id: UUID
+    titles: list[str] = Field(
+        description="Список возможных разделов, к которым относятся комментарии"
+    )
+    code_comments_count: int
+    by_title: list[TitleCountSchema]
+    by_file: list[FileCountSchema]
+    project_comments: list[ProjectCommentSchema]
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+from typing import Any
+
+from database import engine
+from prometheus_client import Counter, Gauge
+from sqlalchemy import insert
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+buffered_rows = Gauge("buffered_writer_rows", "Rows waiting to be flushed", ["table"])
+flushed_rows = Counter(
+    "buffered_writer_flushed_rows_total", "Rows written to the database", ["table"]
+)
+dropped_rows = Counter(
+    "buffered_writer_dropped_rows_total", "Rows lost on a failed flush", ["table"]
+)
+
+
+class BufferedWriter:
+    """Collects rows in memory and writes them with multi-row INSERTs.
+
+    A batch is flushed once it reaches ``batch_size`` rows or when
+    ``flush_interval`` seconds have passed since its first row. ``put`` waits
+    while ``buffer_size`` rows are already queued, so a slow database slows
+    the producers down instead of growing the buffer without bound.
+    """
+
+    def __init__(self, model, batch_size: int, buffer_size: int, flush_interval: float):
+        self.table = model.__table__
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(buffer_size)
+        self.task: asyncio.Task | None = None
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.metric_labels = {"table": self.table.name}
+
+    def start(self) -> None:
+        if self.task is None:
+            self.loop = asyncio.get_running_loop()
+            self.task = self.loop.create_task(self._run())
+
+    async def put(self, row: dict[str, Any]) -> None:
+        self.start()
+        await self.queue.put(row)
+        buffered_rows.labels(**self.metric_labels).inc()
+
+    def put_threadsafe(self, row: dict[str, Any]) -> None:
+        """``put`` for worker threads; blocks the thread while the buffer is full.
+
+        The writer must have been started on its event loop beforehand.
+        """
+        asyncio.run_coroutine_threadsafe(self.put(row), self.loop).result()
+
+    async def _next_batch(self) -> tuple[list[dict[str, Any]], bool]:
+        batch = []
+        row = await self.queue.get()
+        deadline = asyncio.get_running_loop().time() + self.flush_interval
+        while row is not _STOP:
+            batch.append(row)
+            timeout = deadline - asyncio.get_running_loop().time()
+            if len(batch) >= self.batch_size or timeout <= 0:
+                return batch, False
+            try:
+                row = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                return batch, False
+        return batch, True
+
+    async def flush(self, batch: list[dict[str, Any]]) -> None:
+        if not batch:
+            return
+        buffered_rows.labels(**self.metric_labels).dec(len(batch))
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(insert(self.table), batch)
+        except Exception:
+            dropped_rows.labels(**self.metric_labels).inc(len(batch))
+            logger.exception("Failed to write %s %s rows", len(batch), self.table)
+        else:
+            flushed_rows.labels(**self.metric_labels).inc(len(batch))
+
+    async def _run(self) -> None:
+        stopped = False
+        while not stopped:
+            batch, stopped = await self._next_batch()
+            await self.flush(batch)
+
+    async def close(self) -> None:
+        """Flush everything buffered so far and stop the background flusher."""
+        if self.task is None:
+            return
+        await self.queue.put(_STOP)
+        await self.task
+        self.task = None
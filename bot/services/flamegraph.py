@@ -0,0 +1,91 @@
+import hashlib
+from collections import Counter
+
+from markupsafe import escape
+
+WIDTH = 1200
+FRAME_HEIGHT = 16
+FONT_SIZE = 11
+CHAR_WIDTH = 6.5
+PADDING = 10
+TITLE_HEIGHT = 30
+
+
+class _Node:
+    __slots__ = ("name", "samples", "children")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.samples = 0
+        self.children: dict[str, "_Node"] = {}
+
+
+def _build_tree(stacks: Counter) -> _Node:
+    root = _Node("all")
+    for stack, samples in stacks.items():
+        root.samples += samples
+        node = root
+        for name in stack:
+            node = node.children.setdefault(name, _Node(name))
+            node.samples += samples
+    return root
+
+
+def _depth(node: _Node) -> int:
+    return 1 + max((_depth(child) for child in node.children.values()), default=0)
+
+
+def _color(name: str) -> str:
+    digest = hashlib.md5(name.encode()).digest()
+    return f"rgb({205 + digest[0] % 50},{digest[1] % 190},{digest[2] % 55})"
+
+
+def render_flamegraph(stacks: Counter, title: str) -> str:
+    """Render collapsed stacks (root first) as a standalone SVG flame graph.
+
+    Frames are sorted by name so that the same code lines up across graphs;
+    hovering a frame shows its sample count.
+    """
+    root = _build_tree(stacks)
+    height = TITLE_HEIGHT + _depth(root) * FRAME_HEIGHT + PADDING
+    scale = (WIDTH - 2 * PADDING) / max(root.samples, 1)
+
+    rects = []
+
+    def draw(node: _Node, x: float, level: int) -> None:
+        width = node.samples * scale
+        if width < 0.5:
+            return
+        y = height - PADDING - (level + 1) * FRAME_HEIGHT
+        share = 100 * node.samples / max(root.samples, 1)
+        label = escape(node.name)
+        text = ""
+        if (chars := int(width / CHAR_WIDTH)) >= 3:
+            shown = node.name if len(node.name) <= chars else node.name[: chars - 2]
+            if shown != node.name:
+                shown += ".."
+            text = (
+                f'<text x="{x + 3:.1f}" y="{y + FRAME_HEIGHT - 4}">'
+                f"{escape(shown)}</text>"
+            )
+        rects.append(
+            f"<g><title>{label} ({node.samples} samples, {share:.2f}%)</title>"
+            f'<rect x="{x:.1f}" y="{y}" width="{width:.1f}" '
+            f'height="{FRAME_HEIGHT - 1}" fill="{_color(node.name)}" rx="2"/>'
+            f"{text}</g>"
+        )
+        for name in sorted(node.children):
+            child = node.children[name]
+            draw(child, x, level + 1)
+            x += child.samples * scale
+
+    draw(root, PADDING, 0)
+
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{WIDTH}" '
+        f'height="{height}" viewBox="0 0 {WIDTH} {height}" '
+        f'font-family="monospace" font-size="{FONT_SIZE}">'
+        f'<rect width="100%" height="100%" fill="#f8f8f8"/>'
+        f'<text x="{WIDTH / 2}" y="20" text-anchor="middle" font-size="14">'
+        f"{escape(title)}</text>" + "".join(rects) + "</svg>"
+    )
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+from datetime import date, datetime, time, timezone
+
+from database import History, engine
+from services.buffered_writer import BufferedWriter
+from settings import history_settings
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = "histories_p"
+DEFAULT_PARTITION = "histories_default"
+
+history_writer = BufferedWriter(
+    History,
+    batch_size=history_settings.HISTORY_BATCH_SIZE,
+    buffer_size=history_settings.HISTORY_BUFFER_SIZE,
+    flush_interval=history_settings.HISTORY_FLUSH_INTERVAL,
+)
+
+
+async def record_history(user_id: str, chat_id: str, command: str | None) -> None:
+    await history_writer.put(
+        {
+            "user_id": user_id,
+            "chat_id": chat_id,
+            "command": command[:255] if command else command,
+            "created_at": datetime.now(timezone.utc),
+        }
+    )
+
+
+def _add_months(month: date, months: int) -> date:
+    year, month_index = divmod(month.year * 12 + month.month - 1 + months, 12)
+    return date(year, month_index + 1, 1)
+
+
+def _partition_name(month: date) -> str:
+    return f"{PARTITION_PREFIX}{month:%Y%m}"
+
+
+async def _create_history_partition(conn, month: date) -> int:
+    """Create the partition of ``month`` and move its rows out of the default one.
+
+    Rows of a month without a partition land in the default partition, and a
+    partition whose range holds such rows cannot be created while the default
+    one is attached. Returns the number of moved rows.
+    """
+    partition = _partition_name(month)
+    bounds = {
+        "start": datetime.combine(month, time(), timezone.utc),
+        "end": datetime.combine(_add_months(month, 1), time(), timezone.utc),
+    }
+    in_range = "created_at >= :start AND created_at < :end"
+    create_partition = text(
+        f"CREATE TABLE {partition} PARTITION OF histories FOR VALUES "
+        f"FROM ('{bounds['start'].isoformat()}') TO ('{bounds['end'].isoformat()}')"
+    )
+
+    if not await conn.scalar(
+        text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_range})"),
+        bounds,
+    ):
+        await conn.execute(create_partition)
+        return 0
+
+    await conn.execute(
+        text(f"ALTER TABLE histories DETACH PARTITION {DEFAULT_PARTITION}")
+    )
+    await conn.execute(create_partition)
+    moved = await conn.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {in_range} "
+            f"RETURNING *) INSERT INTO {partition} SELECT * FROM moved"
+        ),
+        bounds,
+    )
+    await conn.execute(
+        text(f"ALTER TABLE histories ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT")
+    )
+    return moved.rowcount
+
+
+async def create_history_partitions(months_ahead: int) -> None:
+    """Create monthly partitions from the current month ``months_ahead`` on.
+
+    Each month is created in its own transaction, so one failing month is
+    logged and does not keep the others from being created.
+    """
+    current_month = datetime.now(timezone.utc).date().replace(day=1)
+    for offset in range(months_ahead + 1):
+        month = _add_months(current_month, offset)
+        partition = _partition_name(month)
+        try:
+            async with engine.begin() as conn:
+                if await conn.scalar(
+                    text("SELECT to_regclass(:name)"), {"name": partition}
+                ):
+                    continue
+                moved = await _create_history_partition(conn, month)
+        except Exception:
+            logger.exception("Failed to create history partition %s", partition)
+            continue
+
+        if moved:
+            logger.info(
+                "Created history partition %s, moved %s rows from %s",
+                partition,
+                moved,
+                DEFAULT_PARTITION,
+            )
+
+
+async def drop_expired_history_partitions(retention_months: int) -> list[str]:
+    """Drop monthly partitions older than ``retention_months`` whole months."""
+    current_month = datetime.now(timezone.utc).date().replace(day=1)
+    oldest_kept = _partition_name(_add_months(current_month, -retention_months))
+    get_partitions_query = text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON pg_inherits.inhparent = parent.oid "
+        "JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+        "WHERE parent.relname = 'histories'"
+    )
+
+    dropped = []
+    async with engine.begin() as conn:
+        partitions = (await conn.execute(get_partitions_query)).scalars().all()
+        for partition in sorted(partitions):
+            suffix = partition.removeprefix(PARTITION_PREFIX)
+            if len(suffix) != 6 or not suffix.isdigit() or partition >= oldest_kept:
+                continue
+            await conn.execute(text(f"DROP TABLE {partition}"))
+            dropped.append(partition)
+    return dropped
+
+
+async def maintain_history_partitions() -> None:
+    await create_history_partitions(history_settings.HISTORY_PARTITIONS_AHEAD)
+    if dropped := await drop_expired_history_partitions(
+        history_settings.HISTORY_RETENTION_MONTHS
+    ):
+        logger.info("Dropped expired history partitions: %s", ", ".join(dropped))
+
+
+async def run_history_maintenance(interval: int) -> None:
+    while True:
+        try:
+            await maintain_history_partitions()
+        except Exception:
+            logger.exception("History partition maintenance failed")
+        await asyncio.sleep(interval)
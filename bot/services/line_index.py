@@ -0,0 +1,87 @@
+import io
+import mmap
+import os
+import re
+from array import array
+
+# Smaller files are read into memory, larger ones are memory-mapped
+MMAP_THRESHOLD = 1024 * 1024
+# line endings of a file read in text mode
+NEWLINE = re.compile(rb"\r\n?|\n")
+
+
+class LineIndex:
+    """Offsets of the lines of a source file, for slicing windows out of it.
+
+    The file is read once; windows are decoded from the underlying buffer on
+    demand, so only the requested lines are ever copied. Lines end at
+    ``\n``, ``\r\n`` or a lone ``\r``, as in a file read in text mode.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size >= MMAP_THRESHOLD:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self._data = f.read()
+
+        self._starts = array("Q", [0])
+        self._starts.extend(match.end() for match in NEWLINE.finditer(self._data))
+        if self._starts[-1] == len(self._data):
+            self._starts.pop()
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def lines(self, first_index: int, last_index: int) -> list[str]:
+        """Return lines ``[first_index, last_index)`` with their line endings."""
+        last_index = min(last_index, len(self))
+        if first_index >= last_index:
+            return []
+        start = self._starts[first_index]
+        end = self._starts[last_index] if last_index < len(self) else len(self._data)
+        text = self._data[start:end].decode(errors="replace")
+        # same line endings as reading the file in text mode
+        return io.StringIO(text, newline=None).readlines()
+
+    def close(self) -> None:
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+
+
+class LineIndexCache:
+    """Line indexes of the files of one review, built at most once per file.
+
+    A file is looked up relative to the review directory first, then as is.
+    Files that cannot be read are remembered as missing.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._indexes: dict[str, LineIndex | None] = {}
+
+    def get(self, filepath: str) -> LineIndex | None:
+        if filepath not in self._indexes:
+            self._indexes[filepath] = self._open(filepath)
+        return self._indexes[filepath]
+
+    def _open(self, filepath: str) -> LineIndex | None:
+        for path in (f"{self.root}/{filepath}", filepath):
+            try:
+                return LineIndex(path)
+            except OSError:
+                continue
+        return None
+
+    def close(self) -> None:
+        for index in self._indexes.values():
+            if index is not None:
+                index.close()
+        self._indexes.clear()
+
+    def __enter__(self) -> "LineIndexCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,23 @@
+from contextlib import contextmanager
+from uuid import UUID
+
+from database import LLMCall
+from services.buffered_writer import BufferedWriter
+
+llm_call_writer = BufferedWriter(
+    LLMCall, batch_size=200, buffer_size=10_000, flush_interval=2.0
+)
+
+
+@contextmanager
+def record_review_llm_calls(report_id: UUID):
+    """Write every LLM call of the review to the ``llm_calls`` ledger.
+
+    Must be entered on the event loop; the calls themselves may happen in
+    worker threads.
+    """
+    from ml.ledger import record_llm_calls
+
+    llm_call_writer.start()
+    with record_llm_calls(report_id, llm_call_writer.put_threadsafe):
+        yield
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from weakref import WeakKeyDictionary
+
+from prometheus_client import Counter, Histogram
+from settings import monitoring_settings
+
+logger = logging.getLogger(__name__)
+
+loop_lag_seconds = Histogram(
+    "event_loop_lag_seconds",
+    "Delay of event loop callbacks past their scheduled time, seconds",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+loop_stalls = Counter(
+    "event_loop_stalls_total", "Event loop stalls longer than the block threshold"
+)
+
+# filled by middleware.UpdateTaskMiddleware, so a stall can be traced to the
+# Telegram update whose handler blocked the loop
+update_tasks: WeakKeyDictionary[asyncio.Task, int] = WeakKeyDictionary()
+
+
+class LoopMonitor:
+    """Measures event loop lag and reports what blocks the loop.
+
+    A task on the loop sleeps for ``interval`` and records how late it wakes
+    up. A watchdog thread checks that the task keeps waking up; once it is
+    ``threshold`` seconds overdue the loop is stuck in a blocking call, and
+    the watchdog logs the loop thread's stack while it is still blocked.
+    """
+
+    def __init__(self, interval: float, threshold: float):
+        self.interval = interval
+        self.threshold = threshold
+        self.task: asyncio.Task | None = None
+        self.watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        if self.task is not None:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.heartbeat = time.monotonic()
+        self._stopped.clear()
+        self.task = self.loop.create_task(self._measure())
+        self.watchdog = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self.watchdog.start()
+
+    async def _measure(self) -> None:
+        while True:
+            started_at = self.loop.time()
+            await asyncio.sleep(self.interval)
+            lag = self.loop.time() - started_at - self.interval
+            loop_lag_seconds.observe(max(lag, 0.0))
+            self.heartbeat = time.monotonic()
+
+    def _watch(self) -> None:
+        reported_heartbeat = None
+        while not self._stopped.wait(self.interval):
+            heartbeat = self.heartbeat
+            stalled = time.monotonic() - heartbeat - self.interval
+            # one report per stall
+            if stalled >= self.threshold and heartbeat != reported_heartbeat:
+                reported_heartbeat = heartbeat
+                loop_stalls.inc()
+                self._report(stalled)
+
+    def _report(self, stalled: float) -> None:
+        frame = sys._current_frames().get(self.loop_thread_id)
+        task = asyncio.current_task(self.loop)
+        logger.warning(
+            "Event loop blocked for over %.2fs, update %s, task %s:\n%s",
+            stalled,
+            update_tasks.get(task) if task else None,
+            task.get_name() if task else None,
+            "".join(traceback.format_stack(frame)) if frame else "",
+        )
+
+    def stop(self) -> None:
+        if self.task is None:
+            return
+        self.task.cancel()
+        self._stopped.set()
+        self.watchdog.join()
+        self.task = None
+
+
+loop_monitor = LoopMonitor(
+    monitoring_settings.LOOP_MONITOR_INTERVAL,
+    monitoring_settings.LOOP_BLOCK_THRESHOLD,
+)
@@ -0,0 +1,153 @@
+import itertools
+from collections import defaultdict
+
+from reportlab.lib.colors import HexColor
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen.canvas import Canvas
+from schemas.review import ReviewSchema
+from settings import report_settings
+
+FONT = "ReportSans"
+BOLD_FONT = "ReportSans-Bold"
+MONO_FONT = "ReportMono"
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+MARGIN = 15 * mm
+TEXT_WIDTH = PAGE_WIDTH - 2 * MARGIN
+
+TEXT_COLOR = HexColor("#00141f")
+SUBTEXT_COLOR = HexColor("#00141f66")
+CODE_BORDER_COLOR = HexColor("#c3e6f7")
+SUGGESTION_BORDER_COLOR = HexColor("#d0fff4")
+
+
+def _register_fonts() -> None:
+    if FONT in pdfmetrics.getRegisteredFontNames():
+        return
+    pdfmetrics.registerFont(TTFont(FONT, report_settings.PDF_FONT_PATH))
+    pdfmetrics.registerFont(TTFont(BOLD_FONT, report_settings.PDF_BOLD_FONT_PATH))
+    pdfmetrics.registerFont(TTFont(MONO_FONT, report_settings.PDF_MONO_FONT_PATH))
+
+
+class ReviewPdfWriter:
+    """Lays a review out page by page straight onto a PDF canvas."""
+
+    def __init__(self, pdf_path: str):
+        _register_fonts()
+        # invariant output lets the artifact store deduplicate identical reports
+        self.canvas = Canvas(pdf_path, pagesize=A4, pageCompression=1, invariant=1)
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def _ensure_space(self, height: float) -> None:
+        if self.y - height < MARGIN:
+            self.canvas.showPage()
+            self.y = PAGE_HEIGHT - MARGIN
+
+    def text(
+        self,
+        text: str,
+        font: str = FONT,
+        size: float = 10,
+        indent: float = 0,
+        color=TEXT_COLOR,
+        space_after: float = 2,
+    ) -> None:
+        leading = size * 1.3
+        self.canvas.setFillColor(color)
+        for paragraph in text.splitlines() or [""]:
+            for line in simpleSplit(paragraph, font, size, TEXT_WIDTH - indent) or [""]:
+                self._ensure_space(leading)
+                self.y -= leading
+                self.canvas.setFont(font, size)
+                self.canvas.drawString(MARGIN + indent, self.y, line)
+        self.y -= space_after
+
+    def code(self, lines: list[tuple[int | None, str]], border_color) -> None:
+        size = 8
+        leading = size * 1.35
+        number_width = 10 * mm
+        code_width = TEXT_WIDTH - number_width - 4 * mm
+        self.y -= 4
+        for number, text in lines:
+            wrapped = simpleSplit(text.rstrip("\n"), MONO_FONT, size, code_width)
+            for index, chunk in enumerate(wrapped or [""]):
+                self._ensure_space(leading)
+                top = self.y
+                self.y -= leading
+                self.canvas.setStrokeColor(border_color)
+                self.canvas.setLineWidth(2)
+                self.canvas.line(MARGIN, top, MARGIN, self.y)
+                self.canvas.setFont(MONO_FONT, size)
+                if number is not None and index == 0:
+                    self.canvas.setFillColor(SUBTEXT_COLOR)
+                    self.canvas.drawRightString(
+                        MARGIN + number_width, self.y + 2, str(number)
+                    )
+                self.canvas.setFillColor(TEXT_COLOR)
+                self.canvas.drawString(
+                    MARGIN + number_width + 4 * mm, self.y + 2, chunk
+                )
+        self.y -= 8
+
+    def write(self, filename: str, date: str, review: ReviewSchema) -> None:
+        title_remarks = defaultdict(list)
+        for comment in itertools.chain(review.code_comments, review.project_comments):
+            title_remarks[comment.title].append(comment)
+        sorted_title_remarks = sorted(
+            title_remarks.items(), key=lambda item: review.titles.index(item[0])
+        )
+
+        self.canvas.setTitle(f"Отчёт по репозиторию: {filename}")
+        self.text(f"Анализ проекта {filename} от {date}", BOLD_FONT, 16)
+        self.text(
+            f"Дата последнего изменения проекта: {date}",
+            size=8,
+            color=SUBTEXT_COLOR,
+            space_after=10,
+        )
+        total = len(review.code_comments) + len(review.project_comments)
+        self.text(f"Замечаний: {total}", BOLD_FONT, 11)
+        for title, remarks in sorted_title_remarks:
+            self.text(f"{title}: {len(remarks)}", size=9, indent=6 * mm)
+        self.y -= 8
+
+        for title, remarks in sorted_title_remarks:
+            self._ensure_space(40)
+            self.text(title, BOLD_FONT, 13, space_after=6)
+            for remark in remarks:
+                if not hasattr(remark, "suggestion"):
+                    self.text(remark.comment, space_after=8)
+                    continue
+
+                self._ensure_space(60)
+                self.text(remark.filepath, BOLD_FONT, 10)
+                self.text(remark.comment, size=9)
+                self.code(
+                    [(line.order, line.text) for line in remark.lines],
+                    CODE_BORDER_COLOR,
+                )
+                if suggestion := (remark.suggestion or "").strip():
+                    suggestion = suggestion.replace("```python", "").replace("```", "")
+                    self.text("Предложенные изменения", size=9)
+                    self.code(
+                        [
+                            (number, line)
+                            for number, line in enumerate(
+                                suggestion.strip("\n").splitlines(), start=1
+                            )
+                        ],
+                        SUGGESTION_BORDER_COLOR,
+                    )
+                self.y -= 6
+
+        self.canvas.save()
+
+
+def write_review_pdf(
+    filename: str, date: str, review: ReviewSchema, pdf_path: str
+) -> None:
+    ReviewPdfWriter(pdf_path).write(filename, date, review)
@@ -0,0 +1,91 @@
+import json
+
+from database import Chat, User, redis_connection
+from settings import redis_settings
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+USER_COLUMNS = (
+    User.telegram_id,
+    User.full_name,
+    User.is_superuser,
+    User.is_active_conversation,
+    User.is_banned,
+    User.profile_reviews,
+)
+CHAT_COLUMNS = (Chat.id, Chat.type)
+
+
+def _user_key(telegram_id: str) -> str:
+    return f"profile:user:{telegram_id}"
+
+
+def _chat_key(chat_id: str) -> str:
+    return f"profile:chat:{chat_id}"
+
+
+async def _get_or_create_profile(
+    session: AsyncSession, cached: bytes | None, key: str, model, columns, **values
+) -> dict:
+    """Return the cached profile row, inserting it on a cache miss.
+
+    On a miss a single ``INSERT ... ON CONFLICT DO NOTHING RETURNING`` covers
+    new users; only a row that already exists costs an extra SELECT.
+    """
+    if cached is not None:
+        return json.loads(cached)
+
+    insert_profile = (
+        insert(model).values(**values).on_conflict_do_nothing().returning(*columns)
+    )
+    profile = (await session.execute(insert_profile)).mappings().first()
+    if profile is None:
+        pk = model.__mapper__.primary_key[0]
+        ans = await session.execute(select(*columns).where(pk == values[pk.key]))
+        profile = ans.mappings().one()
+    profile = dict(profile)
+    await session.commit()
+
+    await redis_connection.set_expire(
+        key, json.dumps(profile), redis_settings.PROFILE_CACHE_TTL
+    )
+    return profile
+
+
+async def get_or_create_profiles(
+    session: AsyncSession,
+    telegram_id: str,
+    full_name: str,
+    chat_id: str,
+    chat_type: str,
+) -> tuple[User, Chat]:
+    """Resolve the user and chat of an update with one MGET on the hot path.
+
+    The returned objects are detached: their fields are a cached snapshot.
+    """
+    user_key, chat_key = _user_key(telegram_id), _chat_key(chat_id)
+    cached_user, cached_chat = await redis_connection.get_many([user_key, chat_key])
+    user = await _get_or_create_profile(
+        session,
+        cached_user,
+        user_key,
+        User,
+        USER_COLUMNS,
+        telegram_id=telegram_id,
+        full_name=full_name,
+    )
+    chat = await _get_or_create_profile(
+        session,
+        cached_chat,
+        chat_key,
+        Chat,
+        CHAT_COLUMNS,
+        id=chat_id,
+        type=chat_type,
+    )
+    return User(**user), Chat(**chat)
+
+
+async def invalidate_user(telegram_id: str) -> None:
+    await redis_connection.delete(_user_key(telegram_id))
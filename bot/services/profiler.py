@@ -0,0 +1,174 @@
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Literal
+
+from database import ReviewProfile
+from services.flamegraph import render_flamegraph
+from services.storage import artifact_store
+from settings import profiler_settings
+
+ProfileTrigger = Literal["user", "header", "slow"]
+
+# innermost frames of threads that are parked waiting for work
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+    ("threading.py", "wait"),
+}
+
+_tracemalloc_users = 0
+_tracemalloc_lock = threading.Lock()
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)})"
+
+
+class SamplingProfiler:
+    """Samples the Python stacks of every thread from a background thread.
+
+    The review runs on the event loop and in reviewer worker threads, so all
+    threads are sampled; work of concurrent requests shows up as well.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter[tuple[str, ...]] = Counter()
+        self.samples = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="review-profiler", daemon=True
+        )
+
+    def _sample(self) -> None:
+        threads = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            code = frame.f_code
+            if ident == self._thread.ident or (
+                (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+            ):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            stack.append(threads.get(ident, str(ident)))
+            self.stacks[tuple(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self._sample()
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+
+def _start_tracemalloc() -> tracemalloc.Snapshot:
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0:
+            tracemalloc.start(profiler_settings.PROFILE_TRACEMALLOC_FRAMES)
+        _tracemalloc_users += 1
+    return tracemalloc.take_snapshot()
+
+
+def _stop_tracemalloc(before: tracemalloc.Snapshot) -> list[dict]:
+    """Return the lines whose live allocations grew the most since ``before``."""
+    global _tracemalloc_users
+    after = tracemalloc.take_snapshot()
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0:
+            tracemalloc.stop()
+
+    filters = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ]
+    stats = after.filter_traces(filters).compare_to(
+        before.filter_traces(filters), "lineno"
+    )
+    return [
+        {
+            "file": stat.traceback[0].filename,
+            "line": stat.traceback[0].lineno,
+            "size_diff_kb": round(stat.size_diff / 1024, 1),
+            "size_kb": round(stat.size / 1024, 1),
+            "count_diff": stat.count_diff,
+        }
+        for stat in stats[: profiler_settings.PROFILE_TOP_ALLOCATIONS]
+    ]
+
+
+class ReviewProfiler:
+    """Profiles one review when asked to or when it turns out to be slow.
+
+    With ``PROFILE_SLOW_REVIEW_SECONDS`` set every review is sampled and the
+    profile is kept only for slow ones. Allocation tracking is expensive, so
+    it is done only for reviews profiled on request.
+    """
+
+    def __init__(self, trigger: ProfileTrigger | None = None):
+        self.trigger = trigger
+        self.threshold = profiler_settings.PROFILE_SLOW_REVIEW_SECONDS
+        self.sampler: SamplingProfiler | None = None
+        self.allocations_before: tracemalloc.Snapshot | None = None
+        self.allocations: list[dict] | None = None
+        self.duration = 0.0
+
+    async def __aenter__(self) -> "ReviewProfiler":
+        if self.trigger is None and self.threshold is None:
+            return self
+        if self.trigger is not None:
+            # snapshots walk every traced allocation, keep them off the loop
+            self.allocations_before = await asyncio.to_thread(_start_tracemalloc)
+        self.sampler = SamplingProfiler(profiler_settings.PROFILE_SAMPLE_INTERVAL)
+        self.sampler.start()
+        self.started_at = time.perf_counter()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        if self.sampler is None:
+            return
+        self.duration = time.perf_counter() - self.started_at
+        self.sampler.stop()
+        if self.allocations_before is not None:
+            self.allocations = await asyncio.to_thread(
+                _stop_tracemalloc, self.allocations_before
+            )
+        if self.trigger is None and self.duration >= self.threshold:
+            self.trigger = "slow"
+
+    async def create_profile(self, title: str) -> ReviewProfile | None:
+        """Store the flame graph and return the profile, if one was captured."""
+        if self.sampler is None or self.trigger is None:
+            return None
+
+        svg = await asyncio.to_thread(
+            render_flamegraph, self.sampler.stacks, f"{title}, {self.duration:.1f}s"
+        )
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            svg_path = f"{tmpdirname}/flamegraph.svg"
+            with open(svg_path, "w") as f:
+                f.write(svg)
+            flamegraph_path = await artifact_store.put_file(svg_path, ".svg")
+
+        return ReviewProfile(
+            trigger=self.trigger,
+            duration=self.duration,
+            samples=self.sampler.samples,
+            flamegraph_path=flamegraph_path,
+            allocations=self.allocations,
+        )
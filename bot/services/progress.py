@@ -0,0 +1,233 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncGenerator
+from uuid import UUID, uuid4
+
+import orjson
+from database import redis_connection
+from ml.progress import report_progress
+from redis.exceptions import RedisError
+from settings import report_settings
+
+logger = logging.getLogger(__name__)
+
+EVENTS_CHANNEL_PATTERN = "review:*:events"
+FINAL_EVENTS = ("done", "failed")
+
+_STOP = object()
+
+
+def events_channel(report_id: UUID) -> str:
+    return f"review:{report_id}:events"
+
+
+def events_log_key(report_id: UUID) -> str:
+    return f"review:{report_id}:events:log"
+
+
+class ReviewProgress:
+    """Progress of one review, published to Redis as numbered events.
+
+    Every event is appended to a replay list that lives for
+    ``REVIEW_EVENTS_TTL`` and published on the review channel, so a client
+    that connects late or reconnects with the last id it saw misses nothing.
+    Events are published in order by one task, as many per round trip as
+    have queued up. A Redis failure is logged and does not stop the review.
+
+    The current stage and counters are kept for readers in this process.
+    """
+
+    def __init__(self, report_id: UUID | None = None):
+        self.report_id = report_id or uuid4()
+        self.stage: str | None = None
+        self.files_done = 0
+        self.files_total = 0
+        self.comments = 0
+        self.finished = False
+        self._sequence = 0
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    async def open(self) -> None:
+        """Publish the ``started`` event; the review is visible once this returns."""
+        self._loop = asyncio.get_running_loop()
+        await self._publish([self._encode("started", {})])
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Publish everything emitted so far, ending with ``failed`` if unfinished."""
+        if not self.finished:
+            self.fail("error")
+        self._queue.put_nowait(_STOP)
+        await self._task
+
+    async def __aenter__(self) -> "ReviewProgress":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def emit(self, event: str, data: dict[str, Any]) -> None:
+        if event == "stage":
+            self.stage = data["stage"]
+        elif event == "files":
+            self.files_done, self.files_total = data["done"], data["total"]
+        elif event == "comment":
+            self.comments += 1
+        self._queue.put_nowait(self._encode(event, data))
+
+    def emit_threadsafe(self, event: str, data: dict[str, Any]) -> None:
+        self._loop.call_soon_threadsafe(self.emit, event, data)
+
+    @contextmanager
+    def track(self):
+        """Collect the events of ``ml.progress.emit_progress`` in this context."""
+        with report_progress(self.emit_threadsafe):
+            yield
+
+    def finish(self) -> None:
+        self.emit("done", {"report_id": str(self.report_id)})
+        self.finished = True
+
+    def fail(self, reason: str) -> None:
+        self.emit("failed", {"reason": reason})
+        self.finished = True
+
+    def _encode(self, event: str, data: dict[str, Any]) -> bytes:
+        self._sequence += 1
+        return orjson.dumps({"id": self._sequence, "event": event, "data": data})
+
+    async def _publish(self, events: list[bytes]) -> None:
+        try:
+            await redis_connection.append_publish_expire(
+                events_log_key(self.report_id),
+                events_channel(self.report_id),
+                events,
+                report_settings.REVIEW_EVENTS_TTL,
+            )
+        except RedisError:
+            logger.exception("Failed to publish progress of %s", self.report_id)
+
+    async def _run(self) -> None:
+        stopped = False
+        while not stopped:
+            events = [await self._queue.get()]
+            while not self._queue.empty():
+                events.append(self._queue.get_nowait())
+            if events[-1] is _STOP:
+                events.pop()
+                stopped = True
+            if events:
+                await self._publish(events)
+
+
+class ReviewEventsHub:
+    """Fans review events out from Redis to the streams open in this process.
+
+    A single pattern subscription serves every stream, so open streams do not
+    hold a connection of the Redis pool each. If the subscription breaks, the
+    streams end and clients reconnect with the last event id they received.
+    """
+
+    def __init__(self):
+        self._pubsub = None
+        self._reader: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+        self._queues: dict[bytes, set[asyncio.Queue]] = {}
+
+    async def _start(self) -> None:
+        async with self._lock:
+            if self._reader is not None:
+                return
+            self._pubsub = redis_connection.pubsub()
+            await self._pubsub.psubscribe(EVENTS_CHANNEL_PATTERN)
+            # events published after the confirmation are never missed
+            await self._pubsub.get_message(timeout=None)
+            self._reader = asyncio.create_task(self._read())
+
+    async def _read(self) -> None:
+        try:
+            async for message in self._pubsub.listen():
+                if message["type"] == "pmessage":
+                    for queue in self._queues.get(message["channel"], ()):
+                        queue.put_nowait(message["data"])
+        except RedisError:
+            logger.exception("Review events subscription failed")
+        finally:
+            await self._pubsub.aclose()
+            self._reader = None
+            for queues in self._queues.values():
+                for queue in queues:
+                    queue.put_nowait(None)
+
+    @asynccontextmanager
+    async def subscribe(self, report_id: UUID):
+        """Yield a queue of the raw events of a review, ``None`` ends it."""
+        await self._start()
+        channel = events_channel(report_id).encode()
+        queue = asyncio.Queue()
+        self._queues.setdefault(channel, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self._queues[channel]
+            queues.discard(queue)
+            if not queues:
+                del self._queues[channel]
+
+    async def close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+            await asyncio.gather(self._reader, return_exceptions=True)
+
+
+review_events_hub = ReviewEventsHub()
+
+
+async def has_review_events(report_id: UUID) -> bool:
+    return await redis_connection.exists(events_log_key(report_id))
+
+
+async def review_events(
+    report_id: UUID, last_event_id: int = 0
+) -> AsyncGenerator[dict[str, Any] | None, None]:
+    """Yield the events of a review after ``last_event_id`` until it ends.
+
+    Stored events are replayed first, then live ones follow. ``None`` is
+    yielded after ``REVIEW_EVENTS_KEEPALIVE`` seconds without events; the
+    stream also ends once the events have expired, e.g. when the process
+    running the review died.
+    """
+    async with review_events_hub.subscribe(report_id) as queue:
+        log_key = events_log_key(report_id)
+        for raw_event in await redis_connection.get_list(log_key, last_event_id):
+            event = orjson.loads(raw_event)
+            yield event
+            last_event_id = event["id"]
+            if event["event"] in FINAL_EVENTS:
+                return
+
+        while True:
+            try:
+                raw_event = await asyncio.wait_for(
+                    queue.get(), report_settings.REVIEW_EVENTS_KEEPALIVE
+                )
+            except asyncio.TimeoutError:
+                if not await redis_connection.exists(log_key):
+                    return
+                yield None
+                continue
+            if raw_event is None:
+                return
+
+            event = orjson.loads(raw_event)
+            # events published while the log was replayed arrive twice
+            if event["id"] <= last_event_id:
+                continue
+            yield event
+            last_event_id = event["id"]
+            if event["event"] in FINAL_EVENTS:
+                return
@@ -0,0 +1,202 @@
+import asyncio
+import itertools
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import pdfkit
+import pytz
+from jinja2 import (
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    select_autoescape,
+)
+from markupsafe import Markup, escape
+from prometheus_client import Gauge, Histogram
+from schemas.review import ReviewSchema
+from services.pdf_writer import write_review_pdf
+from settings import bot_settings, report_settings
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
+REPORT_TEMPLATE = "report.html"
+
+pdf_queue_size = Gauge("pdf_queue_size", "PDF conversions waiting for a worker")
+pdf_in_progress = Gauge("pdf_in_progress", "PDF conversions running in workers")
+pdf_queue_wait_seconds = Histogram(
+    "pdf_queue_wait_seconds", "Time spent waiting for a PDF worker, seconds"
+)
+pdf_render_seconds = Histogram(
+    "pdf_render_seconds", "PDF rendering latency by step, seconds", ["step"]
+)
+
+
+def multiline(value: str) -> Markup:
+    return escape(value).replace("\n", Markup("&#10;"))
+
+
+def code(value: str) -> Markup:
+    # <pre> uses white-space: pre-line, so indentation has to survive as &nbsp;
+    return escape(value).replace(" ", Markup("&nbsp;"))
+
+
+def strip_code_fences(value: str) -> str:
+    return value.replace("```python", "").replace("```", "")
+
+
+def _bytecode_cache() -> FileSystemBytecodeCache:
+    if report_settings.TEMPLATES_CACHE_DIR:
+        os.makedirs(report_settings.TEMPLATES_CACHE_DIR, exist_ok=True)
+    return FileSystemBytecodeCache(report_settings.TEMPLATES_CACHE_DIR)
+
+
+env = Environment(
+    loader=FileSystemLoader(TEMPLATES_DIR),
+    autoescape=select_autoescape(["html"]),
+    bytecode_cache=_bytecode_cache(),
+    auto_reload=False,
+)
+env.filters.update(
+    multiline=multiline,
+    code=code,
+    strip_code_fences=strip_code_fences,
+)
+report_template = env.get_template(REPORT_TEMPLATE)
+
+
+def _format_date(created_at: datetime | None = None) -> str:
+    moscow_tz = pytz.timezone("Europe/Moscow")
+    created_at = created_at.astimezone(moscow_tz) if created_at else None
+    return (created_at or datetime.now(moscow_tz)).strftime("%d.%m.%Y, %H:%M:%S")
+
+
+def _build_context(
+    filename: str, response: ReviewSchema, created_at: datetime | None = None
+) -> dict:
+    formatted_date = _format_date(created_at)
+
+    title_remarks = defaultdict(list)
+    for comment in itertools.chain(response.code_comments, response.project_comments):
+        title_remarks[comment.title].append(comment)
+
+    sorted_title_remarks = sorted(
+        title_remarks.items(), key=lambda item: response.titles.index(item[0])
+    )
+
+    return {
+        "name": filename,
+        "date": formatted_date,
+        "total_remarks": len(response.code_comments) + len(response.project_comments),
+        "title_remarks": [
+            [title, len(remarks)] for title, remarks in sorted_title_remarks
+        ],
+        "title_infos": [
+            [
+                title,
+                [
+                    remark.comment
+                    for remark in remarks
+                    if not hasattr(remark, "suggestion")
+                ],
+                [
+                    [
+                        remark.filepath,
+                        remark.comment,
+                        "".join(line.text for line in remark.lines),
+                        remark.suggestion or "",
+                        remark.start_string_number - bot_settings.TOTAL_LINES_UP_DOWN,
+                    ]
+                    for remark in remarks
+                    if hasattr(remark, "suggestion")
+                ],
+            ]
+            for title, remarks in sorted_title_remarks
+        ],
+    }
+
+
+def _html_to_pdf(html_path: str, pdf_path: str) -> None:
+    pdfkit.from_file(html_path, pdf_path)
+
+
+class PdfRenderer:
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor: ProcessPoolExecutor | None = None
+        self._slots = asyncio.Semaphore(max_workers)
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def render_html(
+        self,
+        filename: str,
+        response: ReviewSchema,
+        created_at: datetime | None = None,
+    ) -> str:
+        with pdf_render_seconds.labels("template").time():
+            return report_template.render(
+                _build_context(filename, response, created_at)
+            )
+
+    async def _run(self, backend: str, func, *args) -> None:
+        queued_at = time.perf_counter()
+        pdf_queue_size.inc()
+        try:
+            await self._slots.acquire()
+        finally:
+            pdf_queue_size.dec()
+        pdf_queue_wait_seconds.observe(time.perf_counter() - queued_at)
+
+        pdf_in_progress.inc()
+        try:
+            with pdf_render_seconds.labels(backend).time():
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            pdf_in_progress.dec()
+            self._slots.release()
+
+    async def html_to_pdf(self, html_path: str, pdf_path: str) -> None:
+        await self._run("wkhtmltopdf", _html_to_pdf, html_path, pdf_path)
+
+    async def render(
+        self,
+        filename: str,
+        tmpdirname: str,
+        response: ReviewSchema,
+        pdf_path: str,
+        created_at: datetime | None = None,
+    ) -> None:
+        if report_settings.PDF_BACKEND == "reportlab":
+            date = _format_date(created_at)
+            await self._run(
+                "reportlab", write_review_pdf, filename, date, response, pdf_path
+            )
+            return
+
+        rendered_html = self.render_html(filename, response, created_at)
+
+        html_output_path = os.path.join(tmpdirname, "output.html")
+        with open(html_output_path, "w", encoding="utf-8") as f:
+            f.write(rendered_html)
+
+        await self.html_to_pdf(html_output_path, pdf_path)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+pdf_renderer = PdfRenderer(report_settings.PDF_WORKERS)
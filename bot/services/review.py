@@ -1,21 +1,54 @@
-import itertools
+import asyncio
+import importlib
+import logging
 import os
 import shutil
+import tempfile
 import zipfile
-from collections import defaultdict
-from copy import deepcopy
 from datetime import datetime
-from io import BytesIO
-from uuid import uuid4
-
-import pdfkit
-import pytz
-from aiogram.types import FSInputFile
-from database import Report
-from jinja2 import Environment, FileSystemLoader
-from ml.factory import OutputJson, get_ml_response
-from schemas.review import ReviewSchema
+from pathlib import Path
+from typing import Any, BinaryIO
+from uuid import UUID, uuid4
+
+from database import Report, ReviewComment, ReviewSnippet, async_session_factory
+from ml.diff import (
+    ENCODING_ERRORS,
+    ChangeSet,
+    PatchError,
+    apply_patches,
+    diff_trees,
+    parse_unified_diff,
+    project_fingerprint,
+)
+from ml.progress import emit_progress
+from prometheus_client import Histogram
+from schemas.ml import CodeComment, OutputJson
+from schemas.review import (
+    FileCountSchema,
+    ReviewSchema,
+    ReviewSummarySchema,
+    TitleCountSchema,
+)
+from services.line_index import LineIndexCache
+from services.llm_ledger import record_review_llm_calls
+from services.profiler import ProfileTrigger, ReviewProfiler
+from services.renderer import pdf_renderer
+from services.review_cache import cache_project_review, get_cached_project_review
+from services.storage import artifact_store
 from settings.settings import bot_settings
+from sqlalchemy import exists, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+_pdf_renders: dict[UUID, asyncio.Task] = {}
+
+review_stage_seconds = Histogram(
+    "review_stage_seconds",
+    "Duration of review pipeline stages",
+    ["stage"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
 
 
 def determine_language(path: str):
@@ -26,7 +59,7 @@ def determine_language(path: str):
     return None
 
 
-def _unpack_zip_to_tmp(zip_bytes: BytesIO, tmpdirname: str):
+def _unpack_zip_to_tmp(zip_bytes: BinaryIO, tmpdirname: str):
     with zipfile.ZipFile(zip_bytes, "r") as zip_ref:
         zip_ref.extractall(tmpdirname)
 
@@ -41,168 +74,397 @@ def _unpack_zip_to_tmp(zip_bytes: BytesIO, tmpdirname: str):
     return max(languages, key=languages.get)
 
 
-async def _create_pdf_from_template(
+def _find_changes(
+    tmpdirname: str, base: BinaryIO | None, diff: BinaryIO | None
+) -> ChangeSet:
+    """Apply ``diff`` to the unpacked archive, or compare it with ``base``.
+
+    Raises ``PatchError`` when the diff does not apply or ``base`` is not a zip
+    archive.
+    """
+    if diff is not None:
+        patches = parse_unified_diff(diff.read().decode("utf-8", ENCODING_ERRORS))
+        return apply_patches(Path(tmpdirname), patches)
+
+    with tempfile.TemporaryDirectory() as base_dirname:
+        try:
+            with zipfile.ZipFile(base, "r") as zip_ref:
+                zip_ref.extractall(base_dirname)
+        except zipfile.BadZipFile as error:
+            raise PatchError("The base version is not a zip archive") from error
+        return diff_trees(Path(base_dirname), Path(tmpdirname))
+
+
+async def _get_project_review(ml_factory, tmpdirname: str, language: str, reuse: bool):
+    """Run the project checks, or reuse those of a project with the same tree."""
+    fingerprint = await asyncio.to_thread(project_fingerprint, Path(tmpdirname))
+    if reuse and (project_review := await get_cached_project_review(fingerprint)):
+        return project_review
+
+    project_review = await ml_factory.get_project_review(tmpdirname, language)
+    if project_review is not None:
+        await cache_project_review(fingerprint, project_review)
+    return project_review
+
+
+async def _review_file(
+    file_bytes: BinaryIO,
+    is_file: bool,
     filename: str,
     tmpdirname: str,
-    response: ReviewSchema,
-    pdf_path: str,
-    html_path="/bot/templates/report.html",
+    report_id: UUID,
+    base: BinaryIO | None,
+    diff: BinaryIO | None,
 ):
-    template_dir = os.path.dirname(html_path)
-    template_name = os.path.basename(html_path)
+    # the ML stack takes seconds to import: only processes that review load it,
+    # and off the event loop
+    ml_factory = await asyncio.to_thread(importlib.import_module, "ml.factory")
 
-    env = Environment(loader=FileSystemLoader(template_dir))
+    emit_progress("stage", stage="unpack")
+    with review_stage_seconds.labels("unpack").time():
+        if is_file:
+            language = determine_language(filename) or "py"
+            with open(f"{tmpdirname}/{filename}", "wb") as f:
+                shutil.copyfileobj(file_bytes, f)
+        else:
+            language = _unpack_zip_to_tmp(file_bytes, tmpdirname)
 
-    template = env.get_template(template_name)
+    changes = None
+    if base is not None or diff is not None:
+        emit_progress("stage", stage="diff")
+        with review_stage_seconds.labels("diff").time():
+            changes = await asyncio.to_thread(_find_changes, tmpdirname, base, diff)
 
-    moscow_tz = pytz.timezone("Europe/Moscow")
-    now = datetime.now(moscow_tz)
+    ml_review_stage = review_stage_seconds.labels("ml_review")
+    with ml_review_stage.time(), record_review_llm_calls(report_id):
+        project_review = None
+        if not is_file:
+            project_review = await _get_project_review(
+                ml_factory, tmpdirname, language, reuse=changes is not None
+            )
+        response = await ml_factory.get_ml_response(
+            tmpdirname, language, changes, project_review
+        )
+    if response is None:
+        return None, None, None
+    emit_progress("stage", stage="create_report")
+    with review_stage_seconds.labels("create_report").time():
+        report = create_report(filename, response, tmpdirname, report_id)
 
-    # Форматируем дату и время
-    formatted_date = now.strftime("%d.%m.%Y, %H:%M:%S")
-    title_remarks = defaultdict(list)
-    for comment in itertools.chain(response.code_comments, response.project_comments):
-        title_remarks[comment.title].append(comment)
+    return language, response, report
 
-    sorted_title_remarks = sorted(
-        title_remarks.items(), key=lambda item: response.titles.index(item[0])
-    )
 
-    render_context = {
-        "name": filename,
-        "date": formatted_date,
-        "total_remarks": len(response.code_comments) + len(response.project_comments),
-        "title_remarks": [
-            [title.replace("\n", "&#10;"), len(remarks)] for title, remarks in sorted_title_remarks
+async def handle_file(
+    file_bytes: BinaryIO,
+    is_file: bool,
+    filename: str,
+    tmpdirname: str,
+    profile_trigger: ProfileTrigger | None = None,
+    report_id: UUID | None = None,
+    base: BinaryIO | None = None,
+    diff: BinaryIO | None = None,
+):
+    """Review an uploaded file or archive and build its unsaved report.
+
+    Given the archive of the previous version as ``base``, or a unified
+    ``diff`` to apply to the archive, only the changed code is reviewed and
+    the project checks of an unchanged file tree are reused, see ``ml.diff``.
+    A diff that does not apply raises ``PatchError``.
+
+    The review is profiled when ``profile_trigger`` is given or when it is
+    slower than ``PROFILE_SLOW_REVIEW_SECONDS``; the profile is saved with
+    the report. Progress is reported through ``ml.progress``, see
+    ``ReviewProgress.track``.
+    """
+    async with ReviewProfiler(profile_trigger) as profiler:
+        language, response, report = await _review_file(
+            file_bytes,
+            is_file,
+            filename,
+            tmpdirname,
+            report_id or uuid4(),
+            base,
+            diff,
+        )
+    if report is not None:
+        report.profile = await profiler.create_profile(filename)
+
+    return language, response, report
+
+
+async def save_report(session: AsyncSession, report: Report) -> None:
+    with review_stage_seconds.labels("db_commit").time():
+        session.add(report)
+        await session.commit()
+
+
+async def find_report(session: AsyncSession, report_id: UUID) -> Report | None:
+    get_report_query = select(Report).filter(Report.id == report_id)
+    return (await session.execute(get_report_query)).scalars().first()
+
+
+async def report_exists(session: AsyncSession, report_id: UUID) -> bool:
+    return bool(await session.scalar(select(exists().where(Report.id == report_id))))
+
+
+def comment_data(
+    comment: ReviewComment, snippet_lines: dict[str, str] | None, **fields
+) -> dict[str, Any]:
+    """Shape a stored comment like ``CodeCommentSchema`` without building it.
+
+    Stored comments were validated when the review was created, and building
+    a model per snippet line costs more than serializing the whole review.
+    """
+    snippet_lines = snippet_lines or {}
+    return {
+        "title": comment.title,
+        "lines": [
+            {"order": order, "text": snippet_lines.get(str(order), "")}
+            for order in range(comment.first_line, comment.last_line + 1)
         ],
-        "title_infos": [
-            [
-                title,
-                [
-                    remark.comment.replace("\n", "&#10;")
-                    for remark in remarks
-                    if not hasattr(remark, "suggestion")
-                ],
-                [
-                    [
-                        remark.filepath,
-                        remark.comment.replace("\n", "&#10;"),
-                        "".join(
-                            [
-                                line.text.replace("<", "&lt;").replace(" ", "&nbsp;")
-                                for line in remark.lines
-                            ]
-                        ),
-                        (remark.suggestion or "")
-                        .replace("<", "&lt;")
-                        .replace(" ", "&nbsp;")
-                        .replace("```python", "")
-                        .replace("```", ""),
-                        remark.start_string_number - bot_settings.TOTAL_LINES_UP_DOWN,
-                    ]
-                    for remark in remarks
-                    if hasattr(remark, "suggestion")
-                ],
-            ]
-            for title, remarks in sorted_title_remarks
+        "start_string_number": comment.start_string_number,
+        "end_string_number": comment.end_string_number,
+        "filepath": comment.filepath,
+        "comment": comment.comment,
+        "suggestion": comment.suggestion,
+        **fields,
+    }
+
+
+async def load_snippet_lines(
+    session: AsyncSession, snippet_ids: set[int]
+) -> dict[int, dict[str, str]]:
+    if not snippet_ids:
+        return {}
+    get_snippets_query = select(ReviewSnippet.id, ReviewSnippet.lines).where(
+        ReviewSnippet.id.in_(snippet_ids)
+    )
+    return dict((await session.execute(get_snippets_query)).all())
+
+
+async def load_review_data(session: AsyncSession, report: Report) -> dict[str, Any]:
+    """Return the review in the shape of ``ReviewSchema``, as JSON-ready data."""
+    get_comments_query = (
+        select(ReviewComment)
+        .where(ReviewComment.report_id == report.id)
+        .order_by(ReviewComment.id)
+    )
+    comments = (await session.execute(get_comments_query)).scalars().all()
+    snippets = await load_snippet_lines(
+        session, {comment.snippet_id for comment in comments if comment.snippet_id}
+    )
+
+    return {
+        "id": str(report.id),
+        "titles": report.titles,
+        "code_comments": [
+            comment_data(comment, snippets.get(comment.snippet_id))
+            for comment in comments
         ],
+        "project_comments": report.project_comments,
     }
-    print(render_context)
-    rendered_html = template.render(render_context)
 
-    html_output_path = os.path.join(tmpdirname, "output.html")
-    with open(html_output_path, "w", encoding="utf-8") as f:
-        f.write(rendered_html)
 
-    pdfkit.from_file(html_output_path, pdf_path)
-    return FSInputFile(pdf_path)
+async def load_review(session: AsyncSession, report: Report) -> ReviewSchema:
+    return ReviewSchema.model_validate(await load_review_data(session, report))
 
 
-async def handle_file(
-    file_bytes: BytesIO, is_file: bool, filename: str, tmpdirname: str
-):
-    if is_file:
-        language = determine_language(filename) or "py"
-        with open(f"{tmpdirname}/{filename}", "wb") as f:
-            f.write(file_bytes.read())
-    else:
-        language = _unpack_zip_to_tmp(file_bytes, tmpdirname)
-
-    response = await get_ml_response(tmpdirname, language)
-    if response is None:
-        return None, None, None, None
-    frontend_response, ml_response = create_report(filename, response, tmpdirname)
+async def load_review_comments(
+    session: AsyncSession,
+    report_id: UUID,
+    limit: int,
+    cursor: int | None = None,
+    titles: list[str] | None = None,
+    filepath_prefix: str | None = None,
+    line_from: int | None = None,
+    line_to: int | None = None,
+) -> tuple[list[dict[str, Any]], int | None]:
+    """Return one keyset page of comments and the cursor of the next page.
 
-    random_uuid = uuid4()
-    report_file_path = f"/bot/reports/{random_uuid}.pdf"
+    Comments are shaped like ``ReviewCommentSchema``, see ``comment_data``.
 
-    report = Report(
-        id=random_uuid,
-        pdf_file_path=report_file_path,
-        ml_response=ml_response,
-        frontend_response=frontend_response,
+    A line range selects comments overlapping it.
+    """
+    get_comments_query = select(ReviewComment).where(
+        ReviewComment.report_id == report_id
     )
-    pdf_path = f"{tmpdirname}/report.pdf"
-    frontend = ReviewSchema(**{**report.frontend_response, "id": str(random_uuid)})
-    pdf = await _create_pdf_from_template(filename, tmpdirname, frontend, pdf_path)
-    shutil.copy(pdf.path, report_file_path)
+    if cursor is not None:
+        get_comments_query = get_comments_query.where(ReviewComment.id > cursor)
+    if titles:
+        get_comments_query = get_comments_query.where(ReviewComment.title.in_(titles))
+    if filepath_prefix:
+        get_comments_query = get_comments_query.where(
+            ReviewComment.filepath.startswith(filepath_prefix, autoescape=True)
+        )
+    if line_from is not None:
+        get_comments_query = get_comments_query.where(
+            ReviewComment.end_string_number >= line_from
+        )
+    if line_to is not None:
+        get_comments_query = get_comments_query.where(
+            ReviewComment.start_string_number <= line_to
+        )
+    get_comments_query = get_comments_query.order_by(ReviewComment.id).limit(limit + 1)
 
-    return pdf, language, response, report
+    comments = (await session.execute(get_comments_query)).scalars().all()
+    next_cursor = None
+    if len(comments) > limit:
+        comments = comments[:limit]
+        next_cursor = comments[-1].id
 
+    snippets = await load_snippet_lines(
+        session, {comment.snippet_id for comment in comments if comment.snippet_id}
+    )
+    return [
+        comment_data(comment, snippets.get(comment.snippet_id), id=comment.id)
+        for comment in comments
+    ], next_cursor
 
-def create_report(filename: str, response: OutputJson, tmpdirname: str) -> Report:
-    ml_response = response.model_dump()
-    frontend_response = deepcopy(ml_response)
 
-    for index, code_comment in enumerate(response.code_comments):
-        try:
-            with open(
-                f"{tmpdirname}/{code_comment.filepath}",
-                "r",
-            ) as f:
-                lines = f.readlines()
-
-                first_number = max(1, code_comment.start_string_number)
-                last_number = min(len(lines), code_comment.end_string_number)
-                first_index = max(
-                    0, first_number - 1 - bot_settings.TOTAL_LINES_UP_DOWN
-                )
-                last_index = min(
-                    len(lines) - 1, last_number + 2 + bot_settings.TOTAL_LINES_UP_DOWN
+async def load_review_summary(
+    session: AsyncSession, report: Report
+) -> ReviewSummarySchema:
+    count = func.count(ReviewComment.id).label("count")
+    by_title_query = (
+        select(ReviewComment.title, count)
+        .where(ReviewComment.report_id == report.id)
+        .group_by(ReviewComment.title)
+    )
+    by_file_query = (
+        select(ReviewComment.filepath, count)
+        .where(ReviewComment.report_id == report.id)
+        .group_by(ReviewComment.filepath)
+        .order_by(count.desc(), ReviewComment.filepath)
+    )
+    by_title = dict((await session.execute(by_title_query)).all())
+    by_file = (await session.execute(by_file_query)).all()
+
+    return ReviewSummarySchema(
+        id=report.id,
+        titles=report.titles,
+        code_comments_count=sum(by_title.values()),
+        by_title=[
+            TitleCountSchema(title=title, count=by_title[title])
+            for title in report.titles
+            if title in by_title
+        ]
+        + [
+            TitleCountSchema(title=title, count=title_count)
+            for title, title_count in by_title.items()
+            if title not in report.titles
+        ],
+        by_file=[
+            FileCountSchema(filepath=filepath, count=file_count)
+            for filepath, file_count in by_file
+        ],
+        project_comments=report.project_comments,
+    )
+
+
+async def _render_report_pdf(
+    filename: str, review: ReviewSchema, created_at: datetime
+) -> str:
+    pdf_stage = review_stage_seconds.labels("pdf")
+    with pdf_stage.time(), tempfile.TemporaryDirectory() as tmpdirname:
+        pdf_path = f"{tmpdirname}/report.pdf"
+        await pdf_renderer.render(
+            filename, tmpdirname, review, pdf_path, created_at=created_at
+        )
+        return await artifact_store.put_file(pdf_path, ".pdf")
+
+
+async def _render_stored_report_pdf(report: Report) -> str:
+    async with async_session_factory() as session:
+        review = await load_review(session, report)
+    return await _render_report_pdf(
+        report.filename or "report", review, report.created_at
+    )
+
+
+def _forget_render(report_id: UUID, render: asyncio.Task) -> None:
+    # a newer render may have been registered after this one finished
+    if _pdf_renders.get(report_id) is render:
+        del _pdf_renders[report_id]
+    # the requests waiting for it may all have been cancelled
+    if not render.cancelled() and (error := render.exception()) is not None:
+        logger.error("Failed to render the PDF of %s", report_id, exc_info=error)
+
+
+async def ensure_report_pdf(session: AsyncSession, report: Report) -> str:
+    """Return the artifact key of the report PDF, rendering it on first request.
+
+    Concurrent first requests for the same report share a single render, and
+    a PDF dropped by artifact eviction is rendered again.
+    """
+    if report.pdf_file_path and await artifact_store.exists(report.pdf_file_path):
+        return report.pdf_file_path
+
+    # the render is registered before its first await, so concurrent requests
+    # cannot both miss it; it loads the review with its own session because
+    # it outlives the request that started it
+    if (render := _pdf_renders.get(report.id)) is None:
+        render = asyncio.create_task(_render_stored_report_pdf(report))
+        _pdf_renders[report.id] = render
+        render.add_done_callback(lambda task: _forget_render(report.id, task))
+
+    pdf_key = await asyncio.shield(render)
+    if report.pdf_file_path != pdf_key:
+        report.pdf_file_path = pdf_key
+        await session.commit()
+
+    return pdf_key
+
+
+def _read_window(
+    sources: LineIndexCache, code_comment: CodeComment
+) -> tuple[int, list[str]] | None:
+    if (index := sources.get(code_comment.filepath)) is None:
+        return None
+
+    first_number = max(1, code_comment.start_string_number)
+    last_number = min(len(index), code_comment.end_string_number)
+    first_index = max(0, first_number - 1 - bot_settings.TOTAL_LINES_UP_DOWN)
+    last_index = min(len(index) - 1, last_number + 2 + bot_settings.TOTAL_LINES_UP_DOWN)
+    return first_index + 1, index.lines(first_index, last_index)
+
+
+def create_report(
+    filename: str, response: OutputJson, tmpdirname: str, report_id: UUID
+) -> Report:
+    report = Report(
+        id=report_id,
+        filename=filename,
+        titles=response.titles,
+        project_comments=[
+            comment.model_dump() for comment in response.project_comments
+        ],
+    )
+
+    snippets: dict[str, ReviewSnippet] = {}
+    with LineIndexCache(tmpdirname) as sources:
+        for code_comment in response.code_comments:
+            comment = ReviewComment(
+                title=code_comment.title,
+                filepath=code_comment.filepath,
+                start_string_number=code_comment.start_string_number,
+                end_string_number=code_comment.end_string_number,
+                comment=code_comment.comment,
+                suggestion=code_comment.suggestion,
+                first_line=1,
+                last_line=1,
+            )
+            if window := _read_window(sources, code_comment):
+                first_line, window_lines = window
+                if (snippet := snippets.get(code_comment.filepath)) is None:
+                    snippet = ReviewSnippet(filepath=code_comment.filepath, lines={})
+                    snippets[code_comment.filepath] = snippet
+                    report.snippets.append(snippet)
+                snippet.lines.update(
+                    {str(first_line + i): line for i, line in enumerate(window_lines)}
                 )
-                window_lines = lines[first_index:last_index]
-
-            frontend_response["code_comments"][index]["lines"] = [
-                {"order": i + first_index + 1, "text": line}
-                for i, line in enumerate(window_lines)
-            ]
-        except Exception:
-            try:
-                with open(
-                    f"{code_comment.filepath}",
-                    "r",
-                ) as f:
-                    lines = f.readlines()
-
-                    first_number = max(1, code_comment.start_string_number)
-                    last_number = min(len(lines), code_comment.end_string_number)
-                    first_index = max(
-                        0, first_number - 1 - bot_settings.TOTAL_LINES_UP_DOWN
-                    )
-                    last_index = min(
-                        len(lines) - 1, last_number + 2 + bot_settings.TOTAL_LINES_UP_DOWN
-                    )
-                    window_lines = lines[first_index:last_index]
-
-                frontend_response["code_comments"][index]["lines"] = [
-                    {"order": i + first_index + 1, "text": line}
-                    for i, line in enumerate(window_lines)
-                ]
-            except Exception:
-                frontend_response["code_comments"][index]["lines"] = [
-                    {
-                        "order": 1,
-                        "text": "",
-                    }
-                ]
-    return frontend_response, ml_response
+                comment.snippet = snippet
+                comment.first_line = first_line
+                comment.last_line = first_line + len(window_lines) - 1
+            report.comments.append(comment)
+
+    return report
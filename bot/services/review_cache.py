@@ -0,0 +1,108 @@
+import gzip
+from typing import Any
+from uuid import UUID
+
+import brotli
+import orjson
+from database import redis_connection
+from ml.schemas import ProjectReview
+from settings import report_settings
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+ENCODINGS = ("br", "gzip", "identity")
+
+
+def review_etag(report_id: UUID, encoding: str) -> str:
+    # a strong validator must differ between content codings of a body
+    return f'"review-{report_id}-{encoding}"'
+
+
+def report_etag(report_id: UUID) -> str:
+    return f'"report-{report_id}"'
+
+
+def is_not_modified(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in tags or "*" in tags
+
+
+def _quality(params: str) -> float:
+    for param in params.split(";"):
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def choose_encoding(accept_encoding: str | None) -> str:
+    """Pick the supported encoding the client weights highest (RFC 9110).
+
+    Codings with ``q=0`` are refused and ``*`` stands for those not listed.
+    """
+    weights = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.partition(";")
+        if coding := coding.strip().lower():
+            weights[coding] = _quality(params)
+
+    default = weights.get("*", 0.0)
+    # max keeps the first of equal weights, the order of ENCODINGS
+    encoding = max(ENCODINGS[:-1], key=lambda coding: weights.get(coding, default))
+    weight = weights.get(encoding, default)
+    # identity is always acceptable, but only preferred when listed explicitly
+    if weight > 0 and weight >= weights.get("identity", 0.0):
+        return encoding
+    return "identity"
+
+
+def encode_review(review: dict[str, Any]) -> dict[str, bytes]:
+    """Encode ``load_review_data`` output in every supported content encoding."""
+    body = orjson.dumps(review)
+    return {
+        "br": brotli.compress(body, quality=5),
+        "gzip": gzip.compress(body, compresslevel=6, mtime=0),
+        "identity": body,
+    }
+
+
+def _cache_key(report_id: UUID, encoding: str) -> str:
+    return f"review:{report_id}:{encoding}"
+
+
+async def get_cached_review(report_id: UUID, encoding: str) -> bytes | None:
+    return await redis_connection.get(_cache_key(report_id, encoding))
+
+
+async def is_review_cached(report_id: UUID, encoding: str) -> bool:
+    return await redis_connection.exists(_cache_key(report_id, encoding))
+
+
+async def cache_review(report_id: UUID, bodies: dict[str, bytes]) -> None:
+    await redis_connection.set_many_expire(
+        {_cache_key(report_id, encoding): body for encoding, body in bodies.items()},
+        report_settings.REVIEW_CACHE_TTL,
+    )
+
+
+def _project_review_key(fingerprint: str) -> str:
+    return f"project-review:{fingerprint}"
+
+
+async def get_cached_project_review(fingerprint: str) -> ProjectReview | None:
+    """Return the project checks of a file tree, see ``project_fingerprint``."""
+    if (body := await redis_connection.get(_project_review_key(fingerprint))) is None:
+        return None
+    return ProjectReview.model_validate_json(body)
+
+
+async def cache_project_review(fingerprint: str, project_review: ProjectReview) -> None:
+    await redis_connection.set_expire(
+        _project_review_key(fingerprint),
+        project_review.model_dump_json(),
+        report_settings.PROJECT_REVIEW_TTL,
+    )
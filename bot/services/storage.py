@@ -0,0 +1,241 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from uuid import uuid4
+
+from settings import report_settings
+
+logger = logging.getLogger(__name__)
+
+
+def _file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+class ArtifactStore(ABC):
+    """Content-addressed storage for report artifacts.
+
+    Keys are ``<sha256><suffix>``, so identical artifacts are stored once.
+    Only byte-identical files share a key: the reportlab backend writes
+    invariant PDFs, while wkhtmltopdf embeds the render time, so its PDFs of
+    the same report are stored separately.
+    """
+
+    def __init__(self, ttl_seconds: int, max_bytes: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+    @abstractmethod
+    def _put(self, key: str, path: str) -> None: ...
+
+    @abstractmethod
+    def _exists(self, key: str) -> bool: ...
+
+    @abstractmethod
+    def _read(self, key: str) -> bytes: ...
+
+    @abstractmethod
+    def _delete(self, key: str) -> None: ...
+
+    @abstractmethod
+    def _list(self) -> list[tuple[str, float, int]]:
+        """Return ``(key, last_used_timestamp, size)`` for every artifact."""
+
+    def local_path(self, key: str) -> str | None:
+        return None
+
+    def _put_file(self, path: str, suffix: str) -> str:
+        key = f"{_file_digest(path)}{suffix}"
+        if not self._exists(key):
+            self._put(key, path)
+        return key
+
+    async def put_file(self, path: str, suffix: str) -> str:
+        return await asyncio.to_thread(self._put_file, path, suffix)
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(self._exists, key)
+
+    async def read(self, key: str) -> bytes:
+        return await asyncio.to_thread(self._read, key)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._delete, key)
+
+    def _evict(self) -> int:
+        artifacts = sorted(self._list(), key=lambda artifact: artifact[1])
+        expire_before = time.time() - self.ttl_seconds
+        total_size = sum(size for _, _, size in artifacts)
+
+        evicted = 0
+        for key, last_used, size in artifacts:
+            if last_used >= expire_before and total_size <= self.max_bytes:
+                break
+            self._delete(key)
+            total_size -= size
+            evicted += 1
+        return evicted
+
+    async def evict(self) -> int:
+        return await asyncio.to_thread(self._evict)
+
+    async def run_eviction(self, interval: int) -> None:
+        while True:
+            try:
+                if evicted := await self.evict():
+                    logger.info("Evicted %s report artifacts", evicted)
+            except Exception:
+                logger.exception("Report artifacts eviction failed")
+            await asyncio.sleep(interval)
+
+
+class LocalArtifactStore(ArtifactStore):
+    """Artifacts sharded as ``<root>/ab/cd/abcd...<suffix>``.
+
+    Reads refresh the file mtime, so size-based eviction drops the least
+    recently used artifacts first.
+    """
+
+    def __init__(self, root: str, ttl_seconds: int, max_bytes: int):
+        super().__init__(ttl_seconds, max_bytes)
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        # reports created before the store kept absolute file paths
+        if os.path.isabs(key):
+            return Path(key)
+        return self.root / key[:2] / key[2:4] / key
+
+    def local_path(self, key: str) -> str | None:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        os.utime(path)
+        return str(path)
+
+    def _put(self, key: str, path: str) -> None:
+        target = self._path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        partial = target.with_name(f".{target.name}.{uuid4().hex}")
+        with open(path, "rb") as src, open(partial, "wb") as dst:
+            while chunk := src.read(1024 * 1024):
+                dst.write(chunk)
+        os.replace(partial, target)
+
+    def _exists(self, key: str) -> bool:
+        path = self._path(key)
+        if not path.exists():
+            return False
+        os.utime(path)
+        return True
+
+    def _read(self, key: str) -> bytes:
+        path = self._path(key)
+        os.utime(path)
+        return path.read_bytes()
+
+    def _delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+    def _list(self) -> list[tuple[str, float, int]]:
+        artifacts = []
+        for path in self.root.glob("??/??/*"):
+            if path.name.startswith("."):
+                continue
+            stat = path.stat()
+            artifacts.append((path.name, stat.st_mtime, stat.st_size))
+        return artifacts
+
+
+class S3ArtifactStore(ArtifactStore):
+    """Artifacts in an S3-compatible bucket (AWS, MinIO, moto server).
+
+    Objects are sharded as ``<prefix>ab/cd/abcd...<suffix>``. Eviction only
+    lists ``prefix``, like the local store only lists its root, so the prefix
+    must not be empty. S3 has no cheap way to record reads, so TTL counts from
+    upload time.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        ttl_seconds: int,
+        max_bytes: int,
+        prefix: str = "artifacts/",
+        **client_kwargs,
+    ):
+        import boto3
+
+        if not prefix.strip("/"):
+            raise ValueError("S3 artifact prefix must not be empty")
+        super().__init__(ttl_seconds, max_bytes)
+        self.bucket = bucket
+        self.prefix = f"{prefix.strip('/')}/"
+        self.client = boto3.client("s3", **client_kwargs)
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}{key[:2]}/{key[2:4]}/{key}"
+
+    def _put(self, key: str, path: str) -> None:
+        self.client.upload_file(path, self.bucket, self._object_key(key))
+
+    def _exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                return False
+            raise
+        return True
+
+    def _read(self, key: str) -> bytes:
+        obj = self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))
+        return obj["Body"].read()
+
+    def _delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+    def _list(self) -> list[tuple[str, float, int]]:
+        artifacts = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for obj in page.get("Contents", []):
+                artifacts.append(
+                    (
+                        obj["Key"].rsplit("/", 1)[-1],
+                        obj["LastModified"].timestamp(),
+                        obj["Size"],
+                    )
+                )
+        return artifacts
+
+
+def create_artifact_store() -> ArtifactStore:
+    ttl_seconds = report_settings.ARTIFACT_TTL_DAYS * 24 * 60 * 60
+    max_bytes = report_settings.ARTIFACT_MAX_MB * 1024 * 1024
+    if report_settings.ARTIFACT_STORE == "s3":
+        return S3ArtifactStore(
+            report_settings.S3_BUCKET,
+            ttl_seconds,
+            max_bytes,
+            prefix=report_settings.S3_PREFIX,
+            endpoint_url=report_settings.S3_ENDPOINT_URL,
+            region_name=report_settings.S3_REGION,
+            aws_access_key_id=report_settings.S3_ACCESS_KEY,
+            aws_secret_access_key=(
+                report_settings.S3_SECRET_KEY.get_secret_value()
+                if report_settings.S3_SECRET_KEY
+                else None
+            ),
+        )
+    return LocalArtifactStore(report_settings.REPORTS_DIR, ttl_seconds, max_bytes)
+
+
+artifact_store = create_artifact_store()
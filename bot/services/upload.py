@@ -0,0 +1,66 @@
+import hashlib
+import tempfile
+from typing import AsyncIterable
+
+from settings import bot_settings
+
+CHUNK_SIZE = 64 * 1024
+DIFF_EXTENSIONS = (".diff", ".patch")
+
+
+class UploadTooLarge(ValueError):
+    """An upload exceeded ``MAX_UPLOAD_MB``."""
+
+
+def max_upload_bytes() -> int:
+    return bot_settings.MAX_UPLOAD_MB * 1024 * 1024
+
+
+class SpooledUpload:
+    """An upload written chunk by chunk into a spooled temporary file.
+
+    Up to ``UPLOAD_SPOOL_MB`` stays in memory, the rest goes to disk. Writing
+    past ``MAX_UPLOAD_MB`` raises ``UploadTooLarge`` before the chunk is
+    stored, and the SHA-256 of the content is computed along the way.
+    """
+
+    def __init__(self):
+        self.file = tempfile.SpooledTemporaryFile(
+            max_size=bot_settings.UPLOAD_SPOOL_MB * 1024 * 1024
+        )
+        self.size = 0
+        self.max_size = max_upload_bytes()
+        self._sha256 = hashlib.sha256()
+
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
+    def write(self, chunk: bytes) -> int:
+        self.size += len(chunk)
+        if self.size > self.max_size:
+            raise UploadTooLarge(
+                f"Upload is larger than {bot_settings.MAX_UPLOAD_MB} MB"
+            )
+        self._sha256.update(chunk)
+        return self.file.write(chunk)
+
+    async def write_from(self, chunks: AsyncIterable[bytes]) -> None:
+        async for chunk in chunks:
+            self.write(chunk)
+        self.file.seek(0)
+
+    def flush(self) -> None:
+        self.file.flush()
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self.file.seek(offset, whence)
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self) -> "SpooledUpload":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
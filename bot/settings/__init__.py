@@ -1,7 +1,11 @@
 from settings.settings import (
     SQLALCHEMY_ORM_CONFIG,
     bot_settings,
+    history_settings,
+    monitoring_settings,
+    profiler_settings,
     redis_settings,
+    report_settings,
     sqlalchemy_orm_settings,
 )
 
@@ -9,5 +13,9 @@ __all__ = (
     "bot_settings",
     "sqlalchemy_orm_settings",
     "redis_settings",
+    "report_settings",
+    "history_settings",
+    "profiler_settings",
+    "monitoring_settings",
     "SQLALCHEMY_ORM_CONFIG",
 )
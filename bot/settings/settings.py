@@ -1,3 +1,5 @@
+from typing import Literal
+
 from dotenv import load_dotenv
 from pydantic import Field, SecretStr
 from pydantic_settings import BaseSettings
@@ -16,10 +18,16 @@ class BotSettings(BaseSettings):
     WEBHOOK_HOST: str
     WEBHOOK_PATH: str
     WEBHOOK_URL: str
+    WEBHOOK_SECRET: SecretStr | None = None
     IS_POLLING: bool = False
+    IS_WEBHOOK: bool = False
     WEBAPP_HOST: str
     WEBAPP_PORT: int
+    WEBAPP_WORKERS: int = 1
     LOG_QUERY: bool = False
+    MAX_UPLOAD_MB: int = 50
+    UPLOAD_SPOOL_MB: int = 2
+    PROGRESS_EDIT_INTERVAL: float = 3.0
 
     class Config:
         env_file = "../.env"
@@ -32,6 +40,12 @@ class SQLAlchemyOrmSettings(BaseSettings):
     POSTGRES_PASSWORD: str
     POSTGRES_HOST: str
     POSTGRES_PORT: int
+    POOL_SIZE: int = 10
+    POOL_MAX_OVERFLOW: int = 20
+    POOL_TIMEOUT: int = 30
+    POOL_RECYCLE: int = 30 * 60
+    POOL_PRE_PING: bool = True
+    STATEMENT_CACHE_SIZE: int = 500
 
     class Config:
         env_file = "../.env"
@@ -41,6 +55,74 @@ class SQLAlchemyOrmSettings(BaseSettings):
 class RedisSettings(BaseSettings):
     REDIS_HOST: str
     REDIS_PORT: int
+    # the FSM storage has always used db 0, caches are rebuilt on their own
+    REDIS_DB: int = 0
+    REDIS_MAX_CONNECTIONS: int = 100
+    REDIS_POOL_TIMEOUT: float = 5
+    PROFILE_CACHE_TTL: int = 5 * 60
+
+    class Config:
+        env_file = "../.env"
+        env_file_encoding = "utf-8"
+
+
+class ReportSettings(BaseSettings):
+    REPORTS_DIR: str = "/bot/reports"
+    PDF_WORKERS: int = 2
+    PDF_BACKEND: Literal["wkhtmltopdf", "reportlab"] = "wkhtmltopdf"
+    PDF_FONT_PATH: str = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+    PDF_BOLD_FONT_PATH: str = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+    PDF_MONO_FONT_PATH: str = "/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf"
+    REVIEW_CACHE_TTL: int = 24 * 60 * 60
+    REVIEW_EVENTS_TTL: int = 60 * 60
+    REVIEW_EVENTS_KEEPALIVE: float = 15.0
+    PROJECT_REVIEW_TTL: int = 7 * 24 * 60 * 60
+    ARTIFACT_STORE: Literal["local", "s3"] = "local"
+    ARTIFACT_TTL_DAYS: int = 90
+    ARTIFACT_MAX_MB: int = 10 * 1024
+    ARTIFACT_EVICTION_INTERVAL: int = 60 * 60
+    S3_ENDPOINT_URL: str | None = None
+    S3_REGION: str | None = None
+    S3_BUCKET: str = "reports"
+    # eviction lists and deletes everything under this prefix
+    S3_PREFIX: str = Field("artifacts/", min_length=1)
+    S3_ACCESS_KEY: str | None = None
+    S3_SECRET_KEY: SecretStr | None = None
+    TEMPLATES_CACHE_DIR: str | None = None
+
+    class Config:
+        env_file = "../.env"
+        env_file_encoding = "utf-8"
+
+
+class HistorySettings(BaseSettings):
+    HISTORY_BATCH_SIZE: int = 500
+    HISTORY_BUFFER_SIZE: int = 10_000
+    HISTORY_FLUSH_INTERVAL: float = 1.0
+    HISTORY_RETENTION_MONTHS: int = 12
+    HISTORY_PARTITIONS_AHEAD: int = 2
+    HISTORY_MAINTENANCE_INTERVAL: int = 24 * 60 * 60
+
+    class Config:
+        env_file = "../.env"
+        env_file_encoding = "utf-8"
+
+
+class ProfilerSettings(BaseSettings):
+    PROFILE_SLOW_REVIEW_SECONDS: float | None = None
+    PROFILE_SAMPLE_INTERVAL: float = 0.01
+    PROFILE_HEADER_TOKEN: SecretStr | None = None
+    PROFILE_TRACEMALLOC_FRAMES: int = 1
+    PROFILE_TOP_ALLOCATIONS: int = 30
+
+    class Config:
+        env_file = "../.env"
+        env_file_encoding = "utf-8"
+
+
+class MonitoringSettings(BaseSettings):
+    LOOP_MONITOR_INTERVAL: float = 0.1
+    LOOP_BLOCK_THRESHOLD: float = 0.5
 
     class Config:
         env_file = "../.env"
@@ -50,6 +132,10 @@ class RedisSettings(BaseSettings):
 bot_settings = BotSettings()
 sqlalchemy_orm_settings = SQLAlchemyOrmSettings()
 redis_settings = RedisSettings()
+report_settings = ReportSettings()
+history_settings = HistorySettings()
+profiler_settings = ProfilerSettings()
+monitoring_settings = MonitoringSettings()
 
 SQLALCHEMY_ORM_CONFIG = {
     "url": f"postgresql+asyncpg://{sqlalchemy_orm_settings.POSTGRES_USER}:"
@@ -58,4 +144,12 @@ SQLALCHEMY_ORM_CONFIG = {
     f"{sqlalchemy_orm_settings.POSTGRES_PORT}/"
     f"{sqlalchemy_orm_settings.POSTGRES_DB}",
     "echo": bot_settings.LOG_QUERY,
+    "pool_size": sqlalchemy_orm_settings.POOL_SIZE,
+    "max_overflow": sqlalchemy_orm_settings.POOL_MAX_OVERFLOW,
+    "pool_timeout": sqlalchemy_orm_settings.POOL_TIMEOUT,
+    "pool_recycle": sqlalchemy_orm_settings.POOL_RECYCLE,
+    "pool_pre_ping": sqlalchemy_orm_settings.POOL_PRE_PING,
+    "connect_args": {
+        "prepared_statement_cache_size": sqlalchemy_orm_settings.STATEMENT_CACHE_SIZE
+    },
 }